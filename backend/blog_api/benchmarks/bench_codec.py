@@ -0,0 +1,220 @@
+"""Micro-benchmark do codec do Firestore (documentos/segundo)
+
+Compara o codec de src/services/firestore_codec.py com a conversão antiga do
+firebase_proxy (cadeias de if/elif, copiada abaixo).
+
+Uso (a partir de backend/blog_api):
+    python benchmarks/bench_codec.py [--docs 500] [--content-size 6000] [--repeat 20]
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.firestore_codec import decode_document, encode_fields
+
+PARAGRAPH = (
+    'A Lei Geral de Proteção de Dados estabelece regras sobre coleta, armazenamento, '
+    'tratamento e compartilhamento de dados pessoais, impondo mais proteção e '
+    'penalidades para o não cumprimento. '
+)
+
+
+# ---------------------------------------------------------------------------
+# Conversão antiga (src/routes/firebase_proxy.py antes do codec)
+# ---------------------------------------------------------------------------
+
+def parse_firestore_fields(fields):
+    """Converter campos do Firestore para formato Python"""
+    result = {}
+
+    for key, value in fields.items():
+        if 'stringValue' in value:
+            result[key] = value['stringValue']
+        elif 'integerValue' in value:
+            result[key] = int(value['integerValue'])
+        elif 'doubleValue' in value:
+            result[key] = float(value['doubleValue'])
+        elif 'booleanValue' in value:
+            result[key] = value['booleanValue']
+        elif 'timestampValue' in value:
+            result[key] = value['timestampValue']
+        elif 'arrayValue' in value:
+            result[key] = [parse_firestore_value(item) for item in value['arrayValue'].get('values', [])]
+        elif 'mapValue' in value:
+            result[key] = parse_firestore_fields(value['mapValue'].get('fields', {}))
+        elif 'nullValue' in value:
+            result[key] = None
+        else:
+            result[key] = value
+
+    return result
+
+
+def parse_firestore_value(value):
+    """Converter um valor individual do Firestore"""
+    if 'stringValue' in value:
+        return value['stringValue']
+    elif 'integerValue' in value:
+        return int(value['integerValue'])
+    elif 'doubleValue' in value:
+        return float(value['doubleValue'])
+    elif 'booleanValue' in value:
+        return value['booleanValue']
+    elif 'timestampValue' in value:
+        return value['timestampValue']
+    elif 'nullValue' in value:
+        return None
+    else:
+        return value
+
+
+def convert_to_firestore_fields(data):
+    """Converter dados Python para formato Firestore"""
+    result = {}
+
+    for key, value in data.items():
+        if isinstance(value, str):
+            result[key] = {'stringValue': value}
+        elif isinstance(value, int):
+            result[key] = {'integerValue': str(value)}
+        elif isinstance(value, float):
+            result[key] = {'doubleValue': value}
+        elif isinstance(value, bool):
+            result[key] = {'booleanValue': value}
+        elif isinstance(value, list):
+            result[key] = {
+                'arrayValue': {
+                    'values': [convert_to_firestore_value(item) for item in value]
+                }
+            }
+        elif isinstance(value, dict):
+            result[key] = {
+                'mapValue': {
+                    'fields': convert_to_firestore_fields(value)
+                }
+            }
+        elif value is None:
+            result[key] = {'nullValue': None}
+        else:
+            result[key] = {'stringValue': str(value)}
+
+    return result
+
+
+def convert_to_firestore_value(value):
+    """Converter um valor individual para formato Firestore"""
+    if isinstance(value, str):
+        return {'stringValue': value}
+    elif isinstance(value, int):
+        return {'integerValue': str(value)}
+    elif isinstance(value, float):
+        return {'doubleValue': value}
+    elif isinstance(value, bool):
+        return {'booleanValue': value}
+    elif value is None:
+        return {'nullValue': None}
+    else:
+        return {'stringValue': str(value)}
+
+
+def legacy_decode_document(doc):
+    """Como as rotas antigas montavam {id, data}"""
+    return {
+        'id': doc['name'].split('/')[-1],
+        'data': parse_firestore_fields(doc.get('fields', {}))
+    }
+
+
+def make_article(index, content_size):
+    """Documento no formato REST do Firestore, parecido com um artigo real do blog"""
+    content = (PARAGRAPH * (content_size // len(PARAGRAPH) + 1))[:content_size]
+    return {
+        'name': f'projects/demo/databases/(default)/documents/articles/artigo{index:06d}',
+        'createTime': '2025-06-27T10:02:10.948104Z',
+        'updateTime': '2025-06-27T10:02:10.948104Z',
+        'fields': {
+            'title': {'stringValue': f'Inteligência artificial e privacidade #{index}'},
+            'content': {'stringValue': content},
+            'category': {'stringValue': 'Legislação'},
+            'timestamp': {'timestampValue': '2025-06-27T10:02:10.948104Z'},
+            'views': {'integerValue': str(index * 7)},
+            'rating': {'doubleValue': 4.5},
+            'published': {'booleanValue': True},
+            'imageUrl': {'nullValue': None},
+            'tags': {'arrayValue': {'values': [
+                {'stringValue': 'lgpd'},
+                {'stringValue': 'ia'},
+                {'stringValue': 'privacidade'}
+            ]}},
+            'author': {'mapValue': {'fields': {
+                'name': {'stringValue': 'Equipe Sentinela'},
+                'uid': {'stringValue': 'abc123'},
+                'social': {'mapValue': {'fields': {
+                    'links': {'arrayValue': {'values': [
+                        {'stringValue': 'https://sentineladedados.com'}
+                    ]}}
+                }}}
+            }}}
+        }
+    }
+
+
+def measure(label, func, items, repeat):
+    """Executar `func` `repeat` vezes e reportar a melhor vazão"""
+    best = float('inf')
+    # Como o timeit: sem o coletor de lixo interferindo na medição
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - started)
+    finally:
+        gc.enable()
+    rate = items / best
+    print(f"{label:<32} {rate:>12,.0f} docs/s   ({best * 1000:.2f} ms para {items} docs)")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=500)
+    parser.add_argument('--content-size', type=int, default=6000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--json', help='Salvar resultados neste arquivo JSON')
+    args = parser.parse_args()
+
+    documents = [make_article(i, args.content_size) for i in range(args.docs)]
+    decoded = [decode_document(doc) for doc in documents]
+    payload_bytes = len(json.dumps(documents))
+
+    print(f"{args.docs} documentos, {payload_bytes / 1024:.0f} KiB de payload REST\n")
+
+    results = {
+        'decode_legacy': measure('decodificar (antigo)', lambda: [legacy_decode_document(doc) for doc in documents],
+                                 args.docs, args.repeat),
+        'decode': measure('decodificar (codec)', lambda: [decode_document(doc) for doc in documents],
+                          args.docs, args.repeat),
+        'encode_legacy': measure('codificar (antigo)',
+                                 lambda: [convert_to_firestore_fields(doc['data']) for doc in decoded],
+                                 args.docs, args.repeat),
+        'encode': measure('codificar (codec)', lambda: [encode_fields(doc['data']) for doc in decoded],
+                          args.docs, args.repeat)
+    }
+
+    print(f"\nGanho do codec: decodificar {results['decode'] / results['decode_legacy']:.2f}x, "
+          f"codificar {results['encode'] / results['encode_legacy']:.2f}x")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'docs': args.docs, 'content_size': args.content_size, 'docs_per_sec': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,357 @@
+"""Benchmark de carga e latência dos endpoints /api/firebase, /api/newsletter e /api/contact
+
+Sem --url, sobe um Firestore falso (benchmarks/fake_firestore.py) e o backend no
+gunicorn apontado para ele, com banco, cache e logs numa pasta temporária: nada
+vai para a produção nem para os arquivos de data/. Cada cenário roda por
+--duration segundos em cada nível de --concurrency; o resultado (requisições/s e
+latência p50/p95/p99) vai para o JSON de --output e pode ser comparado com um
+baseline guardado (sai com código 1 se houver regressão acima de --tolerance).
+
+Uso (a partir de backend/blog_api):
+    python benchmarks/bench_load.py --output bench.json
+    python benchmarks/bench_load.py --concurrency 1,16 --latency 0.05 --baseline bench.json
+    python benchmarks/bench_load.py --url http://127.0.0.1:5001 --scenarios document_get,collection_list
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Métricas comparadas com o baseline: (chave, maior é melhor?)
+COMPARED_METRICS = [
+    ('throughput', True),
+    ('p50', False),
+    ('p95', False),
+    ('p99', False)
+]
+
+
+class Scenario:
+    """Uma requisição repetida pelo benchmark; `body(n)` e `path(n)` variam a cada chamada"""
+
+    def __init__(self, name, method, path, body=None):
+        self.name = name
+        self.method = method
+        self.path = path if callable(path) else (lambda n, path=path: path)
+        self.body = body
+
+    def request(self, session, base_url, n):
+        body = self.body(n) if self.body else None
+        return session.request(self.method, base_url + self.path(n), json=body, timeout=30)
+
+
+def build_scenarios(docs, run_id):
+    """Cenários de todos os endpoints dos blueprints firebase, newsletter e contact"""
+    docs = max(docs, 1)
+
+    def article(n):
+        return f"art{n % docs:05d}"
+
+    category_where = json.dumps({'field': 'category', 'operator': '==', 'value': 'IA'})
+    return [
+        Scenario('firebase_health', 'GET', '/api/firebase/health'),
+        Scenario('firebase_stats', 'GET', '/api/firebase/stats'),
+        Scenario('collection_list', 'GET', '/api/firebase/firestore/articles?orderBy=timestamp&direction=desc'),
+        Scenario('collection_where', 'GET', f"/api/firebase/firestore/articles?where={category_where}"),
+        Scenario('collection_page', 'GET', lambda n: f"/api/firebase/firestore/comments?pageSize=20&limit={20 + n % 50}"),
+        Scenario('collection_stream', 'GET', '/api/firebase/firestore/likes?stream=true'),
+        Scenario('document_get', 'GET', lambda n: f"/api/firebase/firestore/articles/{article(n)}"),
+        Scenario('document_missing', 'GET', lambda n: f"/api/firebase/firestore/articles/missing{n}"),
+        Scenario('batch_get', 'POST', '/api/firebase/firestore:batchGet', lambda n: {
+            'documents': [f"articles/{article(n + i)}" for i in range(10)]
+        }),
+        Scenario('count', 'GET', lambda n: f"/api/firebase/firestore:count?collection=likes&field=articleId&value=lik{n % 10:05d}"),
+        Scenario('document_create', 'POST', '/api/firebase/firestore/comments', lambda n: {
+            'articleId': article(n), 'author': 'bench', 'text': f'Comentário {run_id}-{n}'
+        }),
+        Scenario('document_set', 'PUT', lambda n: f"/api/firebase/firestore/likes/{run_id}-{n % 100}", lambda n: {
+            'articleId': article(n), 'userId': f'user{n % 100}'
+        }),
+        Scenario('document_update', 'PATCH', lambda n: f"/api/firebase/firestore/comments/com{n % docs:05d}", lambda n: {
+            'text': f'Editado {run_id}-{n}'
+        }),
+        Scenario('commit', 'POST', '/api/firebase/firestore:commit', lambda n: {'writes': [
+            {'operation': 'create', 'collection': 'likes', 'data': {'articleId': article(n), 'userId': f'{run_id}-{n}'}},
+            {'operation': 'update', 'path': f"comments/com{n % docs:05d}", 'data': {'likes': n}}
+        ]}),
+        Scenario('newsletter_subscribe', 'POST', '/api/newsletter/subscribe', lambda n: {
+            'email': f'bench-{run_id}-{n}@example.com'
+        }),
+        Scenario('newsletter_unsubscribe', 'POST', '/api/newsletter/unsubscribe', lambda n: {
+            'email': f'bench-{run_id}-{n}@example.com'
+        }),
+        Scenario('newsletter_subscribers', 'GET', '/api/newsletter/subscribers'),
+        Scenario('contact_submit', 'POST', '/api/contact', lambda n: {
+            'name': 'Benchmark', 'email': 'bench@example.com', 'subject': f'Teste {n}',
+            'message': 'Mensagem enviada pelo benchmark de carga.'
+        }),
+        Scenario('contacts_list', 'GET', '/api/contacts?limit=50')
+    ]
+
+
+def percentile(sorted_values, fraction):
+    """Percentil pelo método nearest-rank (valores já ordenados)"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_level(scenario, base_url, concurrency, duration, warmup):
+    """Rodar `scenario` com `concurrency` clientes por `duration` segundos"""
+    counter = iter(range(10 ** 12))
+    counter_lock = threading.Lock()
+    latencies = [[] for _ in range(concurrency)]
+    statuses = [{} for _ in range(concurrency)]
+    errors = [0] * concurrency
+    start = threading.Barrier(concurrency + 1)
+
+    def next_n():
+        with counter_lock:
+            return next(counter)
+
+    def client(index):
+        session = requests.Session()
+        # Conexão aberta (e caches aquecidos) antes da medição
+        for _ in range(warmup):
+            try:
+                scenario.request(session, base_url, next_n())
+            except requests.RequestException:
+                pass
+        start.wait()
+        deadline = time.perf_counter() + duration
+        while True:
+            n = next_n()
+            began = time.perf_counter()
+            if began >= deadline:
+                break
+            try:
+                response = scenario.request(session, base_url, n)
+                response.content
+                status = response.status_code
+            except requests.RequestException:
+                status = 'exception'
+            latencies[index].append(time.perf_counter() - began)
+            statuses[index][status] = statuses[index].get(status, 0) + 1
+            if status == 'exception' or status >= 500:
+                errors[index] += 1
+        session.close()
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    began = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+
+    samples = sorted(value for values in latencies for value in values)
+    status_counts = {}
+    for counts in statuses:
+        for status, count in counts.items():
+            status_counts[str(status)] = status_counts.get(str(status), 0) + count
+
+    def ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        'scenario': scenario.name,
+        'concurrency': concurrency,
+        'requests': len(samples),
+        'errors': sum(errors),
+        'statuses': status_counts,
+        'throughput': round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        'mean': ms(sum(samples) / len(samples)) if samples else None,
+        'p50': ms(percentile(samples, 0.50)),
+        'p95': ms(percentile(samples, 0.95)),
+        'p99': ms(percentile(samples, 0.99)),
+        'max': ms(samples[-1]) if samples else None
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Regressões em relação ao baseline: vazão menor ou latência maior que a tolerância"""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS:
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append({
+                    'benchmark': key,
+                    'metric': metric,
+                    'baseline': old,
+                    'current': new,
+                    'change': round(change, 4)
+                })
+    return regressions
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Processo terminou antes de responder em {url} (código {process.returncode})")
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} não respondeu em {timeout} segundos")
+
+
+def start_servers(args, workdir):
+    """Subir o Firestore falso e o backend (gunicorn); retorna (url do backend, processos)"""
+    processes = []
+    firestore_port = free_port()
+    processes.append(subprocess.Popen([
+        sys.executable, os.path.join(BACKEND_DIR, 'benchmarks', 'fake_firestore.py'),
+        '--port', str(firestore_port), '--latency', str(args.latency), '--jitter', str(args.jitter),
+        '--docs', str(args.docs), '--content-size', str(args.content_size)
+    ], stdout=subprocess.DEVNULL))
+    firestore_url = f"http://127.0.0.1:{firestore_port}/v1"
+    wait_until_ready(f"{firestore_url}/projects/bench/databases/(default)/documents/articles/art00000",
+                     processes[0])
+
+    env = dict(os.environ)
+    env.update({
+        'FIRESTORE_API_URL': firestore_url,
+        'FIREBASE_PROJECT_ID': 'bench',
+        'FIREBASE_API_KEY': 'bench',
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'app.db')}",
+        # Sem envio de emails durante o benchmark
+        'SMTP_USERNAME': '',
+        'SMTP_FROM': ''
+    })
+    backend_port = free_port()
+    command = [
+        sys.executable, '-m', 'gunicorn', '-c', os.path.join(BACKEND_DIR, 'gunicorn.conf.py'),
+        # data/ (cache, diário dos contadores, contatos) fica na pasta temporária
+        '--chdir', workdir, '--pythonpath', BACKEND_DIR,
+        '--bind', f"127.0.0.1:{backend_port}", '--access-logfile', os.devnull
+    ]
+    if args.workers:
+        command += ['--workers', str(args.workers)]
+    log = open(os.path.join(workdir, 'server.log'), 'w')
+    processes.append(subprocess.Popen(command + ['src.main:app'], env=env, stdout=log, stderr=subprocess.STDOUT))
+    backend_url = f"http://127.0.0.1:{backend_port}"
+    wait_until_ready(f"{backend_url}/health", processes[1])
+    return backend_url, processes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='Backend já em execução (sem isso, sobe Firestore falso + gunicorn)')
+    parser.add_argument('--concurrency', default='1,8,32', help='Níveis de concorrência separados por vírgula')
+    parser.add_argument('--duration', type=float, default=5.0, help='Segundos por cenário e nível')
+    parser.add_argument('--warmup', type=int, default=5, help='Requisições de aquecimento por cliente')
+    parser.add_argument('--scenarios', help='Rodar só estes cenários (separados por vírgula)')
+    parser.add_argument('--output', default='bench_load.json', help='Arquivo JSON com os resultados')
+    parser.add_argument('--baseline', help='JSON de uma execução anterior para comparar')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Variação aceita antes de acusar regressão')
+    parser.add_argument('--latency', type=float, default=0.0, help='Latência do Firestore falso (segundos)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Variação aleatória da latência do Firestore falso')
+    parser.add_argument('--docs', type=int, default=200, help='Documentos por coleção no Firestore falso')
+    parser.add_argument('--content-size', type=int, default=6000, help='Tamanho do conteúdo dos artigos (bytes)')
+    parser.add_argument('--workers', type=int, help='Workers do gunicorn (padrão do gunicorn.conf.py)')
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(',') if level.strip()]
+    run_id = datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')
+    scenarios = build_scenarios(args.docs, run_id)
+    if args.scenarios:
+        selected = set(args.scenarios.split(','))
+        unknown = selected - {scenario.name for scenario in scenarios}
+        if unknown:
+            parser.error(f"Cenários desconhecidos: {', '.join(sorted(unknown))}")
+        scenarios = [scenario for scenario in scenarios if scenario.name in selected]
+
+    workdir = tempfile.mkdtemp(prefix='bench_load_')
+    processes = []
+    try:
+        if args.url:
+            base_url = args.url.rstrip('/')
+        else:
+            base_url, processes = start_servers(args, workdir)
+
+        results = {}
+        print(f"{'cenário':<24} {'conc':>4} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'erros':>6}")
+        for scenario in scenarios:
+            for level in levels:
+                result = run_level(scenario, base_url, level, args.duration, args.warmup)
+                results[f"{scenario.name}@{level}"] = result
+                print(f"{scenario.name:<24} {level:>4} {result['throughput']:>10,.1f} {result['p50'] or 0:>9.2f} "
+                      f"{result['p95'] or 0:>9.2f} {result['p99'] or 0:>9.2f} {result['errors']:>6}")
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    report = {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'config': {
+            'url': args.url,
+            'concurrency': levels,
+            'duration': args.duration,
+            'firestore_latency': None if args.url else args.latency,
+            'firestore_jitter': None if args.url else args.jitter,
+            'docs': args.docs,
+            'content_size': args.content_size,
+            'workers': args.workers,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count()
+        },
+        'results': results
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f).get('results', {}), args.tolerance)
+        report['baseline'] = {'path': args.baseline, 'tolerance': args.tolerance, 'regressions': regressions}
+        print()
+        if regressions:
+            print(f"{len(regressions)} regressões acima de {args.tolerance:.0%}:")
+            for item in regressions:
+                print(f"  {item['benchmark']:<28} {item['metric']:<10} {item['baseline']:>10} -> {item['current']:<10} "
+                      f"({item['change']:+.1%})")
+        else:
+            print(f"Sem regressões acima de {args.tolerance:.0%} em relação a {args.baseline}")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados salvos em {args.output}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
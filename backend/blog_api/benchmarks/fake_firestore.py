@@ -0,0 +1,389 @@
+"""Servidor local que imita a API REST do Firestore (para benchmarks e testes manuais)
+
+Guarda os documentos em memória e responde às chamadas que o proxy usa: GET de
+coleção/documento (pageSize, pageToken, orderBy, mask), POST de criação, PATCH
+(updateMask), DELETE, :runQuery, :runAggregationQuery (count), :batchGet e :commit
+(update, delete e increments). Latência e tamanho dos documentos são configuráveis.
+
+Uso (a partir de backend/blog_api):
+    python benchmarks/fake_firestore.py [--port 8089] [--latency 0.05] [--jitter 0.02]
+                                        [--docs 200] [--content-size 6000]
+
+e o backend apontado para ele:
+    FIRESTORE_API_URL=http://127.0.0.1:8089/v1 FIREBASE_PROJECT_ID=demo FIREBASE_API_KEY=demo python src/main.py
+"""
+import argparse
+import base64
+import json
+import random
+import socket
+import string
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+DOCUMENTS_MARKER = '/documents'
+CATEGORIES = ['IA', 'Big Data', 'Cibersegurança', 'Legislação', 'Humor']
+PARAGRAPH = (
+    'A Lei Geral de Proteção de Dados estabelece regras sobre coleta, armazenamento, '
+    'tratamento e compartilhamento de dados pessoais, impondo mais proteção e '
+    'penalidades para o não cumprimento. '
+)
+AUTO_ID_ALPHABET = string.ascii_letters + string.digits
+
+# Operadores do fieldFilter comparados pela ordem de value_key
+COMPARISONS = {
+    'EQUAL': lambda a, b: a == b,
+    'NOT_EQUAL': lambda a, b: a != b,
+    'LESS_THAN': lambda a, b: a < b,
+    'LESS_THAN_OR_EQUAL': lambda a, b: a <= b,
+    'GREATER_THAN': lambda a, b: a > b,
+    'GREATER_THAN_OR_EQUAL': lambda a, b: a >= b
+}
+
+
+def now_timestamp():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def value_key(value):
+    """Chave de ordenação de um valor do Firestore (tipos na ordem do Firestore)"""
+    if value is None or 'nullValue' in value:
+        return (0, 0)
+    if 'booleanValue' in value:
+        return (1, value['booleanValue'])
+    for kind in ('integerValue', 'doubleValue'):
+        if kind in value:
+            return (2, float(value[kind]))
+    if 'timestampValue' in value:
+        return (3, value['timestampValue'])
+    if 'stringValue' in value:
+        return (4, value['stringValue'])
+    return (9, json.dumps(value, sort_keys=True))
+
+
+def array_keys(value):
+    return [value_key(item) for item in (value or {}).get('arrayValue', {}).get('values', [])]
+
+
+def split_name(name):
+    """"projects/p/databases/(default)/documents/articles/abc" -> ("articles", "abc")"""
+    return name.split(DOCUMENTS_MARKER + '/', 1)[1].rsplit('/', 1)
+
+
+class Store:
+    """Documentos em memória: caminho da coleção -> {id: {fields, createTime, updateTime}}"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.collections = {}
+
+    def seed(self, collection, count, content_size):
+        """Criar `count` artigos parecidos com os do blog, com `content_size` bytes de conteúdo"""
+        content = (PARAGRAPH * (content_size // len(PARAGRAPH) + 1))[:content_size]
+        for index in range(count):
+            self.put(collection, f'{collection[:3]}{index:05d}', {
+                'title': {'stringValue': f'Inteligência artificial e privacidade #{index}'},
+                'excerpt': {'stringValue': content[:160]},
+                'content': {'stringValue': content},
+                'category': {'stringValue': CATEGORIES[index % len(CATEGORIES)]},
+                'timestamp': {'timestampValue': f'2025-06-{index % 28 + 1:02d}T10:00:{index % 60:02d}Z'},
+                'views': {'integerValue': str(index * 3)},
+                'published': {'booleanValue': True},
+                'articleId': {'stringValue': f'{collection[:3]}{index % 10:05d}'},
+                'tags': {'arrayValue': {'values': [{'stringValue': 'dados'}, {'stringValue': 'ia'}]}}
+            })
+
+    def get(self, collection, doc_id):
+        return self.collections.get(collection, {}).get(doc_id)
+
+    def items(self, collection):
+        with self.lock:
+            return sorted(self.collections.get(collection, {}).items())
+
+    def put(self, collection, doc_id, fields, mask=None):
+        """Gravar (set) ou, com `mask`, atualizar só os campos listados"""
+        with self.lock:
+            documents = self.collections.setdefault(collection, {})
+            existing = documents.get(doc_id)
+            if existing is not None and mask is not None:
+                merged = dict(existing['fields'])
+                for path in mask:
+                    if path in fields:
+                        merged[path] = fields[path]
+                    else:
+                        merged.pop(path, None)
+                fields = merged
+            timestamp = now_timestamp()
+            doc = {
+                'fields': fields,
+                'createTime': existing['createTime'] if existing else timestamp,
+                'updateTime': timestamp
+            }
+            documents[doc_id] = doc
+            return doc
+
+    def increment(self, collection, doc_id, transforms):
+        """Aplicar fieldTransforms de increment; retorna os valores resultantes"""
+        with self.lock:
+            documents = self.collections.setdefault(collection, {})
+            timestamp = now_timestamp()
+            doc = documents.setdefault(doc_id, {'fields': {}, 'createTime': timestamp, 'updateTime': timestamp})
+            results = []
+            for transform in transforms:
+                current = doc['fields'].get(transform['fieldPath'], {}).get('integerValue', 0)
+                value = {'integerValue': str(int(current) + int(transform['increment']['integerValue']))}
+                doc['fields'][transform['fieldPath']] = value
+                results.append(value)
+            doc['updateTime'] = timestamp
+            return results
+
+    def delete(self, collection, doc_id):
+        with self.lock:
+            self.collections.get(collection, {}).pop(doc_id, None)
+
+
+class FirestoreHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    store = None
+    latency = 0.0
+    jitter = 0.0
+
+    def setup(self):
+        super().setup()
+        # Cabeçalhos e corpo saem em escritas separadas: sem isto o Nagle + ACK
+        # atrasado do cliente somam ~40 ms a cada resposta
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path, params = self._parse()
+        collection, doc_id = self._split_path(path)
+        mask = params.get('mask.fieldPaths')
+
+        if doc_id is None:
+            items = self.store.items(collection)
+            if params.get('orderBy'):
+                field, _, direction = params['orderBy'][0].partition(' ')
+                items.sort(key=lambda item: value_key(item[1]['fields'].get(field)), reverse=direction == 'desc')
+            start = int(base64.b64decode(params['pageToken'][0])) if params.get('pageToken') else 0
+            size = int(params.get('pageSize', ['300'])[0])
+            result = {'documents': [self._document(collection, key, doc, mask) for key, doc in items[start:start + size]]}
+            if start + size < len(items):
+                result['nextPageToken'] = base64.b64encode(str(start + size).encode()).decode()
+            return self._send(200, result)
+
+        doc = self.store.get(collection, doc_id)
+        if doc is None:
+            return self._not_found()
+        return self._send(200, self._document(collection, doc_id, doc, mask))
+
+    def do_POST(self):
+        path, _ = self._parse()
+        body = self._body()
+        if path.startswith(':runQuery'):
+            return self._send(200, self._run_query(body['structuredQuery']))
+        if path.startswith(':runAggregationQuery'):
+            aggregation = body['structuredAggregationQuery']
+            count = sum(1 for row in self._run_query(aggregation['structuredQuery']) if 'document' in row)
+            alias = aggregation['aggregations'][0].get('alias', 'field_1')
+            return self._send(200, [{
+                'result': {'aggregateFields': {alias: {'integerValue': str(count)}}},
+                'readTime': now_timestamp()
+            }])
+        if path.startswith(':batchGet'):
+            return self._send(200, [self._batch_get(name) for name in body.get('documents', [])])
+        if path.startswith(':commit'):
+            return self._send(200, {
+                'writeResults': [self._commit_write(write) for write in body.get('writes', [])],
+                'commitTime': now_timestamp()
+            })
+
+        collection, doc_id = self._split_path(path + '/')
+        doc_id = doc_id or ''.join(random.choices(AUTO_ID_ALPHABET, k=20))
+        doc = self.store.put(collection, doc_id, body.get('fields', {}))
+        return self._send(200, self._document(collection, doc_id, doc))
+
+    def do_PATCH(self):
+        path, params = self._parse()
+        collection, doc_id = self._split_path(path)
+        doc = self.store.put(collection, doc_id, self._body().get('fields', {}), params.get('updateMask.fieldPaths'))
+        return self._send(200, self._document(collection, doc_id, doc))
+
+    def do_DELETE(self):
+        path, _ = self._parse()
+        self.store.delete(*self._split_path(path))
+        return self._send(200, {})
+
+    def _batch_get(self, name):
+        collection, doc_id = split_name(name)
+        doc = self.store.get(collection, doc_id)
+        if doc is None:
+            return {'missing': name, 'readTime': now_timestamp()}
+        return {'found': self._document(collection, doc_id, doc), 'readTime': now_timestamp()}
+
+    def _commit_write(self, write):
+        if 'delete' in write:
+            self.store.delete(*split_name(write['delete']))
+            return {'updateTime': now_timestamp()}
+        if 'update' in write:
+            collection, doc_id = split_name(write['update']['name'])
+            mask = write.get('updateMask', {}).get('fieldPaths')
+            self.store.put(collection, doc_id, write['update'].get('fields', {}), mask)
+            transforms = write.get('updateTransforms', [])
+        else:
+            collection, doc_id = split_name(write['transform']['document'])
+            transforms = write['transform'].get('fieldTransforms', [])
+        return {
+            'updateTime': now_timestamp(),
+            'transformResults': self.store.increment(collection, doc_id, transforms) if transforms else []
+        }
+
+    def _run_query(self, query):
+        collection = query['from'][0]['collectionId']
+        items = self.store.items(collection)
+        if 'where' in query:
+            items = [item for item in items if self._matches(item[1]['fields'], query['where'])]
+
+        orders = query.get('orderBy', [])
+        for order in reversed(orders):
+            field = order['field']['fieldPath']
+            descending = order.get('direction') == 'DESCENDING'
+            if field == '__name__':
+                items.sort(key=lambda item: item[0], reverse=descending)
+            else:
+                items.sort(key=lambda item: value_key(item[1]['fields'].get(field)), reverse=descending)
+
+        if 'startAt' in query:
+            items = items[self._cursor_index(items, orders, query['startAt']):]
+        items = items[query.get('offset', 0):]
+        if 'limit' in query:
+            items = items[:int(query['limit'])]
+        if not items:
+            return [{'readTime': now_timestamp()}]
+        return [{'document': self._document(collection, key, doc), 'readTime': now_timestamp()} for key, doc in items]
+
+    def _matches(self, fields, condition):
+        if 'compositeFilter' in condition:
+            return all(self._matches(fields, part) for part in condition['compositeFilter']['filters'])
+        if 'unaryFilter' in condition:
+            unary = condition['unaryFilter']
+            is_null = value_key(fields.get(unary['field']['fieldPath'])) == (0, 0)
+            return is_null if unary['op'] == 'IS_NULL' else not is_null
+
+        field_filter = condition['fieldFilter']
+        value = fields.get(field_filter['field']['fieldPath'])
+        target = field_filter['value']
+        op = field_filter['op']
+        if value is None:
+            return False
+        if op in COMPARISONS:
+            return COMPARISONS[op](value_key(value), value_key(target))
+        if op == 'IN':
+            return value_key(value) in array_keys(target)
+        if op == 'NOT_IN':
+            return value_key(value) not in array_keys(target)
+        if op == 'ARRAY_CONTAINS':
+            return value_key(target) in array_keys(value)
+        if op == 'ARRAY_CONTAINS_ANY':
+            return bool(set(array_keys(target)) & set(array_keys(value)))
+        return False
+
+    @staticmethod
+    def _cursor_index(items, orders, cursor):
+        """Posição do cursor startAt (valores dos campos de orderBy, __name__ por último)"""
+        target = [
+            value['referenceValue'].rsplit('/', 1)[1] if 'referenceValue' in value else value_key(value)
+            for value in cursor['values']
+        ]
+        for index, (key, doc) in enumerate(items):
+            position = [
+                key if order['field']['fieldPath'] == '__name__' else value_key(doc['fields'].get(order['field']['fieldPath']))
+                for order in orders[:len(target)]
+            ]
+            if position == target:
+                return index if cursor.get('before') else index + 1
+        return 0
+
+    def _parse(self):
+        """Caminho depois de /documents (ex.: "/articles/abc", ":runQuery") e parâmetros"""
+        parsed = urlparse(self.path)
+        index = parsed.path.find(DOCUMENTS_MARKER)
+        return parsed.path[index + len(DOCUMENTS_MARKER):], parse_qs(parsed.query)
+
+    @staticmethod
+    def _split_path(path):
+        """"/articles" -> ("articles", None); "/articles/abc/counter_shards/0" -> ("articles/abc/counter_shards", "0")"""
+        segments = [segment for segment in path.split('/') if segment]
+        if len(segments) % 2 == 1:
+            return '/'.join(segments), None
+        return '/'.join(segments[:-1]), segments[-1]
+
+    def _document(self, collection, doc_id, doc, mask=None):
+        fields = doc['fields']
+        if mask is not None:
+            fields = {key: value for key, value in fields.items() if key in mask}
+        return {
+            'name': f"projects/{self._project()}/databases/(default)/documents/{collection}/{doc_id}",
+            'fields': fields,
+            'createTime': doc['createTime'],
+            'updateTime': doc['updateTime']
+        }
+
+    def _project(self):
+        parts = urlparse(self.path).path.split('/')
+        return parts[parts.index('projects') + 1] if 'projects' in parts else 'demo'
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def _not_found(self):
+        return self._send(404, {'error': {'code': 404, 'message': 'Document not found', 'status': 'NOT_FOUND'}})
+
+    def _send(self, status, payload):
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def create_server(host='127.0.0.1', port=0, latency=0.0, jitter=0.0, docs=200, content_size=6000,
+                  collections=('articles', 'likes', 'comments')):
+    """Servidor pronto para serve_forever(), com as coleções já populadas (port=0: porta livre)"""
+    store = Store()
+    for collection in collections:
+        store.seed(collection, docs, content_size)
+    handler = type('Handler', (FirestoreHandler,), {'store': store, 'latency': latency, 'jitter': jitter})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.0, help='Atraso fixo de cada resposta (segundos)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Atraso extra aleatório de até N segundos')
+    parser.add_argument('--docs', type=int, default=200, help='Documentos por coleção')
+    parser.add_argument('--content-size', type=int, default=6000, help='Tamanho do campo content (bytes)')
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, args.latency, args.jitter, args.docs, args.content_size)
+    print(f"Firestore falso em http://{args.host}:{server.server_address[1]}/v1 "
+          f"({args.docs} documentos por coleção, latência {args.latency * 1000:.0f} ms)")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
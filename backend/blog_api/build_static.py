@@ -0,0 +1,49 @@
+"""Build dos arquivos estáticos do site servidos pelo backend
+
+Gera em dist/static (STATIC_DIST_DIR) cada arquivo com o hash do conteúdo no
+nome, as referências do HTML/JS/CSS reescritas para esses nomes, os irmãos
+.gz/.br e o manifest.json lido pelo serve() do main.py na inicialização.
+
+Uso (a partir de backend/blog_api):
+    python build_static.py [--source DIR ...] [--output DIR]
+"""
+import argparse
+import os
+import shutil
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+from src.services.static_assets import STATIC_DIST_DIR, build_assets, write_assets
+
+# src/static (favicon) e o site na raiz do repositório; a última pasta vence em conflitos
+DEFAULT_SOURCES = [
+    os.path.join(BASE_DIR, 'src', 'static'),
+    os.path.normpath(os.path.join(BASE_DIR, '..', '..'))
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source', action='append', help='pasta de origem (pode repetir)')
+    parser.add_argument('--output', default=os.path.join(BASE_DIR, STATIC_DIST_DIR))
+    args = parser.parse_args()
+
+    sources = args.source or DEFAULT_SOURCES
+    assets = build_assets(sources)
+
+    # Build limpo: arquivos com hash antigos não ficam para trás
+    if os.path.isdir(args.output):
+        shutil.rmtree(args.output)
+    manifest = write_assets(assets, args.output)
+
+    original = sum(len(asset['body']) for asset in assets.values())
+    compressed = sum(min([len(asset['body'])] + [len(v) for v in asset['variants'].values()])
+                     for asset in assets.values())
+    print(f"{len(manifest['files'])} arquivos em {args.output} "
+          f"({original} bytes; {compressed} bytes com a melhor compressão)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+# Presença deste arquivo faz o pytest pôr backend/blog_api no sys.path (import de src.*)
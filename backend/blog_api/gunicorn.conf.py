@@ -0,0 +1,91 @@
+import multiprocessing
+import os
+
+# Servidor de produção (a partir de backend/blog_api):
+#
+#   gunicorn -c gunicorn.conf.py src.main:app
+#
+# Recarga sem derrubar conexões:
+#   kill -HUP <pid do master>    novos workers com a configuração relida
+#   kill -USR2 <pid do master>   novo master com o código novo; depois QUIT no antigo
+# (com preload_app o HUP não relê o código: ele já está carregado no master)
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5001')
+# Caminhos relativos (data/, .env) são resolvidos a partir de backend/blog_api
+chdir = os.path.dirname(os.path.abspath(__file__))
+
+# Workers pré-forkados conforme o número de CPUs
+workers = int(os.getenv('GUNICORN_WORKERS', str(multiprocessing.cpu_count() * 2 + 1)))
+# "gthread" (threads por worker) ou "gevent" (requer pip install gevent)
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '1000'))
+
+# App carregado uma vez no master: os workers herdam o import e as consultas
+# quentes já carregadas (warm-up) em vez de repetir tudo
+preload_app = os.getenv('GUNICORN_PRELOAD', '1').lower() in ('1', 'true')
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+# Reciclar workers aos poucos (vazamentos de memória), com jitter para não reiniciar todos juntos
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '10000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '1000'))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+if worker_class == 'gevent':
+    # Precisa acontecer antes de o app importar socket/threading/requests
+    from gevent import monkey
+    monkey.patch_all()
+
+# Um cache de leitura para todos os workers (arquivo SQLite) em vez de N caches frios
+os.environ.setdefault('FIRESTORE_CACHE_BACKEND', 'sqlite')
+# Métricas de cada worker gravadas numa pasta comum: o /metrics de qualquer um soma todos
+os.environ.setdefault('METRICS_MULTIPROC_DIR', 'data/metrics')
+# Threads de segundo plano só nos workers (post_worker_init), nunca no master
+os.environ['DEFER_BACKGROUND_SERVICES'] = '1'
+
+
+def on_starting(server):
+    """Métricas de uma execução anterior do master não entram na soma desta"""
+    directory = os.path.join(chdir, os.environ['METRICS_MULTIPROC_DIR'])
+    if os.path.isdir(directory):
+        for filename in os.listdir(directory):
+            if filename.endswith('.json'):
+                os.remove(os.path.join(directory, filename))
+
+
+def post_worker_init(worker):
+    """Depois do fork (e do monkey patch do gevent): conexões próprias e threads do worker"""
+    from src.main import app, start_background_services
+    from src.models.user import db
+    from src.services.firestore_client import firestore_client
+    from src.services.metrics import metrics
+
+    # Conexões abertas no master (warm-up, migrações) não podem ser compartilhadas
+    firestore_client.reset()
+    with app.app_context():
+        db.engine.dispose(close=False)
+    # Chamadas feitas no master (warm-up) seriam contadas uma vez por worker: as
+    # métricas registradas são zeradas e as dos coletores (estatísticas dos caches,
+    # consultas quentes e singleflight) passam a ser exportadas desde este ponto
+    metrics.reset()
+
+    start_background_services()
+
+
+def child_exit(server, worker):
+    """No master: contadores do worker que saiu vão para o arquivo dos mortos"""
+    from src.services.metrics import metrics
+    metrics.mark_process_dead(worker.pid)
+
+
+def worker_exit(server, worker):
+    """Encerramento gracioso: deixar os envios de email em andamento terminarem"""
+    from src.services.mail_queue import mail_queue
+    from src.services.metrics import metrics
+    mail_queue.stop()
+    # Últimas métricas do worker (os contadores continuam somados depois que ele sai)
+    metrics.write_snapshot()
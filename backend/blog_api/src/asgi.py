@@ -0,0 +1,44 @@
+import os
+import sys
+from contextlib import asynccontextmanager
+
+# DON'T CHANGE THIS !!!
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.routing import Mount
+
+from src.main import app as flask_app
+from src.routes.firebase_proxy_async import routes as firebase_routes
+from src.services.firestore_async_client import async_firestore_client
+from src.services.metrics import ASGIMetricsMiddleware
+
+# Ponto de entrada ASGI: as rotas /api/firebase/* rodam em asyncio (uma conexão
+# esperando o Firestore não prende um worker); o resto continua no app Flask.
+#
+#   uvicorn src.asgi:app --host 0.0.0.0 --port 5001
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    await async_firestore_client.aclose()
+
+app = Starlette(
+    routes=firebase_routes + [
+        Mount('/', app=WSGIMiddleware(flask_app, workers=int(os.getenv('ASGI_WSGI_THREADS', '10'))))
+    ],
+    # Métricas das rotas async (as do Flask já são medidas no main.py) e o mesmo
+    # CORS aberto do flask_cors no main.py
+    middleware=[
+        Middleware(ASGIMetricsMiddleware),
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])
+    ],
+    lifespan=lifespan
+)
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=5001)
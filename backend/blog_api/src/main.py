@@ -1,8 +1,9 @@
 import os
 import sys
 from dotenv import load_dotenv
-from flask import Flask, jsonify, send_from_directory
+from flask import Flask, jsonify
 from flask_cors import CORS
+from sqlalchemy import event
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -11,14 +12,38 @@ load_dotenv()
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from src.models.user import db
+from src.models.newsletter import migrate_json_subscribers
 from src.routes.user import user_bp
-from src.routes.firebase_proxy import firebase_bp
+from src.routes.firebase_proxy import firebase_bp, warm_up_hot_queries, init_firestore_mirror
 from src.routes.contact import contact_bp
 from src.routes.newsletter import newsletter_bp
+from src.routes.search import search_bp
+from src.routes.mail import mail_bp
+from src.routes.campaign import campaign_bp
+from src.routes.counters import counters_bp, init_counters
+from src.routes.prerender import prerender_bp, init_prerender, prerendered_response
+from src.routes.metrics import metrics_bp, init_metrics
+from src.services.json_provider import FastJSONProvider
+from src.services.compression import init_compression
+from src.services.static_assets import static_assets, asset_response, STATIC_DIST_DIR
+from src.services.contact_log import contact_log
+from src.services.counters import counter_service
+from src.services.firestore_mirror import firestore_mirror
+from src.services.hot_queries import hot_queries
+from src.services.metrics import metrics
+from src.services.mail_queue import mail_queue, mail_configured
+from src.services.prerender import prerender_service
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT')
 
+# JSON rápido (orjson, se instalado) e compressão gzip/brotli das respostas
+app.json = FastJSONProvider(app)
+init_compression(app)
+
+# Métricas (latência por rota e status, tamanho das respostas, em andamento) em /metrics
+init_metrics(app)
+
 # Habilitar CORS para todas as rotas
 CORS(app)
 
@@ -27,13 +52,88 @@ app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(firebase_bp, url_prefix='/api/firebase')
 app.register_blueprint(contact_bp, url_prefix='/api')
 app.register_blueprint(newsletter_bp, url_prefix='/api')
+app.register_blueprint(search_bp, url_prefix='/api')
+app.register_blueprint(mail_bp, url_prefix='/api')
+app.register_blueprint(campaign_bp, url_prefix='/api')
+app.register_blueprint(counters_bp, url_prefix='/api')
+app.register_blueprint(prerender_bp, url_prefix='/api')
+app.register_blueprint(metrics_bp)
 
-# Configuração do banco de dados
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+# Configuração do banco de dados (DATABASE_URL permite um banco separado, ex.: nos benchmarks)
+app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv(
+    'DATABASE_URL', f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db.init_app(app)
+
+def configure_sqlite(dbapi_connection, connection_record):
+    """WAL permite leituras concorrentes com uma escrita; busy_timeout evita
+    "database is locked" quando vários workers escrevem ao mesmo tempo"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA busy_timeout=5000')
+    cursor.close()
+
 with app.app_context():
+    event.listen(db.engine, 'connect', configure_sqlite)
     db.create_all()
+    
+    # Migração única dos inscritos do antigo arquivo JSON
+    try:
+        migrated = migrate_json_subscribers('data/newsletter_subscribers.json')
+        if migrated:
+            print(f"{migrated} inscritos da newsletter migrados para o banco de dados")
+    except Exception as e:
+        print(f"Erro ao migrar inscritos da newsletter: {e}")
+
+    # Migração única dos contatos do antigo arquivo JSON para o log JSONL
+    try:
+        migrated = contact_log.migrate_json('data/contacts.json')
+        if migrated:
+            print(f"{migrated} contatos migrados para o log de contatos")
+    except Exception as e:
+        print(f"Erro ao migrar contatos: {e}")
+
+    # Espelho local das coleções do Firestore: leituras respondidas pelo SQLite
+    # depois da primeira sincronização (mantida em segundo plano)
+    init_firestore_mirror(db.engine)
+
+# Contadores (visualizações, curtidas) gravados num diário local e enviados em lote
+init_counters()
+
+# Consultas quentes (página inicial, categorias, artigos recentes) carregadas antes
+# de aceitar tráfego; depois são atualizadas em segundo plano
+warm_up_hot_queries()
+
+# Arquivos do site em memória: o build de build_static.py (nomes com hash, .gz/.br)
+# ou, sem build, a pasta static processada aqui mesmo na inicialização
+if not static_assets.load(os.path.join(os.path.dirname(os.path.dirname(__file__)), STATIC_DIST_DIR)):
+    static_assets.load_sources([app.static_folder])
+
+# Páginas de artigos e categorias pré-renderizadas a partir do Firestore (usa os
+# templates article.html/category.html carregados acima)
+init_prerender()
+
+def start_background_services():
+    """Iniciar as threads de segundo plano deste processo (uma vez; de novo após um fork)
+
+    Workers da fila de emails, envio dos contadores, sincronização do espelho,
+    atualização das consultas quentes, geração das páginas pré-renderizadas e
+    gravação das métricas. No gunicorn (gunicorn.conf.py) o app é carregado no
+    master e isto roda em cada worker depois do fork.
+    """
+    if mail_configured():
+        mail_queue.start()
+    counter_service.start()
+    firestore_mirror.start()
+    hot_queries.start()
+    prerender_service.start()
+    metrics.start()
+
+# Threads iniciadas no master do gunicorn não existiriam nos workers
+if os.getenv('DEFER_BACKGROUND_SERVICES', '').lower() not in ('1', 'true'):
+    start_background_services()
 
 # Rota de health check
 @app.route('/health')
@@ -55,6 +155,11 @@ def api_info():
             'firebase': '/api/firebase/*',
             'contact': '/api/contact',
             'newsletter': '/api/newsletter/*',
+            'search': '/api/search',
+            'mail': '/api/mail/queue',
+            'counters': '/api/counters/*',
+            'prerender': '/api/prerender/*',
+            'metrics': '/metrics',
             'users': '/api/users/*'
         }
     })
@@ -78,19 +183,19 @@ def internal_error(error):
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-        return "Static folder not configured", 404
-
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return "index.html not found", 404
+    # article.html?id= e category.html?cat= já renderizados com os dados, quando existirem
+    prerendered = prerendered_response(path)
+    if prerendered is not None:
+        return prerendered
+
+    # Caminhos desconhecidos caem no index.html (SPA), resolvido na carga
+    asset = static_assets.lookup(path)
+    if asset is None:
+        return "index.html not found", 404
+    return asset_response(asset)
 
+# Desenvolvimento: servidor do Flask em um processo. Produção:
+#   gunicorn -c gunicorn.conf.py src.main:app
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5001, debug=True)
 
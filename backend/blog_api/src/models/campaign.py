@@ -0,0 +1,49 @@
+from src.models.user import db
+
+class Campaign(db.Model):
+    __tablename__ = 'newsletter_campaign'
+
+    id = db.Column(db.Integer, primary_key=True)
+    subject = db.Column(db.String(255), nullable=False)
+    html_body = db.Column(db.Text, nullable=False)
+    text_body = db.Column(db.Text, nullable=False)
+    # draft -> sending -> sent (ou paused, que pode voltar a sending)
+    status = db.Column(db.String(20), nullable=False, default='draft')
+    created_at = db.Column(db.String(32), nullable=False)
+    started_at = db.Column(db.String(32))
+    finished_at = db.Column(db.String(32))
+    # Checkpoint: maior id de inscrito já reservado para esta campanha
+    last_subscriber_id = db.Column(db.Integer, nullable=False, default=0)
+    sent_count = db.Column(db.Integer, nullable=False, default=0)
+    failed_count = db.Column(db.Integer, nullable=False, default=0)
+    # Tempo efetivo de envio, somado entre execuções (para calcular msgs/s)
+    send_seconds = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f'<Campaign {self.id} {self.subject}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'subject': self.subject,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'sent': self.sent_count,
+            'failed': self.failed_count,
+            'send_seconds': round(self.send_seconds, 3),
+            'msgs_per_sec': round(self.sent_count / self.send_seconds, 2) if self.send_seconds else None
+        }
+
+class CampaignDelivery(db.Model):
+    __tablename__ = 'newsletter_campaign_delivery'
+    # Um inscrito recebe cada campanha no máximo uma vez, mesmo após retomadas
+    __table_args__ = (db.UniqueConstraint('campaign_id', 'subscriber_id'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    campaign_id = db.Column(db.Integer, db.ForeignKey('newsletter_campaign.id'), nullable=False)
+    subscriber_id = db.Column(db.Integer, nullable=False)
+    # sending (reservado), sent, retry (falha temporária, reenviada) ou failed
+    status = db.Column(db.String(20), nullable=False, default='sending')
+    error = db.Column(db.String(500))
@@ -0,0 +1,37 @@
+from src.models.user import db
+
+class MirroredDocument(db.Model):
+    __tablename__ = 'firestore_mirror_document'
+    __table_args__ = (db.UniqueConstraint('collection', 'doc_id'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    collection = db.Column(db.String(255), nullable=False)
+    doc_id = db.Column(db.String(255), nullable=False)
+    # Campos já decodificados ({campo: valor}) em JSON, consultados com json_extract
+    data = db.Column(db.Text, nullable=False)
+    # updateTime do Firestore, como veio na resposta (também nas escritas feitas pelo proxy);
+    # uma versão só substitui outra com updateTime igual ou maior
+    update_time = db.Column(db.String(64), nullable=False)
+
+    def __repr__(self):
+        return f'<MirroredDocument {self.collection}/{self.doc_id}>'
+
+class MirrorState(db.Model):
+    __tablename__ = 'firestore_mirror_state'
+
+    collection = db.Column(db.String(255), primary_key=True)
+    # Já houve uma sincronização completa (informativo: cada processo só lê do
+    # espelho depois de ele mesmo sincronizar)
+    ready = db.Column(db.Boolean, nullable=False, default=False)
+    last_sync_at = db.Column(db.String(32))
+    last_error = db.Column(db.String(500))
+    document_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'collection': self.collection,
+            'ready': self.ready,
+            'last_sync_at': self.last_sync_at,
+            'last_error': self.last_error,
+            'documents': self.document_count
+        }
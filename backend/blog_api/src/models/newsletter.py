@@ -0,0 +1,70 @@
+import json
+import os
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from src.models.user import db
+
+class NewsletterSubscriber(db.Model):
+    __tablename__ = 'newsletter_subscriber'
+
+    id = db.Column(db.Integer, primary_key=True)
+    # unique=True cria o índice único usado nas buscas e no upsert por email
+    email = db.Column(db.String(254), unique=True, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='active', index=True)
+    timestamp = db.Column(db.String(32), nullable=False, index=True)
+    ip = db.Column(db.String(45))
+    user_agent = db.Column(db.String(512))
+    source = db.Column(db.String(50))
+    unsubscribed_at = db.Column(db.String(32))
+
+    def __repr__(self):
+        return f'<NewsletterSubscriber {self.email}>'
+
+    def to_dict(self):
+        result = {
+            'email': self.email,
+            'timestamp': self.timestamp,
+            'ip': self.ip,
+            'user_agent': self.user_agent,
+            'status': self.status,
+            'source': self.source
+        }
+        if self.unsubscribed_at:
+            result['unsubscribed_at'] = self.unsubscribed_at
+        return result
+
+def migrate_json_subscribers(subscribers_file):
+    """Importar (uma única vez) os inscritos do antigo arquivo JSON
+
+    Emails já existentes no banco são mantidos; o arquivo é renomeado para
+    .migrated no final para não ser importado de novo.
+    """
+    if not os.path.exists(subscribers_file):
+        return 0
+
+    with open(subscribers_file, 'r', encoding='utf-8') as f:
+        subscribers = json.load(f)
+
+    imported = 0
+    for subscriber in subscribers:
+        email = (subscriber.get('email') or '').strip().lower()
+        if not email:
+            continue
+        stmt = sqlite_insert(NewsletterSubscriber).values(
+            email=email,
+            status=subscriber.get('status', 'active'),
+            timestamp=subscriber.get('timestamp', ''),
+            ip=subscriber.get('ip'),
+            user_agent=subscriber.get('user_agent'),
+            source=subscriber.get('source'),
+            unsubscribed_at=subscriber.get('unsubscribed_at')
+        ).on_conflict_do_nothing(index_elements=['email'])
+        imported += db.session.execute(stmt).rowcount
+    db.session.commit()
+
+    try:
+        os.replace(subscribers_file, subscribers_file + '.migrated')
+    except FileNotFoundError:
+        # Outro worker já concluiu a migração
+        pass
+
+    return imported
@@ -0,0 +1,157 @@
+import re
+from datetime import datetime
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy import func
+from src.models.user import db
+from src.models.campaign import Campaign, CampaignDelivery
+from src.services.campaign_sender import campaign_runner
+from src.services.mail_queue import mail_configured
+
+campaign_bp = Blueprint('campaign', __name__)
+
+@campaign_bp.route('/newsletter/campaigns', methods=['POST'])
+def create_campaign():
+    """Endpoint para criar uma campanha da newsletter (apenas para admin)
+
+    Corpo: {"subject": ..., "html": ..., "text": ...}. O marcador
+    {{unsubscribe_url}} é trocado pelo link de cancelamento de cada inscrito.
+    """
+    try:
+        # Em produção, adicionar autenticação de admin
+        data = request.get_json() or {}
+
+        subject = (data.get('subject') or '').strip()
+        html = data.get('html') or ''
+        if not subject or not html.strip():
+            return jsonify({
+                'success': False,
+                'error': 'Campos subject e html são obrigatórios'
+            }), 400
+
+        # Versão em texto derivada do HTML quando não informada
+        text = data.get('text') or re.sub(r'<[^>]+>', '', html)
+
+        campaign = Campaign(
+            subject=subject,
+            html_body=html,
+            text_body=text,
+            status='draft',
+            created_at=datetime.now().isoformat()
+        )
+        db.session.add(campaign)
+        db.session.commit()
+
+        return jsonify({
+            'success': True,
+            'campaign': campaign.to_dict()
+        }), 201
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"Erro ao criar campanha: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Erro ao criar campanha'
+        }), 500
+
+@campaign_bp.route('/newsletter/campaigns', methods=['GET'])
+def list_campaigns():
+    """Endpoint para listar campanhas (apenas para admin)"""
+    try:
+        campaigns = Campaign.query.order_by(Campaign.id.desc()).all()
+        return jsonify({
+            'success': True,
+            'campaigns': [campaign.to_dict() for campaign in campaigns]
+        })
+
+    except Exception as e:
+        print(f"Erro ao listar campanhas: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Erro ao carregar campanhas'
+        }), 500
+
+@campaign_bp.route('/newsletter/campaigns/<int:campaign_id>', methods=['GET'])
+def get_campaign(campaign_id):
+    """Endpoint para acompanhar o progresso de uma campanha (apenas para admin)"""
+    try:
+        campaign = db.session.get(Campaign, campaign_id)
+        if campaign is None:
+            return campaign_not_found()
+
+        deliveries = dict(db.session.query(CampaignDelivery.status, func.count(CampaignDelivery.id)).filter(
+            CampaignDelivery.campaign_id == campaign_id
+        ).group_by(CampaignDelivery.status).all())
+
+        result = campaign.to_dict()
+        # Em envio em qualquer worker (o runner só conhece as deste processo)
+        result['running'] = campaign.status == 'sending'
+        result['deliveries'] = deliveries
+        return jsonify({
+            'success': True,
+            'campaign': result
+        })
+
+    except Exception as e:
+        print(f"Erro ao consultar campanha: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Erro ao consultar campanha'
+        }), 500
+
+@campaign_bp.route('/newsletter/campaigns/<int:campaign_id>/send', methods=['POST'])
+def send_campaign(campaign_id):
+    """Endpoint para iniciar (ou retomar) o envio de uma campanha em segundo plano"""
+    try:
+        if not mail_configured():
+            return jsonify({
+                'success': False,
+                'error': 'Configurações de email não encontradas'
+            }), 503
+
+        campaign = db.session.get(Campaign, campaign_id)
+        if campaign is None:
+            return campaign_not_found()
+        if campaign.status == 'sent':
+            return jsonify({
+                'success': False,
+                'error': 'Esta campanha já foi enviada'
+            }), 409
+
+        if not campaign_runner.start(current_app._get_current_object(), campaign_id):
+            return jsonify({
+                'success': False,
+                'error': 'Esta campanha já está sendo enviada'
+            }), 409
+
+        return jsonify({
+            'success': True,
+            'message': 'Envio da campanha iniciado.'
+        }), 202
+
+    except Exception as e:
+        print(f"Erro ao iniciar campanha: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Erro ao iniciar campanha'
+        }), 500
+
+@campaign_bp.route('/newsletter/campaigns/<int:campaign_id>/pause', methods=['POST'])
+def pause_campaign(campaign_id):
+    """Endpoint para pausar o envio ao fim do lote atual"""
+    if not campaign_runner.pause(campaign_id):
+        return jsonify({
+            'success': False,
+            'error': 'Esta campanha não está sendo enviada'
+        }), 409
+
+    return jsonify({
+        'success': True,
+        'message': 'A campanha será pausada ao fim do lote atual.'
+    })
+
+def campaign_not_found():
+    return jsonify({
+        'success': False,
+        'error': 'Campanha não encontrada'
+    }), 404
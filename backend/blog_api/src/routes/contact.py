@@ -1,13 +1,16 @@
 import os
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from flask import Blueprint, request, jsonify
 from datetime import datetime
-import json
+from src.services.contact_log import contact_log
+from src.services.mail_queue import mail_queue, mail_configured, SMTP_FROM
 
 contact_bp = Blueprint('contact', __name__)
 
+DEFAULT_CONTACTS_LIMIT = 50
+MAX_CONTACTS_LIMIT = 500
+
 @contact_bp.route('/contact', methods=['POST'])
 def submit_contact():
     """Endpoint para processar formulário de contato"""
@@ -42,10 +45,10 @@ def submit_contact():
             'user_agent': request.headers.get('User-Agent', '')
         }
         
-        # Salvar em arquivo (em produção, usar banco de dados)
+        # Salvar no log de contatos (data/contacts/*.jsonl)
         save_contact_to_file(contact_data)
         
-        # Enviar email de notificação (se configurado)
+        # Enfileirar email de notificação (se configurado)
         try:
             send_contact_notification(contact_data)
         except Exception as e:
@@ -65,52 +68,26 @@ def submit_contact():
         }), 500
 
 def save_contact_to_file(contact_data):
-    """Salva dados de contato em arquivo JSON"""
+    """Acrescenta o contato ao log JSONL (sem reler nem reescrever o histórico)"""
     try:
-        contacts_file = 'data/contacts.json'
-        
-        # Criar diretório se não existir
-        os.makedirs(os.path.dirname(contacts_file), exist_ok=True)
-        
-        # Carregar contatos existentes
-        contacts = []
-        if os.path.exists(contacts_file):
-            try:
-                with open(contacts_file, 'r', encoding='utf-8') as f:
-                    contacts = json.load(f)
-            except:
-                contacts = []
-        
-        # Adicionar novo contato
-        contacts.append(contact_data)
-        
-        # Manter apenas os últimos 1000 contatos
-        if len(contacts) > 1000:
-            contacts = contacts[-1000:]
-        
-        # Salvar arquivo
-        with open(contacts_file, 'w', encoding='utf-8') as f:
-            json.dump(contacts, f, ensure_ascii=False, indent=2)
-            
+        contact_log.append(contact_data)
     except Exception as e:
         print(f"Erro ao salvar contato: {e}")
 
 def send_contact_notification(contact_data):
-    """Envia email de notificação para o administrador"""
-    # Configurações de email (usar variáveis de ambiente em produção)
-    smtp_server = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
-    smtp_port = int(os.getenv('SMTP_PORT', '587'))
-    smtp_username = os.getenv('SMTP_USERNAME', '')
-    smtp_password = os.getenv('SMTP_PASSWORD', '')
-    admin_email = os.getenv('ADMIN_EMAIL', 'admin@sentineladedados.com')
-    
-    if not smtp_username or not smtp_password:
+    """Enfileira o email de notificação para o administrador"""
+    if not mail_configured():
         print("Configurações de email não encontradas")
         return
     
-    # Criar mensagem
+    mail_queue.enqueue(build_contact_notification(contact_data))
+
+def build_contact_notification(contact_data):
+    """Monta a mensagem de notificação de novo contato"""
+    admin_email = os.getenv('ADMIN_EMAIL', 'admin@sentineladedados.com')
+    
     msg = MIMEMultipart()
-    msg['From'] = smtp_username
+    msg['From'] = SMTP_FROM
     msg['To'] = admin_email
     msg['Subject'] = f"[Sentinela de Dados] Novo contato: {contact_data['subject']}"
     
@@ -133,34 +110,38 @@ def send_contact_notification(contact_data):
     
     msg.attach(MIMEText(body, 'plain', 'utf-8'))
     
-    # Enviar email
-    with smtplib.SMTP(smtp_server, smtp_port) as server:
-        server.starttls()
-        server.login(smtp_username, smtp_password)
-        server.send_message(msg)
+    return msg
 
 @contact_bp.route('/contacts', methods=['GET'])
 def list_contacts():
-    """Endpoint para listar contatos (apenas para admin)"""
+    """Endpoint para listar contatos (apenas para admin), do mais recente ao mais antigo
+
+    Parâmetros: limit (padrão 50, máximo 500) e cursor (nextCursor da página anterior).
+    """
     try:
         # Em produção, adicionar autenticação de admin
-        contacts_file = 'data/contacts.json'
-        
-        if not os.path.exists(contacts_file):
+        try:
+            limit = int(request.args.get('limit', DEFAULT_CONTACTS_LIMIT))
+        except ValueError:
+            limit = 0
+        if limit < 1 or limit > MAX_CONTACTS_LIMIT:
             return jsonify({
-                'success': True,
-                'contacts': []
-            })
-        
-        with open(contacts_file, 'r', encoding='utf-8') as f:
-            contacts = json.load(f)
-        
-        # Ordenar por data mais recente
-        contacts.sort(key=lambda x: x['timestamp'], reverse=True)
-        
+                'success': False,
+                'error': f'limit deve estar entre 1 e {MAX_CONTACTS_LIMIT}'
+            }), 400
+
+        try:
+            contacts, next_cursor = contact_log.read_newest(limit, request.args.get('cursor'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+
         return jsonify({
             'success': True,
-            'contacts': contacts
+            'contacts': contacts,
+            'nextCursor': next_cursor
         })
         
     except Exception as e:
@@ -169,4 +150,3 @@ def list_contacts():
             'success': False,
             'error': 'Erro ao carregar contatos'
         }), 500
-
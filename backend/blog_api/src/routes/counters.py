@@ -0,0 +1,146 @@
+from flask import Blueprint, request, jsonify
+from src.services.counters import counter_service, SHARDS_COLLECTION
+from src.services.firestore_client import firestore_client
+from src.services.firestore_codec import decode_value
+from src.routes.firebase_proxy import (
+    FIREBASE_API_KEY, FIREBASE_PROJECT_ID, FIRESTORE_BASE_URL, DOCUMENTS_PATH, UpstreamError,
+    parse_firestore_fields
+)
+
+counters_bp = Blueprint('counters', __name__)
+
+# Maior incremento aceito por chamada (em módulo)
+MAX_COUNTER_INCREMENT = 100
+
+@counters_bp.route('/counters/<collection_name>/<doc_id>', methods=['GET'])
+def get_counters(collection_name, doc_id):
+    """Endpoint para ler os contadores de um documento (valor no Firestore + pendentes)"""
+    try:
+        if collection_name not in counter_service.fields:
+            return jsonify({
+                'success': False,
+                'error': 'Coleção sem contadores'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'id': doc_id,
+            'counters': counter_service.get(collection_name, doc_id)
+        })
+
+    except Exception as e:
+        print(f"Erro ao ler contadores de {collection_name}/{doc_id}: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Erro ao ler contadores'
+        }), 500
+
+@counters_bp.route('/counters/<collection_name>/<doc_id>/<field>', methods=['POST'])
+def increment_counter(collection_name, doc_id, field):
+    """Endpoint para incrementar um contador (ex.: visualização, curtida = 1, descurtida = -1)
+
+    Corpo opcional: {"amount": n}. O incremento é gravado no diário local e enviado
+    ao Firestore junto com os demais no próximo ciclo.
+    """
+    try:
+        if not counter_service.allows(collection_name, field):
+            return jsonify({
+                'success': False,
+                'error': 'Contador não encontrado'
+            }), 404
+
+        data = request.get_json(silent=True) or {}
+        amount = data.get('amount', 1)
+        if isinstance(amount, bool) or not isinstance(amount, int) or not 0 < abs(amount) <= MAX_COUNTER_INCREMENT:
+            return jsonify({
+                'success': False,
+                'error': f'amount deve ser um inteiro entre -{MAX_COUNTER_INCREMENT} e {MAX_COUNTER_INCREMENT}, diferente de 0'
+            }), 400
+
+        value = counter_service.increment(collection_name, doc_id, field, amount)
+        return jsonify({
+            'success': True,
+            'id': doc_id,
+            'field': field,
+            'value': value
+        })
+
+    except Exception as e:
+        print(f"Erro ao incrementar contador {collection_name}/{doc_id}.{field}: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Erro ao incrementar contador'
+        }), 500
+
+@counters_bp.route('/counters/stats', methods=['GET'])
+def counter_stats():
+    """Endpoint para acompanhar os contadores pendentes e as escritas economizadas"""
+    try:
+        return jsonify({
+            'success': True,
+            'stats': counter_service.stats()
+        })
+
+    except Exception as e:
+        print(f"Erro ao consultar contadores: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Erro ao consultar contadores'
+        }), 500
+
+def read_counter_fields(collection_name, doc_id, fields, shards):
+    """Ler do Firestore os campos dos contadores; contadores divididos somam as partes"""
+    values = {}
+    params = {'key': FIREBASE_API_KEY}
+
+    plain = [field for field in fields if not shards.get(field)]
+    if plain:
+        url = f"{FIRESTORE_BASE_URL}/{collection_name}/{doc_id}"
+        response = firestore_client.get(url, params={**params, 'mask.fieldPaths': plain})
+        if response.status_code == 200:
+            data = parse_firestore_fields(response.json().get('fields', {}))
+            values.update({field: int(data.get(field) or 0) for field in plain})
+        elif response.status_code != 404:
+            raise UpstreamError(response.status_code, response.text)
+
+    sharded = [field for field in fields if shards.get(field)]
+    if sharded:
+        url = f"{FIRESTORE_BASE_URL}/{collection_name}/{doc_id}/{SHARDS_COLLECTION}"
+        response = firestore_client.get(url, params={**params, 'mask.fieldPaths': sharded})
+        if response.status_code != 200:
+            raise UpstreamError(response.status_code, response.text)
+        for doc in response.json().get('documents', []):
+            data = parse_firestore_fields(doc.get('fields', {}))
+            for field in sharded:
+                values[field] = values.get(field, 0) + int(data.get(field) or 0)
+
+    return values
+
+def commit_increments(targets):
+    """Aplicar os incrementos com transformações de campo em um documents:commit"""
+    writes = [{
+        'transform': {
+            'document': f"{DOCUMENTS_PATH}/{path}",
+            'fieldTransforms': [
+                {'fieldPath': field, 'increment': {'integerValue': str(delta)}}
+                for field, delta in counters
+            ]
+        }
+    } for path, counters in targets]
+
+    response = firestore_client.post(f"{FIRESTORE_BASE_URL}:commit", params={'key': FIREBASE_API_KEY},
+                                     json={'writes': writes})
+    if response.status_code != 200:
+        raise UpstreamError(response.status_code, response.text)
+
+    # Cada transformação devolve o valor do campo depois do incremento
+    return [
+        [int(decode_value(value)) for value in result.get('transformResults', [])]
+        for result in response.json().get('writeResults', [])
+    ]
+
+def init_counters():
+    """Configurar os contadores (o envio do que ficou no diário começa em counter_service.start)"""
+    if not counter_service.fields or not FIREBASE_PROJECT_ID:
+        return
+    counter_service.init_app(read_counter_fields, commit_increments)
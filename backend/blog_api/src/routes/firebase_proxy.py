@@ -1,8 +1,29 @@
 import os
-import requests
 import json
-from flask import Blueprint, request, jsonify
+import hashlib
+import secrets
+import string
+from urllib.parse import parse_qsl
+from flask import Blueprint, Response, request, jsonify
+from werkzeug.datastructures import MultiDict
 from datetime import datetime
+from src.services.firestore_client import firestore_client
+from src.services.cache import read_cache, parse_ttls
+from src.services.count_cache import count_cache, value_key
+from src.services.compression import JSONPayload, payload_response
+from src.services.singleflight import read_flights, async_read_flights
+from src.services.hot_queries import hot_queries, FIRESTORE_HOT_WARMUP_TIMEOUT
+from src.services.firestore_mirror import firestore_mirror
+# Conversões de/para o formato do Firestore
+from src.services.firestore_codec import (
+    decode_document,
+    decode_fields as parse_firestore_fields,
+    encode_fields as convert_to_firestore_fields
+)
+from src.services.firestore_query import (
+    parse_query, split_where_clauses, compile_structured_query, sort_documents,
+    pagination_order, encode_cursor, decode_cursor
+)
 
 firebase_bp = Blueprint('firebase', __name__)
 
@@ -11,10 +32,44 @@ FIREBASE_API_KEY = os.getenv('FIREBASE_API_KEY')
 FIREBASE_PROJECT_ID = os.getenv('FIREBASE_PROJECT_ID')
 FIREBASE_AUTH_DOMAIN = os.getenv('FIREBASE_AUTH_DOMAIN')
 
-# URLs base do Firebase
-FIRESTORE_BASE_URL = f"https://firestore.googleapis.com/v1/projects/{FIREBASE_PROJECT_ID}/databases/(default)/documents"
+# URLs base do Firebase; FIRESTORE_API_URL aponta o proxy para outro servidor
+# (emulador do Firestore, benchmarks/fake_firestore.py) em vez da produção
+FIRESTORE_API_URL = os.getenv('FIRESTORE_API_URL', 'https://firestore.googleapis.com/v1').rstrip('/')
+DOCUMENTS_PATH = f"projects/{FIREBASE_PROJECT_ID}/databases/(default)/documents"
+FIRESTORE_BASE_URL = f"{FIRESTORE_API_URL}/{DOCUMENTS_PATH}"
 AUTH_BASE_URL = f"https://identitytoolkit.googleapis.com/v1/accounts"
 
+# Tamanhos de página para listagens paginadas e em streaming
+DEFAULT_PAGE_SIZE = 100
+STREAM_PAGE_SIZE = 300
+MAX_PAGE_SIZE = 1000
+
+# Documentos por chamada de batchGet
+BATCH_GET_CHUNK_SIZE = 100
+MAX_BATCH_GET_DOCUMENTS = 500
+
+# Escritas por documents:commit (limite do Firestore) e por requisição; acima
+# do limite as operações são divididas em vários commits
+MAX_COMMIT_WRITES = 500
+MAX_BATCH_WRITES = 2000
+WRITE_OPERATIONS = ('create', 'set', 'update', 'delete')
+AUTO_ID_ALPHABET = string.ascii_letters + string.digits
+
+# Cache HTTP por coleção ("articles=60,categories=300", em segundos). Sem valor
+# configurado o navegador sempre revalida com If-None-Match
+FIRESTORE_HTTP_MAX_AGES = parse_ttls(os.getenv('FIRESTORE_HTTP_MAX_AGES', 'articles=60'))
+
+# Consultas quentes servidas da memória e atualizadas em segundo plano, no formato
+# "coleção?parâmetros" separadas por ";" (vazio desativa)
+FIRESTORE_HOT_QUERIES = os.getenv('FIRESTORE_HOT_QUERIES', 'articles?orderBy=timestamp&direction=desc')
+# Derivadas de cada listagem quente: os N documentos mais recentes e uma
+# listagem por valor do campo de categoria (vazio desativa)
+FIRESTORE_HOT_RECENT_DOCUMENTS = int(os.getenv('FIRESTORE_HOT_RECENT_DOCUMENTS', '10'))
+FIRESTORE_HOT_CATEGORY_FIELD = os.getenv('FIRESTORE_HOT_CATEGORY_FIELD', 'category')
+
+# Funções chamadas após cada escrita bem-sucedida: fn(coleção, id, dados, operação)
+write_listeners = []
+
 @firebase_bp.route('/health', methods=['GET'])
 def health_check():
     """Endpoint para verificar se o proxy está funcionando"""
@@ -24,65 +79,55 @@ def health_check():
         'firebase_configured': bool(FIREBASE_API_KEY and FIREBASE_PROJECT_ID)
     })
 
+@firebase_bp.route('/stats', methods=['GET'])
+def proxy_stats():
+    """Estatísticas do cliente HTTP usado pelo proxy"""
+    return jsonify({
+        'http_client': firestore_client.stats(),
+        'cache': read_cache.stats(),
+        'counts': count_cache.stats(),
+        'singleflight': read_flights.stats(),
+        'hot_queries': hot_queries.stats(),
+        'mirror': firestore_mirror.stats()
+    })
+
 @firebase_bp.route('/firestore/<collection_name>', methods=['GET'])
 def get_collection(collection_name):
-    """Buscar todos os documentos de uma coleção"""
+    """Buscar documentos de uma coleção
+    
+    Com `pageSize`/`pageToken` responde {documents, nextPageToken}; com `stream=true`
+    percorre todas as páginas e responde em NDJSON (um documento por linha).
+    """
     try:
         # Parâmetros de consulta
-        order_by = request.args.get('orderBy')
-        direction = request.args.get('direction', 'asc')
-        limit = request.args.get('limit')
-        where_param = request.args.get('where')
-        
-        # Construir URL da consulta
-        url = f"{FIRESTORE_BASE_URL}/{collection_name}"
-        params = {'key': FIREBASE_API_KEY}
+        try:
+            query, page_size, page_token, stream = parse_collection_args(request.args)
+        except ValueError as e:
+            return jsonify({
+                'error': 'Parâmetros de consulta inválidos',
+                'details': str(e)
+            }), 400
         
-        # Adicionar ordenação se especificada
-        if order_by:
-            if direction.lower() == 'desc':
-                params['orderBy'] = f"{order_by} desc"
-            else:
-                params['orderBy'] = order_by
+        if stream:
+            return stream_collection(collection_name, query, page_size or STREAM_PAGE_SIZE, page_token)
         
-        # Adicionar limite se especificado
-        if limit:
-            params['pageSize'] = limit
+        # Consultar o cache antes de ir ao Firestore
+        page_size, cache_key = collection_read_key(collection_name, query, page_size, page_token)
+        cache_control = http_cache_control(collection_name)
+        cached = hot_queries.get(cache_key) or read_cache.get(cache_key)
+        if cached is not None:
+            return payload_response(cached, cache_control=cache_control)
         
-        # Fazer requisição para o Firestore
-        response = requests.get(url, params=params)
+        # Leituras idênticas simultâneas compartilham uma única chamada ao Firestore
+        payload = read_flights.do(cache_key, fetch_collection, collection_name, query,
+                                  page_size, page_token, cache_key)
+        return payload_response(payload, cache_control=cache_control)
         
-        if response.status_code == 200:
-            data = response.json()
-            documents = data.get('documents', [])
-            
-            # Processar documentos
-            result = []
-            for doc in documents:
-                doc_id = doc['name'].split('/')[-1]
-                doc_data = parse_firestore_fields(doc.get('fields', {}))
-                
-                # Aplicar filtro where se especificado
-                if where_param:
-                    try:
-                        where_filter = json.loads(where_param)
-                        if not apply_where_filter(doc_data, where_filter):
-                            continue
-                    except:
-                        pass
-                
-                result.append({
-                    'id': doc_id,
-                    'data': doc_data
-                })
-            
-            return jsonify(result)
-        else:
-            return jsonify({
-                'error': 'Erro ao buscar documentos',
-                'details': response.text
-            }), response.status_code
-            
+    except UpstreamError as e:
+        return jsonify({
+            'error': 'Erro ao buscar documentos',
+            'details': e.details
+        }), e.status_code
     except Exception as e:
         return jsonify({
             'error': 'Erro interno do servidor',
@@ -93,30 +138,115 @@ def get_collection(collection_name):
 def get_document(collection_name, doc_id):
     """Buscar um documento específico"""
     try:
-        url = f"{FIRESTORE_BASE_URL}/{collection_name}/{doc_id}"
-        params = {'key': FIREBASE_API_KEY}
+        cache_key = read_cache.document_key(collection_name, doc_id)
+        cache_control = http_cache_control(collection_name)
+        cached = hot_queries.get(cache_key) or read_cache.get(cache_key)
+        if cached is not None:
+            return payload_response(cached, cache_control=cache_control)
         
-        response = requests.get(url, params=params)
+        payload = read_flights.do(cache_key, fetch_document, collection_name, doc_id, cache_key)
+        return payload_response(payload, cache_control=cache_control)
         
-        if response.status_code == 200:
-            doc = response.json()
-            doc_data = parse_firestore_fields(doc.get('fields', {}))
-            
+    except UpstreamError as e:
+        return jsonify({
+            'error': 'Erro ao buscar documento',
+            'details': e.details
+        }), e.status_code
+    except Exception as e:
+        return jsonify({
+            'error': 'Erro interno do servidor',
+            'details': str(e)
+        }), 500
+
+@firebase_bp.route('/firestore:batchGet', methods=['POST'])
+def batch_get_documents():
+    """Buscar vários documentos (de uma ou mais coleções) em uma única chamada
+    
+    Corpo: {"documents": ["articles/abc", "users/xyz", ...]}. A resposta mantém a
+    ordem do pedido; documentos inexistentes vêm com exists=false e data=null.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        paths = data.get('documents')
+        
+        if not isinstance(paths, list) or not paths:
             return jsonify({
-                'id': doc_id,
-                'data': doc_data
-            })
-        elif response.status_code == 404:
+                'error': 'Informe a lista de documentos',
+                'details': 'Campo documents deve ser uma lista de caminhos colecao/id'
+            }), 400
+        
+        if len(paths) > MAX_BATCH_GET_DOCUMENTS:
             return jsonify({
-                'id': doc_id,
-                'data': None
-            })
-        else:
+                'error': 'Documentos demais na requisição',
+                'details': f'Máximo de {MAX_BATCH_GET_DOCUMENTS} documentos por chamada'
+            }), 400
+        
+        invalid = [path for path in paths if split_document_path(path) is None]
+        if invalid:
             return jsonify({
-                'error': 'Erro ao buscar documento',
-                'details': response.text
-            }), response.status_code
-            
+                'error': 'Caminho de documento inválido',
+                'details': invalid
+            }), 400
+        
+        paths = [path.strip('/') for path in paths]
+        results = batch_get(paths)
+        
+        return jsonify({
+            'documents': [
+                {
+                    'path': path,
+                    'id': results[path]['id'],
+                    'exists': results[path]['data'] is not None,
+                    'data': results[path]['data']
+                }
+                for path in paths
+            ]
+        })
+        
+    except UpstreamError as e:
+        return jsonify({
+            'error': 'Erro ao buscar documentos',
+            'details': e.details
+        }), e.status_code
+    except Exception as e:
+        return jsonify({
+            'error': 'Erro interno do servidor',
+            'details': str(e)
+        }), 500
+
+@firebase_bp.route('/firestore:count', methods=['GET'])
+def count_documents():
+    """Contar documentos de uma coleção com campo == valor (ex.: likes por artigo)
+    
+    Parâmetros: collection e where ({field, operator: "==", value}, valor tipado
+    como nas consultas), ou collection, field e value (comparado como texto).
+    """
+    try:
+        try:
+            collection_name, field, value = parse_count_args(request.args)
+        except ValueError as e:
+            return jsonify({
+                'error': 'Parâmetros de consulta inválidos',
+                'details': str(e)
+            }), 400
+        
+        count = count_cache.get(collection_name, field, value)
+        if count is None:
+            count = read_flights.do(('count', collection_name, field, value_key(value)),
+                                    fetch_count, collection_name, field, value)
+        
+        return jsonify({
+            'collection': collection_name,
+            'field': field,
+            'value': value,
+            'count': count
+        })
+        
+    except UpstreamError as e:
+        return jsonify({
+            'error': 'Erro ao contar documentos',
+            'details': e.details
+        }), e.status_code
     except Exception as e:
         return jsonify({
             'error': 'Erro interno do servidor',
@@ -128,15 +258,7 @@ def add_document(collection_name):
     """Adicionar novo documento"""
     try:
         data = request.get_json()
-        
-        # Converter dados para formato Firestore
-        firestore_fields = convert_to_firestore_fields(data)
-        
-        # Adicionar timestamp se não existir
-        if 'timestamp' not in firestore_fields:
-            firestore_fields['timestamp'] = {
-                'timestampValue': datetime.now().isoformat() + 'Z'
-            }
+        firestore_fields = creation_fields(data)
         
         url = f"{FIRESTORE_BASE_URL}/{collection_name}"
         params = {'key': FIREBASE_API_KEY}
@@ -145,11 +267,12 @@ def add_document(collection_name):
             'fields': firestore_fields
         }
         
-        response = requests.post(url, params=params, json=payload)
+        response = firestore_client.post(url, params=params, json=payload)
         
         if response.status_code == 200:
             doc = response.json()
             doc_id = doc['name'].split('/')[-1]
+            on_document_written(collection_name, doc_id, data, 'create', document=doc)
             
             return jsonify({
                 'id': doc_id,
@@ -183,9 +306,12 @@ def set_document(collection_name, doc_id):
             'fields': firestore_fields
         }
         
-        response = requests.patch(url, params=params, json=payload)
+        # Definir um documento que não existia é uma criação (as contagens somam 1)
+        operation = 'create' if known_missing(collection_name, doc_id) else 'set'
+        response = firestore_client.patch(url, params=params, json=payload)
         
         if response.status_code == 200:
+            on_document_written(collection_name, doc_id, data, operation, document=response.json())
             return jsonify({
                 'id': doc_id,
                 'success': True
@@ -207,29 +333,22 @@ def update_document(collection_name, doc_id):
     """Atualizar documento parcialmente"""
     try:
         data = request.get_json()
-        
-        # Converter dados para formato Firestore
-        firestore_fields = convert_to_firestore_fields(data)
-        
-        # Adicionar timestamp de atualização
-        firestore_fields['updatedAt'] = {
-            'timestampValue': datetime.now().isoformat() + 'Z'
-        }
+        firestore_fields = update_fields(data)
         
         url = f"{FIRESTORE_BASE_URL}/{collection_name}/{doc_id}"
         params = {'key': FIREBASE_API_KEY}
         
         # Criar máscara de campos para atualização parcial
-        field_paths = list(firestore_fields.keys())
-        params['updateMask.fieldPaths'] = field_paths
+        params['updateMask.fieldPaths'] = list(firestore_fields.keys())
         
         payload = {
             'fields': firestore_fields
         }
         
-        response = requests.patch(url, params=params, json=payload)
+        response = firestore_client.patch(url, params=params, json=payload)
         
         if response.status_code == 200:
+            on_document_written(collection_name, doc_id, data, 'update', document=response.json())
             return jsonify({
                 'id': doc_id,
                 'success': True
@@ -246,95 +365,905 @@ def update_document(collection_name, doc_id):
             'details': str(e)
         }), 500
 
-def parse_firestore_fields(fields):
-    """Converter campos do Firestore para formato Python"""
-    result = {}
-    
-    for key, value in fields.items():
-        if 'stringValue' in value:
-            result[key] = value['stringValue']
-        elif 'integerValue' in value:
-            result[key] = int(value['integerValue'])
-        elif 'doubleValue' in value:
-            result[key] = float(value['doubleValue'])
-        elif 'booleanValue' in value:
-            result[key] = value['booleanValue']
-        elif 'timestampValue' in value:
-            result[key] = value['timestampValue']
-        elif 'arrayValue' in value:
-            result[key] = [parse_firestore_value(item) for item in value['arrayValue'].get('values', [])]
-        elif 'mapValue' in value:
-            result[key] = parse_firestore_fields(value['mapValue'].get('fields', {}))
-        elif 'nullValue' in value:
-            result[key] = None
-        else:
-            result[key] = value
+@firebase_bp.route('/firestore:commit', methods=['POST'])
+def commit_documents():
+    """Gravar várias operações (create/set/update/delete) com documents:commit
     
+    Corpo: {"writes": [{"operation": "create", "collection": "likes", "data": {...}},
+    {"operation": "update", "path": "articles/abc", "data": {...}},
+    {"operation": "delete", "path": "likes/xyz"}]}. Cada commit é atômico; acima de
+    MAX_COMMIT_WRITES as operações são divididas e, se um commit falhar, os
+    seguintes não são executados. A resposta traz o resultado de cada operação.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        operations, errors = parse_batch_writes(data.get('writes'))
+        if errors:
+            return jsonify({
+                'error': 'Operações de escrita inválidas',
+                'details': errors
+            }), 400
+        
+        url = f"{FIRESTORE_BASE_URL}:commit"
+        results = []
+        for start in range(0, len(operations), MAX_COMMIT_WRITES):
+            chunk = operations[start:start + MAX_COMMIT_WRITES]
+            response = firestore_client.post(url, params={'key': FIREBASE_API_KEY}, json=commit_body(chunk))
+            
+            if response.status_code != 200:
+                results.extend(write_result(op, 'failed') for op in chunk)
+                results.extend(write_result(op, 'skipped') for op in operations[start + MAX_COMMIT_WRITES:])
+                return jsonify({
+                    'error': 'Erro ao gravar documentos',
+                    'details': response.text,
+                    'results': results
+                }), response.status_code
+            
+            results.extend(apply_committed_writes(chunk, response.json()))
+        
+        return jsonify({
+            'success': True,
+            'commits': -(-len(operations) // MAX_COMMIT_WRITES),
+            'results': results
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'error': 'Erro interno do servidor',
+            'details': str(e)
+        }), 500
+
+def creation_fields(data):
+    """Campos de um novo documento no formato Firestore, com timestamp se não houver"""
+    firestore_fields = convert_to_firestore_fields(data)
+    
+    # Adicionar timestamp se não existir
+    if 'timestamp' not in firestore_fields:
+        firestore_fields['timestamp'] = {
+            'timestampValue': datetime.now().isoformat() + 'Z'
+        }
+    return firestore_fields
+
+def update_fields(data):
+    """Campos de uma atualização parcial no formato Firestore, com updatedAt"""
+    firestore_fields = convert_to_firestore_fields(data)
+    
+    # Adicionar timestamp de atualização
+    firestore_fields['updatedAt'] = {
+        'timestampValue': datetime.now().isoformat() + 'Z'
+    }
+    return firestore_fields
+
+def parse_batch_writes(items):
+    """Validar as operações do commit; retorna (operações normalizadas, erros)
+    
+    Os campos são codificados como nas rotas individuais (creation_fields,
+    convert_to_firestore_fields e update_fields).
+    """
+    if not isinstance(items, list) or not items:
+        return [], ['Campo writes deve ser uma lista de operações']
+    if len(items) > MAX_BATCH_WRITES:
+        return [], [f'Máximo de {MAX_BATCH_WRITES} operações por chamada']
+    
+    operations, errors = [], []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or item.get('operation') not in WRITE_OPERATIONS:
+            errors.append({'index': index, 'error': f"operation deve ser um de {', '.join(WRITE_OPERATIONS)}"})
+            continue
+        operation = item['operation']
+        
+        if operation == 'create' and not item.get('path'):
+            collection_name = item.get('collection')
+            if not isinstance(collection_name, str) or split_document_path(f"{collection_name}/id") is None:
+                errors.append({'index': index, 'error': 'collection inválida'})
+                continue
+            # Id gerado aqui, no mesmo formato dos ids automáticos do Firestore
+            doc_id = ''.join(secrets.choice(AUTO_ID_ALPHABET) for _ in range(20))
+        else:
+            parts = split_document_path(item.get('path'))
+            if parts is None:
+                errors.append({'index': index, 'error': 'path deve ser colecao/id'})
+                continue
+            collection_name, doc_id = parts
+        
+        data = item.get('data')
+        if operation != 'delete' and not isinstance(data, dict):
+            errors.append({'index': index, 'error': 'data deve ser um objeto'})
+            continue
+        
+        if operation == 'create':
+            fields = creation_fields(data)
+        elif operation == 'set':
+            fields = convert_to_firestore_fields(data)
+        elif operation == 'update':
+            fields = update_fields(data)
+        else:
+            fields = None
+        
+        operations.append({
+            'index': index,
+            'operation': operation,
+            'collection': collection_name,
+            'id': doc_id,
+            'data': data,
+            'fields': fields
+        })
+    return operations, errors
+
+def commit_body(operations):
+    """Corpo do documents:commit para as operações"""
+    writes = []
+    for op in operations:
+        name = f"{DOCUMENTS_PATH}/{op['collection']}/{op['id']}"
+        if op['operation'] == 'delete':
+            writes.append({'delete': name})
+            continue
+        
+        write = {'update': {'name': name, 'fields': op['fields']}}
+        if op['operation'] == 'create':
+            # Como o POST de criação: falha se o documento já existir
+            write['currentDocument'] = {'exists': False}
+        elif op['operation'] == 'update':
+            write['updateMask'] = {'fieldPaths': list(op['fields'].keys())}
+        writes.append(write)
+    return {'writes': writes}
+
+def write_result(op, status, update_time=None):
+    result = {
+        'index': op['index'],
+        'operation': op['operation'],
+        'path': f"{op['collection']}/{op['id']}",
+        'id': op['id'],
+        'status': status
+    }
+    if update_time:
+        result['updateTime'] = update_time
     return result
 
-def parse_firestore_value(value):
-    """Converter um valor individual do Firestore"""
-    if 'stringValue' in value:
-        return value['stringValue']
-    elif 'integerValue' in value:
-        return int(value['integerValue'])
-    elif 'doubleValue' in value:
-        return float(value['doubleValue'])
-    elif 'booleanValue' in value:
-        return value['booleanValue']
-    elif 'timestampValue' in value:
-        return value['timestampValue']
-    elif 'nullValue' in value:
+def apply_committed_writes(operations, response):
+    """Atualizar espelho, caches e listeners após um commit; retorna os resultados"""
+    write_results = response.get('writeResults', [])
+    
+    # O commit não devolve os documentos: atualizações parciais em coleções
+    # espelhadas são relidas para o espelho não ficar com a versão anterior
+    updated = {}
+    for op in operations:
+        if op['operation'] == 'update' and op['collection'] in firestore_mirror.collections:
+            updated.setdefault(op['collection'], []).append(op['id'])
+    documents = {}
+    for collection_name, doc_ids in updated.items():
+        try:
+            for doc_id, doc in get_documents(collection_name, doc_ids).items():
+                documents[(collection_name, doc_id)] = doc
+        except Exception as e:
+            print(f"Erro ao reler documentos atualizados de {collection_name}: {e}")
+    
+    results = []
+    for op, write in zip(operations, write_results):
+        update_time = write.get('updateTime') or response.get('commitTime')
+        collection_name, doc_id = op['collection'], op['id']
+        
+        if op['operation'] == 'delete':
+            on_document_written(collection_name, doc_id, known_document_data(collection_name, doc_id), 'delete')
+        elif op['operation'] == 'update':
+            on_document_written(collection_name, doc_id, op['data'], 'update',
+                                document=documents.get((collection_name, doc_id)))
+        else:
+            on_document_written(collection_name, doc_id, op['data'], op['operation'],
+                                document={'fields': op['fields'], 'updateTime': update_time})
+        results.append(write_result(op, 'committed', update_time))
+    return results
+
+def known_document_data(collection_name, doc_id):
+    """Dados de um documento já conhecidos pelo cache ou pelo espelho (sem ir ao Firestore)"""
+    cached = read_cache.get(read_cache.document_key(collection_name, doc_id))
+    if cached is not None:
+        return cached.value['data']
+    if firestore_mirror.serves(collection_name):
+        found = firestore_mirror.get(collection_name, doc_id)
+        if found is not None:
+            return found[0]
+    return None
+
+def known_missing(collection_name, doc_id):
+    """O cache ou o espelho sabem que o documento não existe? (sem informação: False)"""
+    cached = read_cache.get(read_cache.document_key(collection_name, doc_id))
+    if cached is not None:
+        return cached.value['data'] is None
+    if firestore_mirror.serves(collection_name):
+        return firestore_mirror.get(collection_name, doc_id) is None
+    return False
+
+class UpstreamError(Exception):
+    """Resposta de erro do Firestore"""
+
+    def __init__(self, status_code, details):
+        super().__init__(details)
+        self.status_code = status_code
+        self.details = details
+
+def fetch_collection(collection_name, query, page_size, page_token, cache_key):
+    """Buscar a consulta (paginada se houver page_size) e guardar o payload no cache"""
+    # Lida antes da busca: uma escrita durante a busca impede guardar o resultado antigo
+    generation = read_cache.generation(collection_name)
+    if page_size:
+        documents, next_page_token, size, etag = query_collection_page(
+            collection_name, query, page_size, page_token
+        )
+        payload = page_payload(documents, next_page_token, etag)
+    elif firestore_mirror.serves(collection_name):
+        # Coleção espelhada no SQLite: a consulta não vai ao Firestore
+        result, size, etag = mirror_query(collection_name, query)
+        payload = JSONPayload(result, etag=etag)
+    else:
+        result, size, etag = query_collection(collection_name, query)
+        payload = JSONPayload(result, etag=etag)
+    read_cache.set(cache_key, payload, size=size, generation=generation)
+    return payload
+
+def fetch_document(collection_name, doc_id, cache_key):
+    """Buscar um documento e guardar o payload no cache (data=None se não existir)"""
+    generation = read_cache.generation(collection_name)
+    mirrored = mirror_document(collection_name, doc_id)
+    if mirrored is not None:
+        payload, size = mirrored
+        read_cache.set(cache_key, payload, size=size, generation=generation)
+        return payload
+    
+    url = f"{FIRESTORE_BASE_URL}/{collection_name}/{doc_id}"
+    params = {'key': FIREBASE_API_KEY}
+    
+    response = firestore_client.get(url, params=params)
+    payload = document_payload(collection_name, doc_id, response.status_code, response)
+    read_cache.set(cache_key, payload, size=len(response.content), generation=generation)
+    return payload
+
+def page_payload(documents, next_page_token, etag):
+    """Payload de uma página (o corpo serializado/comprimido fica guardado junto com o valor)"""
+    return JSONPayload({
+        'documents': documents,
+        'nextPageToken': next_page_token
+    }, etag=etag)
+
+def document_payload(collection_name, doc_id, status_code, response):
+    """Payload de um documento a partir da resposta do Firestore; lança UpstreamError em erros"""
+    if status_code == 200:
+        doc = response.json()
+        return JSONPayload({
+            'id': doc_id,
+            'data': parse_firestore_fields(doc.get('fields', {}))
+        }, etag=document_etag(doc))
+    if status_code == 404:
+        return JSONPayload({
+            'id': doc_id,
+            'data': None
+        }, etag=document_etag({'name': f"{collection_name}/{doc_id}"}))
+    raise UpstreamError(status_code, response.text)
+
+def mirror_query(collection_name, query):
+    """Responder uma consulta pelo espelho local: (resultado, bytes, etag) como query_collection"""
+    sql_clauses = [clause for clause in query['where'] if firestore_mirror.supports(clause)]
+    local_clauses = [clause for clause in query['where'] if not firestore_mirror.supports(clause)]
+    
+    # Com filtros locais, o limite só pode ser aplicado depois de filtrar
+    rows, size = firestore_mirror.query(collection_name, sql_clauses, query['orderBy'],
+                                        None if local_clauses else query['limit'])
+    result = filter_documents([{'id': doc_id, 'data': data} for doc_id, data, _ in rows], local_clauses)
+    if query['limit'] is not None:
+        result = result[:query['limit']]
+    
+    # Mesmo ETag que a consulta ao Firestore geraria (nome completo + updateTime)
+    versions = [{'name': f"{DOCUMENTS_PATH}/{collection_name}/{doc_id}", 'updateTime': update_time}
+                for doc_id, _, update_time in rows]
+    return result, size, documents_etag(collection_name, query, versions)
+
+def mirror_document(collection_name, doc_id):
+    """(payload, bytes) de um documento espelhado, ou None para buscar no Firestore"""
+    if not firestore_mirror.serves(collection_name):
+        return None
+    found = firestore_mirror.get(collection_name, doc_id)
+    if found is None:
+        # Pode ter sido criado fora do proxy depois da última sincronização
         return None
+    data, update_time, size = found
+    return JSONPayload({
+        'id': doc_id,
+        'data': data
+    }, etag=document_etag({'name': f"{collection_name}/{doc_id}", 'updateTime': update_time})), size
+
+def mirror_versions(collection_name):
+    """Gerar (id, updateTime) de todos os documentos, sem baixar os campos"""
+    url = f"{FIRESTORE_BASE_URL}/{collection_name}"
+    page_token = None
+    while True:
+        params = list_params(page_size=STREAM_PAGE_SIZE, page_token=page_token)
+        # Máscara com um campo inexistente: o Firestore devolve só nome e updateTime
+        params['mask.fieldPaths'] = '__mirror_version__'
+        response = firestore_client.get(url, params=params)
+        if response.status_code != 200:
+            raise UpstreamError(response.status_code, response.text)
+        
+        data = response.json()
+        for doc in data.get('documents', []):
+            yield doc['name'].rsplit('/', 1)[-1], doc['updateTime']
+        
+        page_token = data.get('nextPageToken')
+        if not page_token:
+            return
+
+def get_documents(collection_name, doc_ids):
+    """Buscar documentos com batchGet: {id: documento do Firestore ou None se não existir}"""
+    url = f"{FIRESTORE_BASE_URL}:batchGet"
+    names = [f"{DOCUMENTS_PATH}/{collection_name}/{doc_id}" for doc_id in doc_ids]
+    response = firestore_client.post(url, params={'key': FIREBASE_API_KEY}, json={'documents': names},
+                                     idempotent=True)
+    if response.status_code != 200:
+        raise UpstreamError(response.status_code, response.text)
+    
+    results = {}
+    for item in response.json():
+        if 'found' in item:
+            results[item['found']['name'].rsplit('/', 1)[-1]] = item['found']
+        elif 'missing' in item:
+            results[item['missing'].rsplit('/', 1)[-1]] = None
+    return results
+
+def mirror_documents(collection_name, doc_ids):
+    """Documentos para o espelho: {id: (dados, updateTime) ou None se não existir}"""
+    return {
+        doc_id: (parse_firestore_fields(doc.get('fields', {})), doc['updateTime']) if doc is not None else None
+        for doc_id, doc in get_documents(collection_name, doc_ids).items()
+    }
+
+def init_firestore_mirror(engine):
+    """Ler o espelho local nas coleções configuradas (a sincronização começa em firestore_mirror.start)"""
+    if not firestore_mirror.collections or not FIREBASE_PROJECT_ID:
+        return
+    firestore_mirror.init_app(engine, mirror_versions, mirror_documents)
+
+def parse_count_args(args):
+    """(coleção, campo, valor) de uma contagem; lança ValueError"""
+    collection_name = args.get('collection')
+    if args.get('where'):
+        clauses = parse_query(where_param=args.get('where'))['where']
+        if len(clauses) != 1 or clauses[0]['operator'] != '==':
+            raise ValueError('A contagem aceita um único filtro com o operador ==')
+        field, value = clauses[0]['field'], clauses[0]['value']
     else:
-        return value
-
-def convert_to_firestore_fields(data):
-    """Converter dados Python para formato Firestore"""
-    result = {}
-    
-    for key, value in data.items():
-        if isinstance(value, str):
-            result[key] = {'stringValue': value}
-        elif isinstance(value, int):
-            result[key] = {'integerValue': str(value)}
-        elif isinstance(value, float):
-            result[key] = {'doubleValue': value}
-        elif isinstance(value, bool):
-            result[key] = {'booleanValue': value}
-        elif isinstance(value, list):
-            result[key] = {
-                'arrayValue': {
-                    'values': [convert_to_firestore_value(item) for item in value]
-                }
-            }
-        elif isinstance(value, dict):
-            result[key] = {
-                'mapValue': {
-                    'fields': convert_to_firestore_fields(value)
-                }
-            }
-        elif value is None:
-            result[key] = {'nullValue': None}
+        field, value = args.get('field'), args.get('value')
+
+    if not collection_name or not field or value is None:
+        raise ValueError('Informe collection, field e value')
+    if isinstance(value, (list, dict)):
+        raise ValueError('A contagem só compara texto, número ou booleano')
+    return collection_name, field, value
+
+def fetch_count(collection_name, field, value):
+    """Contar documentos com campo == valor e guardar no cache de contagens"""
+    generation = count_cache.generation(collection_name)
+    count = run_count_query(collection_name, count_clauses(field, value))
+    count_cache.set(collection_name, field, value, count, generation=generation)
+    return count
+
+def count_clauses(field, value):
+    return [{
+        'field': field,
+        'operator': '==',
+        'value': value
+    }]
+
+def parse_collection_args(args):
+    """Ler (consulta, pageSize, pageToken, stream) dos parâmetros; lança ValueError"""
+    page_token = args.get('pageToken')
+    page_size = args.get('pageSize')
+    stream = args.get('stream', '').lower() in ('1', 'true')
+    query = parse_query(
+        order_by=args.get('orderBy'),
+        direction=args.get('direction', 'asc'),
+        limit=args.get('limit'),
+        where_param=args.get('where')
+    )
+    if page_size:
+        page_size = min(max(int(page_size), 1), MAX_PAGE_SIZE)
+    if page_token:
+        remaining = decode_cursor(page_token).get('remaining')
+        if remaining is not None and (not isinstance(remaining, int) or remaining <= 0):
+            raise ValueError('pageToken inválido')
+    return query, page_size, page_token, stream
+
+def collection_cache_key(collection_name, query, page_size=None, page_token=None):
+    """Chave do cache de leitura de uma consulta (paginada ou não)"""
+    params = query_cache_params(query)
+    if page_size:
+        params.update({'pageSize': page_size, 'pageToken': page_token})
+    return read_cache.collection_key(collection_name, params)
+
+def collection_read_key(collection_name, query, page_size=None, page_token=None):
+    """(pageSize da leitura, chave do cache); pageSize é None se a leitura não for paginada"""
+    if not (page_token or page_size):
+        return None, collection_cache_key(collection_name, query)
+    page_size = page_size or query['limit'] or DEFAULT_PAGE_SIZE
+    return page_size, collection_cache_key(collection_name, query, page_size, page_token)
+
+def query_cache_params(query):
+    """Parâmetros normalizados de uma consulta para a chave do cache"""
+    return {
+        'where': json.dumps(query['where'], sort_keys=True) if query['where'] else None,
+        'orderBy': ','.join(f"{field} {direction}" for field, direction in query['orderBy']) or None,
+        'limit': query['limit']
+    }
+
+def list_documents(collection_name, order_by=(), page_size=None, page_token=None):
+    """Listar documentos de uma coleção (sem filtros)"""
+    url = f"{FIRESTORE_BASE_URL}/{collection_name}"
+    response = firestore_client.get(url, params=list_params(order_by, page_size, page_token))
+    if response.status_code != 200:
+        raise UpstreamError(response.status_code, response.text)
+    
+    return response.json(), len(response.content)
+
+def list_all_documents(collection_name, order_by=(), limit=None):
+    """Listar a coleção inteira (ou até `limit` documentos), seguindo o nextPageToken
+    
+    Sem pageSize o Firestore devolve só a primeira página; retorna (documentos, bytes).
+    """
+    documents = []
+    size = 0
+    page_token = None
+    while True:
+        data, page_bytes = list_documents(collection_name, order_by, list_page_size(limit, len(documents)),
+                                          page_token)
+        documents.extend(data.get('documents', []))
+        size += page_bytes
+        
+        page_token = data.get('nextPageToken')
+        if not page_token or (limit is not None and len(documents) >= limit):
+            return documents[:limit], size
+
+def list_page_size(limit, listed):
+    """pageSize da próxima página da listagem completa, sem passar do limit"""
+    return STREAM_PAGE_SIZE if limit is None else min(STREAM_PAGE_SIZE, limit - listed)
+
+def list_params(order_by=(), page_size=None, page_token=None):
+    """Parâmetros da listagem simples (documents.list) do Firestore"""
+    params = {'key': FIREBASE_API_KEY}
+    
+    # Adicionar ordenação se especificada
+    if order_by:
+        params['orderBy'] = ', '.join(
+            f"{field} desc" if direction == 'desc' else field
+            for field, direction in order_by
+        )
+    
+    # Adicionar limite se especificado
+    if page_size:
+        params['pageSize'] = page_size
+    
+    if page_token:
+        params['pageToken'] = page_token
+    
+    return params
+
+def run_structured_query(structured_query):
+    """Executar um runQuery e retornar os documentos encontrados"""
+    url = f"{FIRESTORE_BASE_URL}:runQuery"
+    params = {'key': FIREBASE_API_KEY}
+    
+    # runQuery é uma leitura: pode ser repetido com segurança
+    response = firestore_client.post(url, params=params, json={'structuredQuery': structured_query},
+                                     idempotent=True)
+    if response.status_code != 200:
+        raise UpstreamError(response.status_code, response.text)
+    
+    documents = [item['document'] for item in response.json() if 'document' in item]
+    return documents, len(response.content)
+
+def query_collection(collection_name, query):
+    """Buscar documentos aplicando where/orderBy/limit no próprio Firestore
+    
+    Filtros com operadores que o Firestore não expressa são aplicados em Python.
+    Se faltar um índice composto para a ordenação, a ordenação é feita em Python.
+    """
+    if not query['where']:
+        documents, size = list_all_documents(collection_name, query['orderBy'], query['limit'])
+        result, etag = query_result(collection_name, query, documents)
+        return result, size, etag
+    
+    sort_locally = False
+    try:
+        documents, size = run_structured_query(query_structured_query(collection_name, query))
+    except UpstreamError as e:
+        if not missing_index(collection_name, query, e):
+            raise
+        sort_locally = True
+        documents, size = run_structured_query(query_structured_query(collection_name, query, sort_locally))
+    
+    result, etag = query_result(collection_name, query, documents, sort_locally)
+    return result, size, etag
+
+def query_structured_query(collection_name, query, sort_locally=False):
+    """structuredQuery de uma consulta com filtros (os que o Firestore não expressa ficam de fora)"""
+    server_clauses, local_clauses = split_where_clauses(query['where'])
+    if sort_locally:
+        return compile_structured_query(collection_name, server_clauses)
+    
+    # Com filtros locais, o limite só pode ser aplicado depois de filtrar
+    limit = None if local_clauses else query['limit']
+    return compile_structured_query(collection_name, server_clauses, query['orderBy'], limit)
+
+def missing_index(collection_name, query, error):
+    """Se o runQuery falhou por falta de índice composto para a ordenação (que então é feita em Python)"""
+    if error.status_code != 400 or 'FAILED_PRECONDITION' not in error.details or not query['orderBy']:
+        return False
+    print(f"Índice ausente para consulta em {collection_name}, ordenando em Python: {error.details}")
+    return True
+
+def query_result(collection_name, query, documents, sort_locally=False):
+    """(resultado, etag) dos documentos do Firestore: filtros locais, ordenação em Python e limit"""
+    _, local_clauses = split_where_clauses(query['where'])
+    result = filter_documents(list(map(decode_document, documents)), local_clauses)
+    
+    if sort_locally:
+        result = sort_documents(result, query['orderBy'])
+    
+    if query['limit'] is not None:
+        result = result[:query['limit']]
+    
+    return result, documents_etag(collection_name, query, documents)
+
+def query_collection_page(collection_name, query, page_size, page_token=None):
+    """Buscar uma página da consulta; retorna (documentos, nextPageToken, bytes, etag)
+    
+    O pageToken é opaco: guarda o nextPageToken do Firestore nas listagens simples
+    ou os valores de ordenação do último documento nas consultas com filtro, e
+    quantos documentos ainda faltam para o `limit` da consulta (que vale para o
+    total de páginas, não para cada uma).
+    """
+    cursor, remaining, page_size = page_request(query, page_size, page_token)
+    
+    if not query['where']:
+        data, size = list_documents(collection_name, query['orderBy'], page_size, cursor.get('token'))
+        result, next_page_token, etag = list_page_result(collection_name, query, data, page_size,
+                                                         remaining, page_token)
+        return result, next_page_token, size, etag
+    
+    documents, size = run_structured_query(page_structured_query(collection_name, query, page_size, cursor))
+    result, next_page_token, etag = query_page_result(collection_name, query, documents, page_size,
+                                                      remaining, page_token)
+    return result, next_page_token, size, etag
+
+def page_request(query, page_size, page_token=None):
+    """(cursor, quanto falta do limit, pageSize) de uma página; o limit vale para o total de páginas"""
+    cursor = decode_cursor(page_token) if page_token else {}
+    remaining = cursor.get('remaining', query['limit'])
+    if remaining is not None:
+        page_size = min(page_size, remaining)
+    return cursor, remaining, page_size
+
+def list_page_result(collection_name, query, data, page_size, remaining, page_token=None):
+    """(documentos, nextPageToken, etag) de uma página da listagem simples"""
+    raw_documents = data.get('documents', [])[:page_size]
+    next_page_token = data.get('nextPageToken')
+    next_page_token = page_cursor({'token': next_page_token}, remaining, len(raw_documents)) \
+        if next_page_token else None
+    etag = documents_etag(collection_name, query, raw_documents, [page_token, next_page_token])
+    return list(map(decode_document, raw_documents)), next_page_token, etag
+
+def page_order(query):
+    """Cláusulas do Firestore e ordenação (com desempate) de uma consulta paginada"""
+    server_clauses, _ = split_where_clauses(query['where'])
+    return server_clauses, pagination_order(server_clauses, query['orderBy'])
+
+def page_structured_query(collection_name, query, page_size, cursor):
+    """structuredQuery de uma página, continuando depois do cursor (se houver)"""
+    server_clauses, order_by = page_order(query)
+    structured_query = compile_structured_query(collection_name, server_clauses, order_by, page_size)
+    if cursor.get('values'):
+        structured_query['startAt'] = {
+            'values': cursor['values'],
+            'before': False
+        }
+    return structured_query
+
+def query_page_result(collection_name, query, documents, page_size, remaining, page_token=None):
+    """(documentos, nextPageToken, etag) de uma página a partir da resposta do runQuery"""
+    _, local_clauses = split_where_clauses(query['where'])
+    _, order_by = page_order(query)
+    
+    # Filtros locais podem deixar a página com menos documentos que pageSize
+    result = filter_documents(list(map(decode_document, documents)), local_clauses)
+    
+    next_page_token = next_page_cursor(documents, order_by, page_size, remaining, len(result))
+    
+    etag = documents_etag(collection_name, query, documents, [page_token, next_page_token])
+    return result, next_page_token, etag
+
+def next_page_cursor(documents, order_by, page_size, remaining=None, returned=0):
+    """Cursor opaco da próxima página, a partir dos valores de ordenação do último documento"""
+    # Só uma página cheia pode ter mais documentos depois do último
+    if not documents or len(documents) != page_size:
+        return None
+    last = documents[-1]
+    fields = last.get('fields', {})
+    values = [
+        {'referenceValue': last['name']} if field == '__name__' else fields.get(field, {'nullValue': None})
+        for field, _ in order_by
+    ]
+    return page_cursor({'values': values}, remaining, returned)
+
+def page_cursor(cursor, remaining, returned):
+    """pageToken da próxima página levando o que falta do limit; None se o limit foi atingido"""
+    if remaining is None:
+        return encode_cursor(cursor)
+    if remaining - returned <= 0:
+        return None
+    return encode_cursor(dict(cursor, remaining=remaining - returned))
+
+def filter_documents(documents, local_clauses):
+    """Aplicar em Python os filtros que o Firestore não expressa"""
+    if not local_clauses:
+        return documents
+    return [
+        doc for doc in documents
+        if all(apply_where_filter(doc['data'], clause) for clause in local_clauses)
+    ]
+
+def iter_collection(collection_name, query, page_size, page_token=None):
+    """Percorrer a consulta página por página, buscando a próxima só quando necessário
+    
+    O limit da consulta é controlado pelo cursor (ver query_collection_page).
+    """
+    while True:
+        documents, page_token, _, _ = query_collection_page(collection_name, query, page_size, page_token)
+        
+        for doc in documents:
+            yield doc
+        
+        if not page_token:
+            return
+
+def stream_collection(collection_name, query, page_size, page_token=None):
+    """Responder a consulta em NDJSON, com memória constante"""
+    documents = iter_collection(collection_name, query, page_size, page_token)
+    
+    # A primeira página é buscada antes de responder para que erros virem status HTTP
+    first = next(documents, None)
+    
+    def generate():
+        if first is None:
+            return
+        yield json.dumps(first, ensure_ascii=False) + '\n'
+        try:
+            for doc in documents:
+                yield json.dumps(doc, ensure_ascii=False) + '\n'
+        except Exception as e:
+            details = e.details if isinstance(e, UpstreamError) else str(e)
+            yield json.dumps({'error': 'Erro ao buscar documentos', 'details': details}, ensure_ascii=False) + '\n'
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+def http_cache_control(collection_name):
+    """Cabeçalho Cache-Control das leituras de uma coleção"""
+    max_age = int(FIRESTORE_HTTP_MAX_AGES.get(collection_name, 0))
+    if max_age > 0:
+        return f"public, max-age={max_age}"
+    return 'no-cache'
+
+def document_etag(doc):
+    """ETag forte de um documento, derivado do nome e do updateTime do Firestore"""
+    version = f"{doc['name'].split('/documents/', 1)[-1]}@{doc.get('updateTime', 'missing')}"
+    return hashlib.blake2b(version.encode('utf-8'), digest_size=16).hexdigest()
+
+def documents_etag(collection_name, query, documents, extra=()):
+    """ETag de uma consulta: combina a consulta e (id, updateTime) de cada documento"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([collection_name, query_cache_params(query), list(extra)],
+                             sort_keys=True).encode('utf-8'))
+    for doc in documents:
+        digest.update(f"\n{doc['name']}@{doc.get('updateTime', '')}".encode('utf-8'))
+    return digest.hexdigest()
+
+def split_document_path(path):
+    """Separar "colecao/id" (ou subcoleções) em (coleção, id); None se inválido"""
+    if not isinstance(path, str):
+        return None
+    segments = path.strip('/').split('/')
+    if len(segments) < 2 or len(segments) % 2 != 0 or not all(segments):
+        return None
+    return '/'.join(segments[:-1]), segments[-1]
+
+def batch_get(paths):
+    """Resolver documentos pelo cache e, o que faltar, com documents:batchGet
+    
+    Recebe caminhos normalizados (sem barras nas pontas) e retorna
+    {caminho: {id, data}}; data é None para documentos inexistentes.
+    """
+    results, pending = cached_documents(paths)
+    generations = cache_generations(pending)
+    
+    url = f"{FIRESTORE_BASE_URL}:batchGet"
+    params = {'key': FIREBASE_API_KEY}
+    
+    for start in range(0, len(pending), BATCH_GET_CHUNK_SIZE):
+        chunk = pending[start:start + BATCH_GET_CHUNK_SIZE]
+        names = [f"{DOCUMENTS_PATH}/{path}" for path in chunk]
+        
+        # batchGet é uma leitura: pode ser repetido com segurança
+        response = firestore_client.post(url, params=params, json={'documents': names}, idempotent=True)
+        if response.status_code != 200:
+            raise UpstreamError(response.status_code, response.text)
+        
+        results.update(cache_batch_get_items(response.json(), len(response.content), generations))
+    
+    return results
+
+def cached_documents(paths):
+    """Separar os caminhos já em cache: retorna ({caminho: {id, data}}, pendentes)"""
+    results = {}
+    pending = []
+    for path in dict.fromkeys(paths):
+        collection_name, doc_id = split_document_path(path)
+        cached = read_cache.get(read_cache.document_key(collection_name, doc_id))
+        if cached is not None:
+            results[path] = cached.value
+        else:
+            pending.append(path)
+    return results, pending
+
+def cache_generations(paths):
+    """Gerações do cache (ver ReadCache.generation) das coleções dos caminhos, antes de buscá-los"""
+    collections = {split_document_path(path)[0] for path in paths}
+    return {collection_name: read_cache.generation(collection_name) for collection_name in collections}
+
+def cache_batch_get_items(items, content_length, generations):
+    """Decodificar a resposta de um batchGet, guardando cada documento no cache"""
+    results = {}
+    entry_size = content_length // max(len(items), 1)
+    for item in items:
+        if 'found' in item:
+            name = item['found']['name']
+            result = decode_document(item['found'])
+            etag = document_etag(item['found'])
         else:
-            result[key] = {'stringValue': str(value)}
+            name = item.get('missing', '')
+            result = {'id': name.split('/')[-1], 'data': None}
+            etag = None
+        
+        path = name.split('/documents/', 1)[-1]
+        collection_name, doc_id = split_document_path(path)
+        if etag is None:
+            etag = document_etag({'name': path})
+        read_cache.set(read_cache.document_key(collection_name, doc_id), JSONPayload(result, etag=etag),
+                       size=entry_size, generation=generations.get(collection_name))
+        results[path] = result
+    return results
+
+def run_count_query(collection_name, clauses):
+    """Contar documentos no próprio Firestore com runAggregationQuery (COUNT)"""
+    url = f"{FIRESTORE_BASE_URL}:runAggregationQuery"
+    params = {'key': FIREBASE_API_KEY}
     
-    return result
+    # Agregação é uma leitura: pode ser repetida com segurança
+    response = firestore_client.post(url, params=params, json=count_query_payload(collection_name, clauses),
+                                     idempotent=True)
+    if response.status_code != 200:
+        raise UpstreamError(response.status_code, response.text)
+    
+    return count_from_response(response.json())
 
-def convert_to_firestore_value(value):
-    """Converter um valor individual para formato Firestore"""
-    if isinstance(value, str):
-        return {'stringValue': value}
-    elif isinstance(value, int):
-        return {'integerValue': str(value)}
-    elif isinstance(value, float):
-        return {'doubleValue': value}
-    elif isinstance(value, bool):
-        return {'booleanValue': value}
-    elif value is None:
-        return {'nullValue': None}
+def count_query_payload(collection_name, clauses):
+    return {
+        'structuredAggregationQuery': {
+            'structuredQuery': compile_structured_query(collection_name, clauses),
+            'aggregations': [{'alias': 'total', 'count': {}}]
+        }
+    }
+
+def count_from_response(items):
+    for item in items:
+        if 'result' in item:
+            return int(item['result']['aggregateFields']['total']['integerValue'])
+    return 0
+
+def register_write_listener(listener):
+    """Registrar função chamada após escritas: listener(coleção, id, dados, operação)
+    
+    A operação é 'create', 'set', 'update' ou 'delete'; em 'update' os dados são
+    parciais e em 'delete' são os dados anteriores, se conhecidos (senão None).
+    """
+    write_listeners.append(listener)
+    return listener
+
+def on_document_written(collection_name, doc_id, data, operation, document=None):
+    """Atualizar caches e avisar os listeners após uma escrita feita por este processo
+    
+    `document` é o documento completo retornado pelo Firestore, quando houver.
+    """
+    # O espelho é atualizado antes de invalidar os caches, que podem ser relidos dele
+    try:
+        if document is not None:
+            firestore_mirror.apply_write(collection_name, doc_id, parse_firestore_fields(document.get('fields', {})),
+                                         document['updateTime'], operation)
+        elif operation == 'delete':
+            firestore_mirror.apply_write(collection_name, doc_id, None, None, operation)
+    except Exception as e:
+        print(f"Erro ao atualizar o espelho de {collection_name}/{doc_id}: {e}")
+    
+    read_cache.invalidate_document(collection_name, doc_id)
+    # As consultas quentes continuam servindo o último resultado até a atualização
+    hot_queries.mark_stale(collection_name)
+    
+    # Leituras já em andamento podem não refletir a escrita: quem chegar depois faz outra
+    for flights in (read_flights, async_read_flights):
+        flights.forget(lambda key: key[1] == collection_name)
+    
+    if operation == 'create':
+        count_cache.record_created(collection_name, data)
+    elif operation == 'delete':
+        count_cache.record_deleted(collection_name, data)
     else:
-        return {'stringValue': str(value)}
+        count_cache.record_modified(collection_name, data)
+    
+    for listener in write_listeners:
+        try:
+            listener(collection_name, doc_id, data, operation)
+        except Exception as e:
+            print(f"Erro ao processar escrita em {collection_name}/{doc_id}: {e}")
+
+def configure_hot_queries(spec=FIRESTORE_HOT_QUERIES):
+    """Registrar as consultas quentes de FIRESTORE_HOT_QUERIES; lança ValueError"""
+    for item in filter(None, (part.strip() for part in spec.split(';'))):
+        collection_name, _, query_string = item.partition('?')
+        query, page_size, page_token, _ = parse_collection_args(MultiDict(parse_qsl(query_string)))
+        cache_key = collection_cache_key(collection_name, query, page_size, page_token)
+        hot_queries.register(cache_key, collection_loader(collection_name, query, page_size, page_token, cache_key),
+                             derive=hot_query_deriver(collection_name, query))
+
+def collection_loader(collection_name, query, page_size, page_token, cache_key):
+    return lambda: read_flights.do(cache_key, fetch_collection, collection_name, query,
+                                   page_size, page_token, cache_key)
+
+def document_loader(collection_name, doc_id, cache_key):
+    return lambda: read_flights.do(cache_key, fetch_document, collection_name, doc_id, cache_key)
+
+def hot_query_deriver(collection_name, query):
+    """Registrar os documentos mais recentes e as listagens por categoria de uma listagem quente"""
+    def derive(parent_key, payload):
+        value = payload.value
+        documents = value['documents'] if isinstance(value, dict) else value
+        
+        children = {}
+        for doc in documents[:FIRESTORE_HOT_RECENT_DOCUMENTS]:
+            cache_key = read_cache.document_key(collection_name, doc['id'])
+            children[cache_key] = document_loader(collection_name, doc['id'], cache_key)
+        
+        # Listagens por categoria (mesma ordenação) só a partir de listagens sem filtro
+        if FIRESTORE_HOT_CATEGORY_FIELD and not query['where']:
+            categories = {(doc.get('data') or {}).get(FIRESTORE_HOT_CATEGORY_FIELD) for doc in documents}
+            for category in sorted(c for c in categories if isinstance(c, str)):
+                category_query = dict(query, where=[{
+                    'field': FIRESTORE_HOT_CATEGORY_FIELD,
+                    'operator': '==',
+                    'value': category
+                }])
+                cache_key = collection_cache_key(collection_name, category_query)
+                children[cache_key] = collection_loader(collection_name, category_query, None, None, cache_key)
+        
+        hot_queries.replace_children(parent_key, children)
+    return derive
+
+def warm_up_hot_queries(timeout=FIRESTORE_HOT_WARMUP_TIMEOUT):
+    """Carregar as consultas quentes antes de aceitar tráfego (a atualização começa em hot_queries.start)"""
+    if not FIRESTORE_HOT_QUERIES or not FIREBASE_PROJECT_ID:
+        return
+    try:
+        configure_hot_queries()
+    except ValueError as e:
+        print(f"FIRESTORE_HOT_QUERIES inválido: {e}")
+        return
+    
+    loaded, total = hot_queries.warm_up(timeout)
+    print(f"Consultas quentes carregadas: {loaded}/{total}")
 
 def apply_where_filter(doc_data, where_filter):
     """Aplicar filtro where aos dados do documento"""
@@ -0,0 +1,549 @@
+import asyncio
+import json
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+from werkzeug.http import parse_etags
+from src.services.firestore_async_client import async_firestore_client
+from src.services.cache import SharedReadCache, read_cache
+from src.services.count_cache import count_cache, value_key
+from src.services.compression import JSONPayload, prepare_payload
+from src.services.singleflight import async_read_flights
+from src.services.hot_queries import hot_queries
+from src.services.firestore_mirror import firestore_mirror
+from src.routes.firebase_proxy import (
+    FIREBASE_API_KEY, FIREBASE_PROJECT_ID, FIRESTORE_BASE_URL, DOCUMENTS_PATH,
+    STREAM_PAGE_SIZE, MAX_BATCH_GET_DOCUMENTS, BATCH_GET_CHUNK_SIZE,
+    UpstreamError, parse_collection_args, parse_count_args, collection_read_key, http_cache_control,
+    split_document_path, list_params, list_page_size, query_structured_query, missing_index, query_result,
+    page_request, list_page_result, page_structured_query, query_page_result, page_payload,
+    cached_documents, cache_generations, cache_batch_get_items,
+    count_clauses, count_query_payload, count_from_response, creation_fields, update_fields,
+    on_document_written, known_missing, document_payload, convert_to_firestore_fields, mirror_query, mirror_document,
+    MAX_COMMIT_WRITES, parse_batch_writes, commit_body, write_result, apply_committed_writes
+)
+
+# Versão asyncio das rotas de firebase_proxy (mesmos caminhos, parâmetros e respostas),
+# servida pelo src/asgi.py. Só as chamadas HTTP são próprias daqui: consultas, cursores,
+# payloads, ETags e chaves de cache vêm das funções da versão Flask.
+
+def json_response(request, value, status=200):
+    """Equivalente ao jsonify, com a mesma compressão das respostas do Flask"""
+    return payload_response(request, JSONPayload(value), status)
+
+def payload_response(request, payload, status=200, cache_control=None):
+    status, body, headers = prepare_payload(
+        payload, request.headers.get('Accept-Encoding'),
+        parse_etags(request.headers.get('If-None-Match')), status, cache_control
+    )
+    media_type = 'application/json' if status != 304 else None
+    return Response(body, status_code=status, headers=headers, media_type=media_type)
+
+async def cache_call(function, *args, **kwargs):
+    """Chamar o cache de leitura sem bloquear o event loop
+
+    O backend sqlite faz I/O em disco e vai para o pool de threads; o de memória
+    é chamado direto (o pool custaria mais que a própria leitura).
+    """
+    if isinstance(read_cache, SharedReadCache):
+        return await run_in_threadpool(function, *args, **kwargs)
+    return function(*args, **kwargs)
+
+async def read_json(request):
+    """Corpo JSON da requisição ou None (como request.get_json(silent=True))"""
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+async def health_check(request):
+    """Endpoint para verificar se o proxy está funcionando"""
+    return json_response(request, {
+        'status': 'healthy',
+        'service': 'Firebase Proxy',
+        'firebase_configured': bool(FIREBASE_API_KEY and FIREBASE_PROJECT_ID)
+    })
+
+async def proxy_stats(request):
+    """Estatísticas do cliente HTTP usado pelo proxy"""
+    return json_response(request, {
+        'http_client': async_firestore_client.stats(),
+        'cache': await cache_call(read_cache.stats),
+        'counts': count_cache.stats(),
+        'singleflight': async_read_flights.stats(),
+        'hot_queries': hot_queries.stats(),
+        # Consulta SQL ao espelho: vai para o pool de threads
+        'mirror': await run_in_threadpool(firestore_mirror.stats)
+    })
+
+async def get_collection(request):
+    """Buscar documentos de uma coleção (ver firebase_proxy.get_collection)"""
+    collection_name = request.path_params['collection_name']
+    try:
+        try:
+            query, page_size, page_token, stream = parse_collection_args(request.query_params)
+        except ValueError as e:
+            return json_response(request, {
+                'error': 'Parâmetros de consulta inválidos',
+                'details': str(e)
+            }, 400)
+
+        if stream:
+            return await stream_collection(collection_name, query, page_size or STREAM_PAGE_SIZE, page_token)
+
+        page_size, cache_key = collection_read_key(collection_name, query, page_size, page_token)
+        cache_control = http_cache_control(collection_name)
+        cached = hot_queries.get(cache_key) or await cache_call(read_cache.get, cache_key)
+        if cached is not None:
+            return payload_response(request, cached, cache_control=cache_control)
+
+        # Leituras idênticas simultâneas compartilham uma única chamada ao Firestore
+        payload = await async_read_flights.do(cache_key, fetch_collection, collection_name, query,
+                                              page_size, page_token, cache_key)
+        return payload_response(request, payload, cache_control=cache_control)
+
+    except UpstreamError as e:
+        return json_response(request, {
+            'error': 'Erro ao buscar documentos',
+            'details': e.details
+        }, e.status_code)
+    except Exception as e:
+        return json_response(request, {
+            'error': 'Erro interno do servidor',
+            'details': str(e)
+        }, 500)
+
+async def get_document(request):
+    """Buscar um documento específico"""
+    collection_name = request.path_params['collection_name']
+    doc_id = request.path_params['doc_id']
+    try:
+        cache_key = read_cache.document_key(collection_name, doc_id)
+        cache_control = http_cache_control(collection_name)
+        cached = hot_queries.get(cache_key) or await cache_call(read_cache.get, cache_key)
+        if cached is not None:
+            return payload_response(request, cached, cache_control=cache_control)
+
+        payload = await async_read_flights.do(cache_key, fetch_document, collection_name, doc_id, cache_key)
+        return payload_response(request, payload, cache_control=cache_control)
+
+    except UpstreamError as e:
+        return json_response(request, {
+            'error': 'Erro ao buscar documento',
+            'details': e.details
+        }, e.status_code)
+    except Exception as e:
+        return json_response(request, {
+            'error': 'Erro interno do servidor',
+            'details': str(e)
+        }, 500)
+
+async def batch_get_documents(request):
+    """Buscar vários documentos em uma única chamada (ver firebase_proxy.batch_get_documents)"""
+    try:
+        data = await read_json(request) or {}
+        paths = data.get('documents')
+
+        if not isinstance(paths, list) or not paths:
+            return json_response(request, {
+                'error': 'Informe a lista de documentos',
+                'details': 'Campo documents deve ser uma lista de caminhos colecao/id'
+            }, 400)
+
+        if len(paths) > MAX_BATCH_GET_DOCUMENTS:
+            return json_response(request, {
+                'error': 'Documentos demais na requisição',
+                'details': f'Máximo de {MAX_BATCH_GET_DOCUMENTS} documentos por chamada'
+            }, 400)
+
+        invalid = [path for path in paths if split_document_path(path) is None]
+        if invalid:
+            return json_response(request, {
+                'error': 'Caminho de documento inválido',
+                'details': invalid
+            }, 400)
+
+        paths = [path.strip('/') for path in paths]
+        results = await batch_get(paths)
+
+        return json_response(request, {
+            'documents': [
+                {
+                    'path': path,
+                    'id': results[path]['id'],
+                    'exists': results[path]['data'] is not None,
+                    'data': results[path]['data']
+                }
+                for path in paths
+            ]
+        })
+
+    except UpstreamError as e:
+        return json_response(request, {
+            'error': 'Erro ao buscar documentos',
+            'details': e.details
+        }, e.status_code)
+    except Exception as e:
+        return json_response(request, {
+            'error': 'Erro interno do servidor',
+            'details': str(e)
+        }, 500)
+
+async def count_documents(request):
+    """Contar documentos de uma coleção com campo == valor"""
+    try:
+        try:
+            collection_name, field, value = parse_count_args(request.query_params)
+        except ValueError as e:
+            return json_response(request, {
+                'error': 'Parâmetros de consulta inválidos',
+                'details': str(e)
+            }, 400)
+
+        count = count_cache.get(collection_name, field, value)
+        if count is None:
+            count = await async_read_flights.do(('count', collection_name, field, value_key(value)),
+                                                fetch_count, collection_name, field, value)
+
+        return json_response(request, {
+            'collection': collection_name,
+            'field': field,
+            'value': value,
+            'count': count
+        })
+
+    except UpstreamError as e:
+        return json_response(request, {
+            'error': 'Erro ao contar documentos',
+            'details': e.details
+        }, e.status_code)
+    except Exception as e:
+        return json_response(request, {
+            'error': 'Erro interno do servidor',
+            'details': str(e)
+        }, 500)
+
+async def add_document(request):
+    """Adicionar novo documento"""
+    collection_name = request.path_params['collection_name']
+    try:
+        data = await request.json()
+
+        url = f"{FIRESTORE_BASE_URL}/{collection_name}"
+        response = await async_firestore_client.post(url, params={'key': FIREBASE_API_KEY},
+                                                     json={'fields': creation_fields(data)})
+
+        if response.status_code == 200:
+            doc = response.json()
+            doc_id = doc['name'].split('/')[-1]
+            await run_in_threadpool(on_document_written, collection_name, doc_id, data, 'create', document=doc)
+            return json_response(request, {
+                'id': doc_id,
+                'success': True
+            })
+        return json_response(request, {
+            'error': 'Erro ao adicionar documento',
+            'details': response.text
+        }, response.status_code)
+
+    except Exception as e:
+        return json_response(request, {
+            'error': 'Erro interno do servidor',
+            'details': str(e)
+        }, 500)
+
+async def set_document(request):
+    """Definir/substituir documento"""
+    collection_name = request.path_params['collection_name']
+    doc_id = request.path_params['doc_id']
+    try:
+        data = await request.json()
+
+        url = f"{FIRESTORE_BASE_URL}/{collection_name}/{doc_id}"
+        # Definir um documento que não existia é uma criação (as contagens somam 1)
+        operation = 'create' if await run_in_threadpool(known_missing, collection_name, doc_id) else 'set'
+        response = await async_firestore_client.patch(url, params={'key': FIREBASE_API_KEY},
+                                                      json={'fields': convert_to_firestore_fields(data)})
+
+        if response.status_code == 200:
+            await run_in_threadpool(on_document_written, collection_name, doc_id, data, operation,
+                                    document=response.json())
+            return json_response(request, {
+                'id': doc_id,
+                'success': True
+            })
+        return json_response(request, {
+            'error': 'Erro ao definir documento',
+            'details': response.text
+        }, response.status_code)
+
+    except Exception as e:
+        return json_response(request, {
+            'error': 'Erro interno do servidor',
+            'details': str(e)
+        }, 500)
+
+async def update_document(request):
+    """Atualizar documento parcialmente"""
+    collection_name = request.path_params['collection_name']
+    doc_id = request.path_params['doc_id']
+    try:
+        data = await request.json()
+        firestore_fields = update_fields(data)
+
+        url = f"{FIRESTORE_BASE_URL}/{collection_name}/{doc_id}"
+        params = {
+            'key': FIREBASE_API_KEY,
+            'updateMask.fieldPaths': list(firestore_fields.keys())
+        }
+        response = await async_firestore_client.patch(url, params=params, json={'fields': firestore_fields})
+
+        if response.status_code == 200:
+            await run_in_threadpool(on_document_written, collection_name, doc_id, data, 'update',
+                                    document=response.json())
+            return json_response(request, {
+                'id': doc_id,
+                'success': True
+            })
+        return json_response(request, {
+            'error': 'Erro ao atualizar documento',
+            'details': response.text
+        }, response.status_code)
+
+    except Exception as e:
+        return json_response(request, {
+            'error': 'Erro interno do servidor',
+            'details': str(e)
+        }, 500)
+
+async def commit_documents(request):
+    """Gravar várias operações com documents:commit (ver firebase_proxy.commit_documents)"""
+    try:
+        data = await read_json(request) or {}
+        operations, errors = parse_batch_writes(data.get('writes'))
+        if errors:
+            return json_response(request, {
+                'error': 'Operações de escrita inválidas',
+                'details': errors
+            }, 400)
+
+        url = f"{FIRESTORE_BASE_URL}:commit"
+        results = []
+        for start in range(0, len(operations), MAX_COMMIT_WRITES):
+            chunk = operations[start:start + MAX_COMMIT_WRITES]
+            response = await async_firestore_client.post(url, params={'key': FIREBASE_API_KEY},
+                                                         json=commit_body(chunk))
+
+            if response.status_code != 200:
+                results.extend(write_result(op, 'failed') for op in chunk)
+                results.extend(write_result(op, 'skipped') for op in operations[start + MAX_COMMIT_WRITES:])
+                return json_response(request, {
+                    'error': 'Erro ao gravar documentos',
+                    'details': response.text,
+                    'results': results
+                }, response.status_code)
+
+            results.extend(await run_in_threadpool(apply_committed_writes, chunk, response.json()))
+
+        return json_response(request, {
+            'success': True,
+            'commits': -(-len(operations) // MAX_COMMIT_WRITES),
+            'results': results
+        })
+
+    except Exception as e:
+        return json_response(request, {
+            'error': 'Erro interno do servidor',
+            'details': str(e)
+        }, 500)
+
+async def fetch_collection(collection_name, query, page_size, page_token, cache_key):
+    """Buscar a consulta (paginada se houver page_size) e guardar o payload no cache"""
+    generation = await cache_call(read_cache.generation, collection_name)
+    if page_size:
+        documents, next_page_token, size, etag = await query_collection_page(
+            collection_name, query, page_size, page_token
+        )
+        payload = page_payload(documents, next_page_token, etag)
+    elif firestore_mirror.serves(collection_name):
+        result, size, etag = await run_in_threadpool(mirror_query, collection_name, query)
+        payload = JSONPayload(result, etag=etag)
+    else:
+        result, size, etag = await query_collection(collection_name, query)
+        payload = JSONPayload(result, etag=etag)
+    await cache_call(read_cache.set, cache_key, payload, size=size, generation=generation)
+    return payload
+
+async def fetch_document(collection_name, doc_id, cache_key):
+    """Buscar um documento e guardar o payload no cache (data=None se não existir)"""
+    generation = await cache_call(read_cache.generation, collection_name)
+    if firestore_mirror.serves(collection_name):
+        mirrored = await run_in_threadpool(mirror_document, collection_name, doc_id)
+        if mirrored is not None:
+            payload, size = mirrored
+            await cache_call(read_cache.set, cache_key, payload, size=size, generation=generation)
+            return payload
+
+    url = f"{FIRESTORE_BASE_URL}/{collection_name}/{doc_id}"
+    response = await async_firestore_client.get(url, params={'key': FIREBASE_API_KEY})
+    payload = document_payload(collection_name, doc_id, response.status_code, response)
+    await cache_call(read_cache.set, cache_key, payload, size=len(response.content), generation=generation)
+    return payload
+
+async def fetch_count(collection_name, field, value):
+    """Contar documentos com campo == valor e guardar no cache de contagens"""
+    generation = count_cache.generation(collection_name)
+    count = await run_count_query(collection_name, count_clauses(field, value))
+    count_cache.set(collection_name, field, value, count, generation=generation)
+    return count
+
+async def list_documents(collection_name, order_by=(), page_size=None, page_token=None):
+    """Listar documentos de uma coleção (sem filtros)"""
+    url = f"{FIRESTORE_BASE_URL}/{collection_name}"
+    response = await async_firestore_client.get(url, params=list_params(order_by, page_size, page_token))
+    if response.status_code != 200:
+        raise UpstreamError(response.status_code, response.text)
+    return response.json(), len(response.content)
+
+async def list_all_documents(collection_name, order_by=(), limit=None):
+    """Listar a coleção inteira (ou até `limit` documentos), seguindo o nextPageToken"""
+    documents = []
+    size = 0
+    page_token = None
+    while True:
+        data, page_bytes = await list_documents(collection_name, order_by, list_page_size(limit, len(documents)),
+                                                page_token)
+        documents.extend(data.get('documents', []))
+        size += page_bytes
+
+        page_token = data.get('nextPageToken')
+        if not page_token or (limit is not None and len(documents) >= limit):
+            return documents[:limit], size
+
+async def run_structured_query(structured_query):
+    """Executar um runQuery e retornar os documentos encontrados"""
+    url = f"{FIRESTORE_BASE_URL}:runQuery"
+    response = await async_firestore_client.post(url, params={'key': FIREBASE_API_KEY},
+                                                 json={'structuredQuery': structured_query}, idempotent=True)
+    if response.status_code != 200:
+        raise UpstreamError(response.status_code, response.text)
+
+    documents = [item['document'] for item in response.json() if 'document' in item]
+    return documents, len(response.content)
+
+async def query_collection(collection_name, query):
+    """Buscar documentos aplicando where/orderBy/limit (ver firebase_proxy.query_collection)"""
+    if not query['where']:
+        documents, size = await list_all_documents(collection_name, query['orderBy'], query['limit'])
+        result, etag = query_result(collection_name, query, documents)
+        return result, size, etag
+
+    sort_locally = False
+    try:
+        documents, size = await run_structured_query(query_structured_query(collection_name, query))
+    except UpstreamError as e:
+        if not missing_index(collection_name, query, e):
+            raise
+        sort_locally = True
+        documents, size = await run_structured_query(query_structured_query(collection_name, query, sort_locally))
+
+    result, etag = query_result(collection_name, query, documents, sort_locally)
+    return result, size, etag
+
+async def query_collection_page(collection_name, query, page_size, page_token=None):
+    """Buscar uma página da consulta; retorna (documentos, nextPageToken, bytes, etag)"""
+    cursor, remaining, page_size = page_request(query, page_size, page_token)
+
+    if not query['where']:
+        data, size = await list_documents(collection_name, query['orderBy'], page_size, cursor.get('token'))
+        result, next_page_token, etag = list_page_result(collection_name, query, data, page_size,
+                                                         remaining, page_token)
+        return result, next_page_token, size, etag
+
+    documents, size = await run_structured_query(page_structured_query(collection_name, query, page_size, cursor))
+    result, next_page_token, etag = query_page_result(collection_name, query, documents, page_size,
+                                                      remaining, page_token)
+    return result, next_page_token, size, etag
+
+async def iter_collection(collection_name, query, page_size, page_token=None):
+    """Percorrer a consulta página por página, buscando a próxima só quando necessário"""
+    while True:
+        documents, page_token, _, _ = await query_collection_page(collection_name, query, page_size, page_token)
+
+        for doc in documents:
+            yield doc
+
+        if not page_token:
+            return
+
+async def stream_collection(collection_name, query, page_size, page_token=None):
+    """Responder a consulta em NDJSON, com memória constante"""
+    documents = iter_collection(collection_name, query, page_size, page_token)
+
+    # A primeira página é buscada antes de responder para que erros virem status HTTP
+    try:
+        first = await documents.__anext__()
+    except StopAsyncIteration:
+        first = None
+
+    async def generate():
+        if first is None:
+            return
+        yield json.dumps(first, ensure_ascii=False) + '\n'
+        try:
+            async for doc in documents:
+                yield json.dumps(doc, ensure_ascii=False) + '\n'
+        except Exception as e:
+            details = e.details if isinstance(e, UpstreamError) else str(e)
+            yield json.dumps({'error': 'Erro ao buscar documentos', 'details': details}, ensure_ascii=False) + '\n'
+
+    return StreamingResponse(generate(), media_type='application/x-ndjson')
+
+async def batch_get(paths):
+    """Resolver documentos pelo cache e, o que faltar, com batchGets em paralelo"""
+    results, pending = await cache_call(cached_documents, paths)
+    generations = await cache_call(cache_generations, pending)
+
+    chunks = [pending[start:start + BATCH_GET_CHUNK_SIZE]
+              for start in range(0, len(pending), BATCH_GET_CHUNK_SIZE)]
+    for chunk_results in await asyncio.gather(*(batch_get_chunk(chunk, generations) for chunk in chunks)):
+        results.update(chunk_results)
+
+    return results
+
+async def batch_get_chunk(paths, generations):
+    url = f"{FIRESTORE_BASE_URL}:batchGet"
+    names = [f"{DOCUMENTS_PATH}/{path}" for path in paths]
+
+    # batchGet é uma leitura: pode ser repetido com segurança
+    response = await async_firestore_client.post(url, params={'key': FIREBASE_API_KEY},
+                                                 json={'documents': names}, idempotent=True)
+    if response.status_code != 200:
+        raise UpstreamError(response.status_code, response.text)
+    return await cache_call(cache_batch_get_items, response.json(), len(response.content), generations)
+
+async def run_count_query(collection_name, clauses):
+    """Contar documentos no próprio Firestore com runAggregationQuery (COUNT)"""
+    url = f"{FIRESTORE_BASE_URL}:runAggregationQuery"
+    response = await async_firestore_client.post(url, params={'key': FIREBASE_API_KEY},
+                                                 json=count_query_payload(collection_name, clauses),
+                                                 idempotent=True)
+    if response.status_code != 200:
+        raise UpstreamError(response.status_code, response.text)
+    return count_from_response(response.json())
+
+# Caminhos completos (e não um Mount) para que o que não casar aqui caia no Flask
+URL_PREFIX = '/api/firebase'
+
+routes = [
+    Route(f'{URL_PREFIX}/health', health_check, methods=['GET']),
+    Route(f'{URL_PREFIX}/stats', proxy_stats, methods=['GET']),
+    Route(f'{URL_PREFIX}/firestore:batchGet', batch_get_documents, methods=['POST']),
+    Route(f'{URL_PREFIX}/firestore:count', count_documents, methods=['GET']),
+    Route(f'{URL_PREFIX}/firestore:commit', commit_documents, methods=['POST']),
+    Route(f'{URL_PREFIX}/firestore/{{collection_name}}', get_collection, methods=['GET']),
+    Route(f'{URL_PREFIX}/firestore/{{collection_name}}', add_document, methods=['POST']),
+    Route(f'{URL_PREFIX}/firestore/{{collection_name}}/{{doc_id}}', get_document, methods=['GET']),
+    Route(f'{URL_PREFIX}/firestore/{{collection_name}}/{{doc_id}}', set_document, methods=['PUT']),
+    Route(f'{URL_PREFIX}/firestore/{{collection_name}}/{{doc_id}}', update_document, methods=['PATCH'])
+]
@@ -0,0 +1,49 @@
+from flask import Blueprint, request, jsonify
+from src.services.mail_queue import mail_queue
+
+mail_bp = Blueprint('mail', __name__)
+
+@mail_bp.route('/mail/queue', methods=['GET'])
+def mail_queue_status():
+    """Endpoint para acompanhar a fila de emails e a lista de mensagens mortas (apenas para admin)"""
+    try:
+        # Em produção, adicionar autenticação de admin
+        try:
+            limit = min(int(request.args.get('limit', 100)), 1000)
+        except ValueError:
+            limit = 100
+        
+        return jsonify({
+            'success': True,
+            'stats': mail_queue.stats(),
+            'dead': mail_queue.dead_letters(limit)
+        })
+        
+    except Exception as e:
+        print(f"Erro ao consultar fila de emails: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Erro ao consultar fila de emails'
+        }), 500
+
+@mail_bp.route('/mail/queue/<int:job_id>/retry', methods=['POST'])
+def retry_dead_mail(job_id):
+    """Endpoint para reenfileirar uma mensagem morta (apenas para admin)"""
+    try:
+        if not mail_queue.retry_dead(job_id):
+            return jsonify({
+                'success': False,
+                'error': 'Mensagem não encontrada na lista de mensagens mortas'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'message': 'Mensagem reenfileirada.'
+        })
+        
+    except Exception as e:
+        print(f"Erro ao reenfileirar email: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Erro ao reenfileirar email'
+        }), 500
@@ -0,0 +1,94 @@
+from flask import Blueprint, Response, request
+from src.services.cache import read_cache
+from src.services.count_cache import count_cache
+from src.services.hot_queries import hot_queries
+from src.services.metrics import metrics, WSGIMetricsMiddleware, CONTENT_TYPE, ROUTE_ENVIRON_KEY
+from src.services.singleflight import read_flights, async_read_flights
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Endpoint de métricas no formato do Prometheus (todos os workers somados)"""
+    try:
+        families = metrics.gather()
+        families.update(cache_hit_ratios(families))
+        return Response(metrics.render(families), content_type=CONTENT_TYPE)
+
+    except Exception as e:
+        print(f"Erro ao gerar métricas: {e}")
+        return Response(f"# Erro ao gerar métricas: {e}\n", status=500, content_type=CONTENT_TYPE)
+
+@metrics.collector
+def collect_cache_lookups():
+    """Acertos e faltas que os caches já contam, lidos só na hora da consulta"""
+    samples = []
+
+    stats = read_cache.stats()
+    samples.append([['read', 'hit'], stats['hits']])
+    if 'shared_hits' in stats:
+        samples.append([['read', 'shared_hit'], stats['shared_hits']])
+    samples.append([['read', 'miss'], stats['misses']])
+
+    stats = count_cache.stats()
+    samples.append([['count', 'hit'], stats['hits']])
+    samples.append([['count', 'miss'], stats['misses']])
+
+    # Consultas quentes só registram acertos: as faltas seguem para o cache de leitura
+    stats = hot_queries.stats()
+    samples.append([['hot_queries', 'hit'], stats['hits']])
+    samples.append([['hot_queries', 'stale_hit'], stats['stale_hits']])
+
+    flights = []
+    for name, flight in (('sync', read_flights), ('async', async_read_flights)):
+        stats = flight.stats()
+        flights.append([[name, 'executed'], stats['executions']])
+        flights.append([[name, 'collapsed'], stats['collapsed']])
+
+    return {
+        'cache_lookups_total': {
+            'type': 'counter',
+            'help': 'Consultas aos caches de leitura por resultado',
+            'labelnames': ['cache', 'result'],
+            'samples': samples
+        },
+        'firestore_singleflight_calls_total': {
+            'type': 'counter',
+            'help': 'Leituras do Firestore executadas ou compartilhadas com uma idêntica em andamento',
+            'labelnames': ['client', 'result'],
+            'samples': flights
+        }
+    }
+
+def cache_hit_ratios(families):
+    """Taxa de acerto de cada cache com faltas contadas, calculada sobre todos os workers"""
+    totals = {}
+    for (cache, result), value in families.get('cache_lookups_total', {}).get('samples', []):
+        total = totals.setdefault(cache, {'hits': 0, 'lookups': 0, 'misses': False})
+        total['lookups'] += value
+        if result == 'miss':
+            total['misses'] = True
+        else:
+            total['hits'] += value
+
+    return {
+        'cache_hit_ratio': {
+            'type': 'gauge',
+            'help': 'Acertos / consultas de cada cache desde o início dos processos',
+            'labelnames': ['cache'],
+            'samples': [
+                [[cache], round(total['hits'] / total['lookups'], 4) if total['lookups'] else 0.0]
+                for cache, total in sorted(totals.items()) if total['misses']
+            ]
+        }
+    }
+
+def remember_route():
+    """Guardar o padrão da rota (ex.: /api/firebase/firestore/<collection_name>) para o middleware"""
+    if request.url_rule is not None:
+        request.environ[ROUTE_ENVIRON_KEY] = request.url_rule.rule
+
+def init_metrics(app):
+    """Medir todas as requisições do app (todos os blueprints), por fora do Flask"""
+    app.before_request(remember_route)
+    app.wsgi_app = WSGIMetricsMiddleware(app.wsgi_app)
@@ -1,11 +1,13 @@
-import os
-import smtplib
 import re
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from flask import Blueprint, request, jsonify
 from datetime import datetime
-import json
+from sqlalchemy import func, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from src.models.user import db
+from src.models.newsletter import NewsletterSubscriber
+from src.services.mail_queue import mail_queue, mail_configured, SMTP_FROM
 
 newsletter_bp = Blueprint('newsletter', __name__)
 
@@ -30,13 +32,6 @@ def subscribe_newsletter():
                 'error': 'Email inválido'
             }), 400
         
-        # Verificar se já está inscrito
-        if is_email_subscribed(email):
-            return jsonify({
-                'success': False,
-                'error': 'Este email já está inscrito na nossa newsletter'
-            }), 400
-        
         # Preparar dados da inscrição
         subscription_data = {
             'email': email,
@@ -47,10 +42,14 @@ def subscribe_newsletter():
             'source': 'website'
         }
         
-        # Salvar inscrição
-        save_subscription(subscription_data)
+        # Salvar inscrição (falha se o email já estiver ativo)
+        if not save_subscription(subscription_data):
+            return jsonify({
+                'success': False,
+                'error': 'Este email já está inscrito na nossa newsletter'
+            }), 400
         
-        # Enviar email de boas-vindas
+        # Enfileirar email de boas-vindas
         try:
             send_welcome_email(email)
         except Exception as e:
@@ -82,16 +81,13 @@ def unsubscribe_newsletter():
                 'error': 'Email é obrigatório'
             }), 400
         
-        # Verificar se está inscrito
-        if not is_email_subscribed(email):
+        # Cancelar inscrição (falha se o email não estiver ativo)
+        if not unsubscribe_email(email):
             return jsonify({
                 'success': False,
                 'error': 'Este email não está inscrito na nossa newsletter'
             }), 400
         
-        # Cancelar inscrição
-        unsubscribe_email(email)
-        
         return jsonify({
             'success': True,
             'message': 'Inscrição cancelada com sucesso.'
@@ -109,30 +105,19 @@ def list_subscribers():
     """Endpoint para listar inscritos (apenas para admin)"""
     try:
         # Em produção, adicionar autenticação de admin
-        subscribers_file = 'data/newsletter_subscribers.json'
-        
-        if not os.path.exists(subscribers_file):
-            return jsonify({
-                'success': True,
-                'subscribers': [],
-                'total': 0,
-                'active': 0
-            })
-        
-        with open(subscribers_file, 'r', encoding='utf-8') as f:
-            subscribers = json.load(f)
-        
-        # Filtrar apenas ativos
-        active_subscribers = [s for s in subscribers if s.get('status') == 'active']
-        
         # Ordenar por data mais recente
-        subscribers.sort(key=lambda x: x['timestamp'], reverse=True)
+        subscribers = NewsletterSubscriber.query.order_by(NewsletterSubscriber.timestamp.desc()).all()
+        
+        # Contar apenas ativos
+        active = db.session.query(func.count(NewsletterSubscriber.id)).filter(
+            NewsletterSubscriber.status == 'active'
+        ).scalar()
         
         return jsonify({
             'success': True,
-            'subscribers': subscribers,
+            'subscribers': [subscriber.to_dict() for subscriber in subscribers],
             'total': len(subscribers),
-            'active': len(active_subscribers)
+            'active': active
         })
         
     except Exception as e:
@@ -147,94 +132,64 @@ def is_valid_email(email):
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
     return re.match(pattern, email) is not None
 
-def is_email_subscribed(email):
-    """Verifica se email já está inscrito"""
-    try:
-        subscribers_file = 'data/newsletter_subscribers.json'
-        
-        if not os.path.exists(subscribers_file):
-            return False
-        
-        with open(subscribers_file, 'r', encoding='utf-8') as f:
-            subscribers = json.load(f)
-        
-        # Verificar se email existe e está ativo
-        for subscriber in subscribers:
-            if subscriber['email'] == email and subscriber.get('status') == 'active':
-                return True
-        
-        return False
-        
-    except Exception as e:
-        print(f"Erro ao verificar inscrição: {e}")
-        return False
-
 def save_subscription(subscription_data):
-    """Salva inscrição em arquivo JSON"""
+    """Salva inscrição no banco; retorna False se o email já estiver ativo
+    
+    Um único INSERT ... ON CONFLICT: cria a inscrição ou reativa uma cancelada,
+    sem janela para duas requisições concorrentes duplicarem o email.
+    """
+    stmt = sqlite_insert(NewsletterSubscriber).values(**subscription_data)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['email'],
+        set_={
+            'status': 'active',
+            'timestamp': stmt.excluded.timestamp,
+            'ip': stmt.excluded.ip,
+            'user_agent': stmt.excluded.user_agent,
+            'source': stmt.excluded.source,
+            'unsubscribed_at': None
+        },
+        where=NewsletterSubscriber.status != 'active'
+    )
+    
     try:
-        subscribers_file = 'data/newsletter_subscribers.json'
-        
-        # Criar diretório se não existir
-        os.makedirs(os.path.dirname(subscribers_file), exist_ok=True)
-        
-        # Carregar inscritos existentes
-        subscribers = []
-        if os.path.exists(subscribers_file):
-            try:
-                with open(subscribers_file, 'r', encoding='utf-8') as f:
-                    subscribers = json.load(f)
-            except:
-                subscribers = []
-        
-        # Adicionar nova inscrição
-        subscribers.append(subscription_data)
-        
-        # Salvar arquivo
-        with open(subscribers_file, 'w', encoding='utf-8') as f:
-            json.dump(subscribers, f, ensure_ascii=False, indent=2)
-            
-    except Exception as e:
-        print(f"Erro ao salvar inscrição: {e}")
+        result = db.session.execute(stmt)
+        db.session.commit()
+        return result.rowcount == 1
+    except Exception:
+        db.session.rollback()
+        raise
 
 def unsubscribe_email(email):
-    """Cancela inscrição do email"""
+    """Cancela inscrição do email; retorna False se ele não estava ativo"""
+    stmt = update(NewsletterSubscriber).where(
+        NewsletterSubscriber.email == email,
+        NewsletterSubscriber.status == 'active'
+    ).values(
+        status='unsubscribed',
+        unsubscribed_at=datetime.now().isoformat()
+    )
+    
     try:
-        subscribers_file = 'data/newsletter_subscribers.json'
-        
-        if not os.path.exists(subscribers_file):
-            return
-        
-        with open(subscribers_file, 'r', encoding='utf-8') as f:
-            subscribers = json.load(f)
-        
-        # Atualizar status para inativo
-        for subscriber in subscribers:
-            if subscriber['email'] == email:
-                subscriber['status'] = 'unsubscribed'
-                subscriber['unsubscribed_at'] = datetime.now().isoformat()
-        
-        # Salvar arquivo
-        with open(subscribers_file, 'w', encoding='utf-8') as f:
-            json.dump(subscribers, f, ensure_ascii=False, indent=2)
-            
-    except Exception as e:
-        print(f"Erro ao cancelar inscrição: {e}")
+        result = db.session.execute(stmt)
+        db.session.commit()
+        return result.rowcount == 1
+    except Exception:
+        db.session.rollback()
+        raise
 
 def send_welcome_email(email):
-    """Envia email de boas-vindas"""
-    # Configurações de email (usar variáveis de ambiente em produção)
-    smtp_server = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
-    smtp_port = int(os.getenv('SMTP_PORT', '587'))
-    smtp_username = os.getenv('SMTP_USERNAME', '')
-    smtp_password = os.getenv('SMTP_PASSWORD', '')
-    
-    if not smtp_username or not smtp_password:
+    """Enfileira o email de boas-vindas (o envio é feito pelos workers da fila)"""
+    if not mail_configured():
         print("Configurações de email não encontradas")
         return
     
-    # Criar mensagem
+    mail_queue.enqueue(build_welcome_email(email))
+
+def build_welcome_email(email):
+    """Monta a mensagem de boas-vindas"""
     msg = MIMEMultipart('alternative')
-    msg['From'] = f"Sentinela de Dados <{smtp_username}>"
+    msg['From'] = f"Sentinela de Dados <{SMTP_FROM}>"
     msg['To'] = email
     msg['Subject'] = "Bem-vindo à Newsletter do Sentinela de Dados!"
     
@@ -317,9 +272,5 @@ def send_welcome_email(email):
     msg.attach(MIMEText(text_body, 'plain', 'utf-8'))
     msg.attach(MIMEText(html_body, 'html', 'utf-8'))
     
-    # Enviar email
-    with smtplib.SMTP(smtp_server, smtp_port) as server:
-        server.starttls()
-        server.login(smtp_username, smtp_password)
-        server.send_message(msg)
+    return msg
 
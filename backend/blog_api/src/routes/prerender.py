@@ -0,0 +1,337 @@
+import html
+import os
+from datetime import datetime
+from flask import Blueprint, request, jsonify, current_app
+from src.routes.firebase_proxy import (
+    FIREBASE_PROJECT_ID, STREAM_PAGE_SIZE, collection_cache_key, fetch_collection, fetch_document,
+    iter_collection, known_document_data, register_write_listener
+)
+from src.services.cache import read_cache
+from src.services.firestore_query import parse_query
+from src.services.prerender import prerender_service, fill_template
+from src.services.static_assets import static_assets
+
+prerender_bp = Blueprint('prerender', __name__)
+
+# Coleção com os artigos das páginas pré-renderizadas
+PRERENDER_COLLECTION = os.getenv('PRERENDER_COLLECTION', 'articles')
+
+SITE_NAME = 'Sentinela de Dados'
+
+# Mesmas categorias do js/category.js (slug da URL -> categoria gravada no Firestore)
+CATEGORIES = {
+    'ia': {
+        'name': 'Inteligência Artificial',
+        'firebase_category': 'IA',
+        'description': 'Entenda como a IA está transformando nossa sociedade e os debates éticos envolvidos.',
+        'bg_color': 'bg-blue-100',
+        'text_color': 'text-blue-600',
+        'icon': 'brain'
+    },
+    'bigdata': {
+        'name': 'Big Data',
+        'firebase_category': 'Big Data',
+        'description': 'Descubra como os dados estão moldando decisões e o que isso significa para sua privacidade.',
+        'bg_color': 'bg-green-100',
+        'text_color': 'text-green-600',
+        'icon': 'database'
+    },
+    'ciberseguranca': {
+        'name': 'Cibersegurança',
+        'firebase_category': 'Cibersegurança',
+        'description': 'Proteja-se online e entenda as ameaças digitais que enfrentamos diariamente.',
+        'bg_color': 'bg-red-100',
+        'text_color': 'text-red-600',
+        'icon': 'shield-alt'
+    },
+    'legislacao': {
+        'name': 'Legislação',
+        'firebase_category': 'Legislação',
+        'description': 'Análises sobre leis como LGPD e PL 2338/2023 e seu impacto na tecnologia.',
+        'bg_color': 'bg-purple-100',
+        'text_color': 'text-purple-600',
+        'icon': 'balance-scale'
+    },
+    'humor': {
+        'name': 'Humor',
+        'firebase_category': 'Humor',
+        'description': 'Um pouco de diversão com as situações mais inusitadas da tecnologia.',
+        'bg_color': 'bg-yellow-100',
+        'text_color': 'text-yellow-600',
+        'icon': 'laugh'
+    }
+}
+CATEGORY_SLUGS = {info['firebase_category']: slug for slug, info in CATEGORIES.items()}
+
+# Página do site -> (tipo da página pré-renderizada, parâmetro da URL com a chave)
+PRERENDERED_PAGES = {
+    'article.html': ('article', 'id'),
+    'category.html': ('category', 'cat')
+}
+
+# Meses como o toLocaleDateString('pt-BR', {month: 'short'}) do navegador
+MONTHS = ['jan.', 'fev.', 'mar.', 'abr.', 'mai.', 'jun.', 'jul.', 'ago.', 'set.', 'out.', 'nov.', 'dez.']
+
+@prerender_bp.route('/prerender/stats', methods=['GET'])
+def prerender_stats():
+    """Endpoint para acompanhar as páginas pré-renderizadas (apenas para admin)"""
+    try:
+        return jsonify({
+            'success': True,
+            'stats': prerender_service.stats()
+        })
+
+    except Exception as e:
+        print(f"Erro ao consultar páginas pré-renderizadas: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Erro ao consultar páginas pré-renderizadas'
+        }), 500
+
+@prerender_bp.route('/prerender/rebuild', methods=['POST'])
+def rebuild_prerendered_pages():
+    """Endpoint para regenerar todas as páginas (ex.: artigos alterados direto no console do Firebase)"""
+    try:
+        if not prerender_service.configured:
+            return jsonify({
+                'success': False,
+                'error': 'Pré-renderização desativada'
+            }), 404
+
+        # Em produção, adicionar autenticação de admin
+        prerender_service.rebuild()
+        return jsonify({
+            'success': True,
+            'stats': prerender_service.stats()
+        })
+
+    except Exception as e:
+        print(f"Erro ao regenerar páginas pré-renderizadas: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Erro ao regenerar páginas pré-renderizadas'
+        }), 500
+
+def prerendered_response(path):
+    """Resposta com a página pré-renderizada de article.html?id= / category.html?cat=, ou None"""
+    kind, param = PRERENDERED_PAGES.get(path, (None, None))
+    if kind is None or not prerender_service.configured:
+        return None
+    page = prerender_service.page(kind, request.args.get(param))
+    if page is None:
+        return None
+
+    body, etag = page
+    response = current_app.response_class(body, mimetype='text/html')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@register_write_listener
+def update_prerendered_pages(collection_name, doc_id, data, operation):
+    """Regenerar só as páginas afetadas por uma escrita: o artigo e a(s) categoria(s)"""
+    if collection_name != PRERENDER_COLLECTION or not prerender_service.configured:
+        return
+
+    prerender_service.schedule('article', doc_id)
+
+    # Um 'update' que troca a categoria tira o artigo da anterior, que não é
+    # conhecida; sem os dados do documento também não: nesses casos todas as
+    # categorias são regeneradas
+    data = data or {}
+    changes_category = operation == 'update' and 'category' in data
+    if operation == 'update' and not changes_category:
+        data = known_document_data(collection_name, doc_id) or {}
+    slug = category_slug(data.get('category'))
+    slugs = CATEGORIES if slug is None or changes_category else [slug]
+    for slug in slugs:
+        prerender_service.schedule('category', slug)
+
+def category_slug(category):
+    """Slug da URL de uma categoria gravada no artigo ("IA" -> "ia")"""
+    if category in CATEGORY_SLUGS:
+        return CATEGORY_SLUGS[category]
+    return category if category in CATEGORIES else None
+
+# As páginas são geradas logo após uma escrita: a leitura vai direto ao Firestore (ou ao
+# espelho, já atualizado), sem os caches e consultas quentes que ainda têm a versão
+# anterior; o resultado também renova o cache de leitura do proxy
+
+def load_article(doc_id):
+    """Dados atuais de um artigo (None se não existir)"""
+    cache_key = read_cache.document_key(PRERENDER_COLLECTION, doc_id)
+    return fetch_document(PRERENDER_COLLECTION, doc_id, cache_key).value['data']
+
+def load_category_articles(info):
+    """Artigos de uma categoria, do mais novo para o mais antigo"""
+    query = parse_query()
+    query['where'].append({'field': 'category', 'operator': '==', 'value': info['firebase_category']})
+    cache_key = collection_cache_key(PRERENDER_COLLECTION, query)
+    payload = fetch_collection(PRERENDER_COLLECTION, query, None, None, cache_key)
+    return sorted(payload.value, key=lambda doc: article_date(doc['data']) or '', reverse=True)
+
+def article_date(article):
+    return article.get('date') or article.get('timestamp')
+
+def format_date(value):
+    """Data como o formatDate do JS ("27 jun. 2025")"""
+    try:
+        date = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except (TypeError, ValueError):
+        return 'Data inválida'
+    return f"{date.day:02d} {MONTHS[date.month - 1]} {date.year}"
+
+def page_template(path):
+    asset = static_assets.get(path)
+    return asset.body.decode('utf-8') if asset is not None else None
+
+def render_article(doc_id):
+    """HTML completo de article.html?id=<doc_id> (None se o artigo não existir)"""
+    article = load_article(doc_id)
+    if article is None:
+        return None
+
+    info = CATEGORIES.get(category_slug(article.get('category'))) or CATEGORIES['ia']
+    title = str(article.get('title') or '')
+    likes = article.get('likes') or 0
+    source = fill_template(
+        page_template('article.html'),
+        text={
+            'article-title': title,
+            'article-category': info['name'],
+            'breadcrumb-category': info['name'],
+            'article-date': format_date(article_date(article)),
+            'article-views': article.get('views') or 0,
+            'like-count': likes,
+            'comments-count': article.get('commentsCount') or 0,
+            'like-count-text': f"{likes} {'pessoa curtiu' if likes == 1 else 'pessoas curtiram'}"
+        },
+        # Conteúdo em HTML escrito no admin, inserido como o JS faz (innerHTML)
+        markup={'article-content': article.get('content') or '<p>Conteúdo não disponível.</p>'},
+        classes={'article-category': f"{info['bg_color']} {info['text_color']} text-xs font-semibold px-2.5 py-0.5 rounded"},
+        title=f"{title} | {SITE_NAME}"
+    )
+    if article.get('excerpt'):
+        description = html.escape(str(article['excerpt']))
+        source = source.replace('</head>', f'  <meta name="description" content="{description}">\n</head>', 1)
+    return source
+
+def render_category(slug):
+    """HTML completo de category.html?cat=<slug>"""
+    info = CATEGORIES.get(slug)
+    if info is None:
+        return None
+
+    articles = load_category_articles(info)
+    count = len(articles)
+    return fill_template(
+        page_template('category.html'),
+        text={
+            'category-name': info['name'],
+            'category-description': info['description'],
+            'breadcrumb-category': info['name'],
+            'newsletter-category': info['name'].lower(),
+            'articles-count': f"{count} artigos",
+            'results-count': count
+        },
+        markup={
+            'category-icon': f'<i class="fas fa-{info["icon"]} {info["text_color"]}"></i>',
+            'grid-container': ''.join(render_article_card(doc, info) for doc in articles),
+            'list-container': ''.join(render_article_list_item(doc, info) for doc in articles)
+        },
+        classes={
+            'category-icon': f"w-20 h-20 mx-auto mb-4 {info['bg_color']} rounded-full flex items-center justify-center text-4xl",
+            'loading-state': 'hidden text-center py-12',
+            'articles-container': '' if count else 'hidden',
+            'empty-state': 'hidden text-center py-16' if count else 'text-center py-16'
+        },
+        title=f"{info['name']} - {SITE_NAME}"
+    )
+
+def article_fields(doc, info):
+    """Campos de um artigo escapados para os cards da categoria"""
+    article = doc['data']
+    return {
+        'id': html.escape(doc['id']),
+        'title': html.escape(str(article.get('title') or '')),
+        'excerpt': html.escape(str(article.get('excerpt') or 'Clique para ler o artigo completo.')),
+        'icon': html.escape(str(article.get('icon') or info['icon'])),
+        'date': format_date(article_date(article)),
+        'views': int(article.get('views') or 0),
+        'comments': int(article.get('commentsCount') or 0)
+    }
+
+def render_article_card(doc, info):
+    """Card do modo grade (mesmo HTML do renderArticleCard do js/category.js)"""
+    article = article_fields(doc, info)
+    return f"""
+      <article class="article-card bg-white rounded-lg overflow-hidden shadow-md transition-all duration-300 hover:shadow-lg hover:-translate-y-1">
+        <div class="h-48 {info['bg_color']} flex items-center justify-center">
+          <i class="fas fa-{article['icon']} text-6xl {info['text_color']}"></i>
+        </div>
+        <div class="p-6">
+          <div class="flex items-center mb-3">
+            <span class="{info['bg_color']} {info['text_color']} text-xs font-semibold px-2.5 py-0.5 rounded">{info['name']}</span>
+            <span class="text-gray-500 text-sm ml-3">{article['date']}</span>
+          </div>
+          <h3 class="text-xl font-bold mb-3 text-gray-800 line-clamp-2">
+            <a href="article.html?id={article['id']}" class="hover:text-primary transition-colors">{article['title']}</a>
+          </h3>
+          <p class="text-gray-600 mb-4 line-clamp-3">{article['excerpt']}</p>
+          <div class="flex items-center justify-between">
+            <a href="article.html?id={article['id']}" class="{info['text_color']} hover:opacity-80 font-medium transition-opacity">
+              Ler mais <i class="fas fa-arrow-right ml-1"></i>
+            </a>
+            <div class="flex space-x-3 text-sm text-gray-500">
+              <span title="Visualizações"><i class="fas fa-eye mr-1"></i> {article['views']}</span>
+              <span title="Comentários"><i class="fas fa-comment mr-1"></i> {article['comments']}</span>
+            </div>
+          </div>
+        </div>
+      </article>"""
+
+def render_article_list_item(doc, info):
+    """Item do modo lista (mesmo HTML do renderArticleList do js/category.js)"""
+    article = article_fields(doc, info)
+    return f"""
+      <article class="bg-white rounded-lg p-6 shadow-md hover:shadow-lg transition-shadow duration-300">
+        <div class="flex flex-col md:flex-row">
+          <div class="md:w-1/4 mb-4 md:mb-0 md:mr-6">
+            <div class="h-32 {info['bg_color']} rounded-lg flex items-center justify-center">
+              <i class="fas fa-{article['icon']} text-4xl {info['text_color']}"></i>
+            </div>
+          </div>
+          <div class="md:w-3/4">
+            <div class="flex items-center mb-2">
+              <span class="{info['bg_color']} {info['text_color']} text-xs font-semibold px-2.5 py-0.5 rounded">{info['name']}</span>
+              <span class="text-gray-500 text-sm ml-3">{article['date']}</span>
+            </div>
+            <h3 class="text-xl font-bold mb-2 text-gray-800">
+              <a href="article.html?id={article['id']}" class="hover:text-primary transition-colors">{article['title']}</a>
+            </h3>
+            <p class="text-gray-600 mb-4 line-clamp-2">{article['excerpt']}</p>
+            <div class="flex items-center justify-between">
+              <a href="article.html?id={article['id']}" class="{info['text_color']} hover:opacity-80 font-medium transition-opacity">
+                Ler mais <i class="fas fa-arrow-right ml-1"></i>
+              </a>
+              <div class="flex space-x-4 text-sm text-gray-500">
+                <span><i class="fas fa-eye mr-1"></i> {article['views']}</span>
+                <span><i class="fas fa-comment mr-1"></i> {article['comments']}</span>
+              </div>
+            </div>
+          </div>
+        </div>
+      </article>"""
+
+def list_pages():
+    """Todas as páginas do site: cada artigo e cada categoria"""
+    for doc in iter_collection(PRERENDER_COLLECTION, parse_query(), STREAM_PAGE_SIZE):
+        yield 'article', doc['id']
+    for slug in CATEGORIES:
+        yield 'category', slug
+
+def init_prerender():
+    """Ativar a pré-renderização quando o backend serve o site (build com article.html e category.html)"""
+    if not FIREBASE_PROJECT_ID or page_template('article.html') is None or page_template('category.html') is None:
+        return
+    prerender_service.init_app({'article': render_article, 'category': render_category}, list_pages)
@@ -0,0 +1,105 @@
+import os
+import threading
+import time
+from flask import Blueprint, request, jsonify
+from src.routes.firebase_proxy import (
+    iter_collection, register_write_listener, STREAM_PAGE_SIZE
+)
+from src.services.firestore_query import parse_query
+from src.services.search_index import search_index
+
+search_bp = Blueprint('search', __name__)
+
+# Coleção indexada e intervalo (segundos) da reconstrução completa do índice,
+# que recupera escritas feitas fora deste processo
+SEARCH_COLLECTION = os.getenv('SEARCH_COLLECTION', 'articles')
+SEARCH_REBUILD_INTERVAL = float(os.getenv('SEARCH_REBUILD_INTERVAL', '900'))
+SEARCH_MAX_LIMIT = 50
+
+_build_lock = threading.Lock()
+
+
+@search_bp.route('/search', methods=['GET'])
+def search_articles():
+    """Endpoint de busca de artigos (ranking BM25 com trechos destacados)"""
+    try:
+        query = request.args.get('q', '').strip()
+        category = request.args.get('category')
+        if category == 'all':
+            category = None
+
+        try:
+            limit = min(max(int(request.args.get('limit', '20')), 1), SEARCH_MAX_LIMIT)
+            offset = max(int(request.args.get('offset', '0')), 0)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Parâmetros limit/offset inválidos'
+            }), 400
+
+        if not query:
+            return jsonify({
+                'success': False,
+                'error': 'Informe o termo de busca'
+            }), 400
+
+        ensure_index()
+
+        started = time.perf_counter()
+        total, results = search_index.search(query, category=category, limit=limit, offset=offset)
+
+        return jsonify({
+            'success': True,
+            'query': query,
+            'total': total,
+            'results': results,
+            'took_ms': round((time.perf_counter() - started) * 1000, 2)
+        })
+
+    except Exception as e:
+        print(f"Erro na busca: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Erro ao realizar busca. Tente novamente.'
+        }), 500
+
+
+def ensure_index():
+    """Construir o índice na primeira busca e renová-lo em segundo plano depois"""
+    if not search_index.built:
+        with _build_lock:
+            if not search_index.built:
+                rebuild_index()
+        return
+
+    if time.time() - search_index.built_at > SEARCH_REBUILD_INTERVAL and _build_lock.acquire(blocking=False):
+        def rebuild_in_background():
+            try:
+                rebuild_index()
+            except Exception as e:
+                print(f"Erro ao reconstruir índice de busca: {e}")
+            finally:
+                _build_lock.release()
+
+        threading.Thread(target=rebuild_in_background, daemon=True).start()
+
+
+def rebuild_index():
+    """Carregar todos os artigos (página por página) e reconstruir o índice"""
+    documents = iter_collection(SEARCH_COLLECTION, parse_query(), STREAM_PAGE_SIZE)
+    search_index.rebuild((doc['id'], doc['data']) for doc in documents)
+
+
+@register_write_listener
+def update_index(collection_name, doc_id, data, operation):
+    """Manter o índice atualizado com as escritas feitas pelo proxy"""
+    # Durante a construção a escrita é registrada e reaplicada no índice novo
+    if collection_name != SEARCH_COLLECTION or not (search_index.built or search_index.rebuilding):
+        return
+
+    if operation == 'update':
+        search_index.update(doc_id, data)
+    elif operation == 'delete':
+        search_index.remove(doc_id)
+    else:
+        search_index.upsert(doc_id, data)
@@ -0,0 +1,407 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from src.services.compression import JSONPayload
+
+# Configurações do cache de leitura a partir das variáveis de ambiente
+FIRESTORE_CACHE_MAX_BYTES = int(os.getenv('FIRESTORE_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+FIRESTORE_CACHE_TTL = float(os.getenv('FIRESTORE_CACHE_TTL', '30'))
+# TTL por coleção no formato "articles=300,likes=10" (0 desativa o cache da coleção)
+FIRESTORE_CACHE_TTLS = os.getenv('FIRESTORE_CACHE_TTLS', 'articles=300,likes=15,comments=15')
+# "memory" (um cache por processo) ou "sqlite" (um arquivo compartilhado por todos os workers)
+FIRESTORE_CACHE_BACKEND = os.getenv('FIRESTORE_CACHE_BACKEND', 'memory')
+FIRESTORE_CACHE_PATH = os.getenv('FIRESTORE_CACHE_PATH', 'data/read_cache.db')
+# Cópia em memória de cada worker na frente do arquivo compartilhado
+FIRESTORE_CACHE_LOCAL_MAX_BYTES = int(os.getenv('FIRESTORE_CACHE_LOCAL_MAX_BYTES', str(8 * 1024 * 1024)))
+
+SHARED_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS read_cache_entry (
+    key TEXT PRIMARY KEY,
+    collection TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    body BLOB NOT NULL,
+    etag TEXT,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    version INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_read_cache_entry_collection ON read_cache_entry (collection, kind);
+CREATE INDEX IF NOT EXISTS ix_read_cache_entry_expires_at ON read_cache_entry (expires_at);
+CREATE TABLE IF NOT EXISTS read_cache_generation (
+    collection TEXT PRIMARY KEY,
+    generation INTEGER NOT NULL
+);
+"""
+
+
+def parse_ttls(spec):
+    """Converter "colecao=segundos,..." em dicionário"""
+    ttls = {}
+    for item in (spec or '').split(','):
+        if '=' not in item:
+            continue
+        name, seconds = item.split('=', 1)
+        try:
+            ttls[name.strip()] = float(seconds)
+        except ValueError:
+            print(f"TTL inválido para a coleção {name.strip()}: {seconds}")
+    return ttls
+
+
+class ReadCache:
+    """Cache LRU em memória, limitado em bytes, com TTL por coleção"""
+
+    def __init__(self, max_bytes=FIRESTORE_CACHE_MAX_BYTES, default_ttl=FIRESTORE_CACHE_TTL, ttls=None):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.ttls = parse_ttls(FIRESTORE_CACHE_TTLS) if ttls is None else dict(ttls)
+
+        self._lock = threading.RLock()
+        # chave -> (valor, tamanho, expira_em)
+        self._entries = OrderedDict()
+        # coleção -> chaves armazenadas daquela coleção
+        self._by_collection = {}
+        # coleção -> número de invalidações (ver generation)
+        self._generations = {}
+        self._bytes = 0
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0
+        }
+
+    @staticmethod
+    def collection_key(collection_name, query):
+        """Chave de uma consulta: coleção + parâmetros (orderBy, direction, limit, where...)"""
+        params = tuple(sorted((k, v) for k, v in query.items() if v not in (None, '')))
+        return ('collection', collection_name, params)
+
+    @staticmethod
+    def document_key(collection_name, doc_id):
+        return ('document', collection_name, doc_id)
+
+    def ttl_for(self, collection_name):
+        return self.ttls.get(collection_name, self.default_ttl)
+
+    def generation(self, collection_name):
+        """Contador de invalidações da coleção, lido antes de buscar no Firestore
+        
+        Passado ao set(), impede que uma leitura iniciada antes de uma escrita
+        guarde no cache os dados anteriores a ela.
+        """
+        with self._lock:
+            return self._generations.get(collection_name, 0)
+
+    def get(self, key):
+        """Retorna o valor em cache ou None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+
+            value, size, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return value
+
+    def set(self, key, value, size, ttl=None, generation=None):
+        """Armazena um valor; `size` é o tamanho aproximado em bytes
+        
+        Com `generation` (ver generation()), nada é guardado se a coleção foi
+        invalidada depois da leitura.
+        """
+        if ttl is None:
+            ttl = self.ttl_for(key[1])
+        if ttl <= 0 or size > self.max_bytes:
+            return
+
+        with self._lock:
+            if generation is not None and generation != self._generations.get(key[1], 0):
+                return
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (value, size, time.monotonic() + ttl)
+            self._by_collection.setdefault(key[1], set()).add(key)
+            self._bytes += size
+
+            # Remover os itens menos usados até caber no limite
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats['evictions'] += 1
+
+    def invalidate_collection(self, collection_name):
+        """Remove todas as consultas em cache de uma coleção"""
+        with self._lock:
+            self._generations[collection_name] = self._generations.get(collection_name, 0) + 1
+            keys = [k for k in self._by_collection.get(collection_name, ()) if k[0] == 'collection']
+            for key in keys:
+                self._remove(key)
+            self._stats['invalidations'] += len(keys)
+
+    def invalidate_document(self, collection_name, doc_id):
+        """Remove o documento e as consultas da coleção que podem contê-lo"""
+        with self._lock:
+            key = self.document_key(collection_name, doc_id)
+            if key in self._entries:
+                self._remove(key)
+                self._stats['invalidations'] += 1
+        self.invalidate_collection(collection_name)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_collection.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            result = dict(self._stats)
+            lookups = result['hits'] + result['misses']
+            result.update({
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hit_ratio': round(result['hits'] / lookups, 4) if lookups else 0.0
+            })
+            return result
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+        keys = self._by_collection.get(key[1])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_collection[key[1]]
+
+
+class SharedReadCache:
+    """Cache de leitura num arquivo SQLite compartilhado pelos workers (gunicorn)
+
+    Cada entrada guarda o corpo JSON já serializado e uma versão. Os acertos
+    mais recentes ficam também num ReadCache em memória do worker, válido
+    enquanto a versão no arquivo for a mesma: invalidar (apagar a linha) em um
+    worker vale para todos. Mesma interface do ReadCache.
+    """
+
+    collection_key = staticmethod(ReadCache.collection_key)
+    document_key = staticmethod(ReadCache.document_key)
+
+    def __init__(self, path=FIRESTORE_CACHE_PATH, max_bytes=FIRESTORE_CACHE_MAX_BYTES,
+                 default_ttl=FIRESTORE_CACHE_TTL, ttls=None, local_max_bytes=FIRESTORE_CACHE_LOCAL_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.ttls = parse_ttls(FIRESTORE_CACHE_TTLS) if ttls is None else dict(ttls)
+        # chave -> (versão, JSONPayload)
+        self.local = ReadCache(max_bytes=min(local_max_bytes, max_bytes), default_ttl=default_ttl, ttls=self.ttls)
+
+        self._lock = threading.Lock()
+        self._local_connection = threading.local()
+        self._schema_ready = False
+        self._stats = {
+            'hits': 0,
+            'shared_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0
+        }
+
+    def ttl_for(self, collection_name):
+        return self.ttls.get(collection_name, self.default_ttl)
+
+    def generation(self, collection_name):
+        """Contador de invalidações da coleção, compartilhado pelos workers (ver ReadCache.generation)"""
+        row = self._connection().execute(
+            'SELECT generation FROM read_cache_generation WHERE collection = ?', (collection_name,)
+        ).fetchone()
+        return row[0] if row is not None else 0
+
+    def get(self, key):
+        """Retorna o valor em cache ou None"""
+        name = repr(key)
+        connection = self._connection()
+        row = connection.execute(
+            'SELECT version, expires_at FROM read_cache_entry WHERE key = ?', (name,)
+        ).fetchone()
+        if row is None or row[1] <= time.time():
+            if row is not None:
+                self._count('expirations')
+            self._count('misses')
+            return None
+
+        version, expires_at = row
+        local = self.local.get(key)
+        if local is not None and local[0] == version:
+            self._count('hits')
+            return local[1]
+
+        # Gravado por outro worker (ou já fora da memória deste): ler o corpo
+        row = connection.execute(
+            'SELECT body, etag, size FROM read_cache_entry WHERE key = ? AND version = ?', (name, version)
+        ).fetchone()
+        if row is None:
+            self._count('misses')
+            return None
+        payload = JSONPayload.from_body(row[0], etag=row[1])
+        self.local.set(key, (version, payload), row[2], ttl=expires_at - time.time())
+        self._count('shared_hits')
+        return payload
+
+    def set(self, key, value, size, generation=None):
+        """Armazena um JSONPayload; `size` é o tamanho aproximado em bytes
+        
+        Com `generation`, nada é guardado se a coleção foi invalidada (em
+        qualquer worker) depois da leitura.
+        """
+        ttl = self.ttl_for(key[1])
+        if ttl <= 0 or size > self.max_bytes:
+            return
+
+        now = time.time()
+        version = random.getrandbits(62)
+        with self._transaction() as connection:
+            if generation is not None:
+                row = connection.execute(
+                    'SELECT generation FROM read_cache_generation WHERE collection = ?', (key[1],)
+                ).fetchone()
+                if generation != (row[0] if row is not None else 0):
+                    return
+            connection.execute(
+                'INSERT OR REPLACE INTO read_cache_entry '
+                '(key, collection, kind, body, etag, size, expires_at, version) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (repr(key), key[1], key[0], value.body, value.etag, size, now + ttl, version)
+            )
+            expired = connection.execute('DELETE FROM read_cache_entry WHERE expires_at <= ?', (now,)).rowcount
+            # Remover as entradas que vencem primeiro até caber no limite
+            total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM read_cache_entry').fetchone()[0]
+            evicted = 0
+            while total > self.max_bytes:
+                row = connection.execute(
+                    'DELETE FROM read_cache_entry WHERE key = '
+                    '(SELECT key FROM read_cache_entry ORDER BY expires_at LIMIT 1) RETURNING size'
+                ).fetchone()
+                if row is None:
+                    break
+                total -= row[0]
+                evicted += 1
+        self.local.set(key, (version, value), size, ttl=ttl)
+        self._count('expirations', expired)
+        self._count('evictions', evicted)
+
+    def invalidate_collection(self, collection_name):
+        """Remove todas as consultas em cache de uma coleção (em todos os workers)"""
+        with self._transaction() as connection:
+            connection.execute(
+                'INSERT INTO read_cache_generation (collection, generation) VALUES (?, 1) '
+                'ON CONFLICT (collection) DO UPDATE SET generation = generation + 1', (collection_name,)
+            )
+            removed = connection.execute(
+                "DELETE FROM read_cache_entry WHERE collection = ? AND kind = 'collection'", (collection_name,)
+            ).rowcount
+        self.local.invalidate_collection(collection_name)
+        self._count('invalidations', removed)
+
+    def invalidate_document(self, collection_name, doc_id):
+        """Remove o documento e as consultas da coleção que podem contê-lo"""
+        key = self.document_key(collection_name, doc_id)
+        with self._transaction() as connection:
+            removed = connection.execute('DELETE FROM read_cache_entry WHERE key = ?', (repr(key),)).rowcount
+        self.local.invalidate_document(collection_name, doc_id)
+        self._count('invalidations', removed)
+        self.invalidate_collection(collection_name)
+
+    def clear(self):
+        with self._transaction() as connection:
+            connection.execute('DELETE FROM read_cache_entry')
+        self.local.clear()
+
+    def stats(self):
+        with self._lock:
+            result = dict(self._stats)
+        entries, size = self._connection().execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM read_cache_entry'
+        ).fetchone()
+        lookups = result['hits'] + result['shared_hits'] + result['misses']
+        local = self.local.stats()
+        result.update({
+            'backend': 'sqlite',
+            'entries': entries,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+            'hit_ratio': round((result['hits'] + result['shared_hits']) / lookups, 4) if lookups else 0.0,
+            'local_entries': local['entries'],
+            'local_bytes': local['bytes']
+        })
+        return result
+
+    def _count(self, name, amount=1):
+        if amount:
+            with self._lock:
+                self._stats[name] += amount
+
+    def _connection(self):
+        """Conexão SQLite da thread atual, aberta de novo após um fork"""
+        local = self._local_connection
+        if getattr(local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            if not self._schema_ready:
+                connection.executescript(SHARED_CACHE_SCHEMA)
+                self._schema_ready = True
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+
+    def _transaction(self):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        return _Transaction(connection)
+
+
+class _Transaction:
+    """Context manager: COMMIT ao sair sem erro, ROLLBACK se houver exceção"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self.connection
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.connection.in_transaction:
+            self.connection.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
+
+
+def create_read_cache(backend=FIRESTORE_CACHE_BACKEND):
+    """Cache de leitura conforme FIRESTORE_CACHE_BACKEND"""
+    if backend == 'sqlite':
+        return SharedReadCache()
+    if backend != 'memory':
+        print(f"FIRESTORE_CACHE_BACKEND inválido: {backend}; usando memory")
+    return ReadCache()
+
+
+# Instância compartilhada por todo o processo
+read_cache = create_read_cache()
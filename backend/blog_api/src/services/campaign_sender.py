@@ -0,0 +1,398 @@
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from email.charset import Charset, QP
+from email.mime.multipart import MIMEMultipart
+from email.mime.nonmultipart import MIMENonMultipart
+from urllib.parse import quote
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from src.models.user import db
+from src.models.newsletter import NewsletterSubscriber
+from src.models.campaign import Campaign, CampaignDelivery
+from src.services.mail_queue import SMTPConnection, SMTP_FROM, is_connection_error, is_permanent_failure
+
+# Configurações do envio de campanhas a partir das variáveis de ambiente
+CAMPAIGN_BATCH_SIZE = int(os.getenv('CAMPAIGN_BATCH_SIZE', '500'))
+CAMPAIGN_CONNECTIONS = int(os.getenv('CAMPAIGN_CONNECTIONS', '4'))
+# Mensagens por segundo somando todas as conexões (0 = sem limite)
+CAMPAIGN_RATE_LIMIT = float(os.getenv('CAMPAIGN_RATE_LIMIT', '20'))
+# Falhas temporárias (4xx, conexão) são reenviadas ao fim da lista, em até N rodadas
+CAMPAIGN_RETRY_ROUNDS = int(os.getenv('CAMPAIGN_RETRY_ROUNDS', '3'))
+CAMPAIGN_RETRY_DELAY = float(os.getenv('CAMPAIGN_RETRY_DELAY', '60'))
+NEWSLETTER_UNSUBSCRIBE_URL = os.getenv('NEWSLETTER_UNSUBSCRIBE_URL', 'https://sentineladedados.com/unsubscribe')
+
+# Marcadores trocados por destinatário nos bytes já renderizados: nos cabeçalhos
+# o valor entra como está; no corpo, já codificado em quoted-printable
+RECIPIENT_PLACEHOLDER = b'__RECIPIENT__'
+UNSUBSCRIBE_PLACEHOLDER = b'__UNSUBSCRIBE_URL__'
+BODY_UNSUBSCRIBE_PLACEHOLDER = b'__UNSUBSCRIBE_URL_QP__'
+PLACEHOLDER_PATTERN = re.compile(
+    b'(' + b'|'.join([RECIPIENT_PLACEHOLDER, BODY_UNSUBSCRIBE_PLACEHOLDER, UNSUBSCRIBE_PLACEHOLDER]) + b')'
+)
+
+# Quebra de linha "soft" do quoted-printable: some na decodificação
+SOFT_LINE_BREAK = '=\n'
+
+BODY_CHARSET = Charset('utf-8')
+BODY_CHARSET.body_encoding = QP
+
+
+class RenderedCampaign:
+    """MIME da campanha renderizado uma única vez; por destinatário só os marcadores mudam"""
+
+    def __init__(self, campaign):
+        msg = MIMEMultipart('alternative')
+        msg['From'] = f"Sentinela de Dados <{SMTP_FROM}>"
+        msg['To'] = RECIPIENT_PLACEHOLDER.decode('ascii')
+        msg['Subject'] = campaign.subject
+        msg['List-Unsubscribe'] = f"<{UNSUBSCRIBE_PLACEHOLDER.decode('ascii')}>"
+
+        unsubscribe = UNSUBSCRIBE_PLACEHOLDER.decode('ascii')
+        text = campaign.text_body.replace('{{unsubscribe_url}}', unsubscribe)
+        html = campaign.html_body.replace('{{unsubscribe_url}}', unsubscribe)
+        if unsubscribe not in text:
+            text += f"\n\n--\nPara cancelar sua inscrição, acesse: {unsubscribe}\n"
+        if unsubscribe not in html:
+            html += (f'\n<p style="font-size:12px;color:#666">Para cancelar sua inscrição, '
+                     f'<a href="{unsubscribe}">clique aqui</a>.</p>\n')
+
+        msg.attach(_quoted_printable_part(text, 'plain', unsubscribe))
+        msg.attach(_quoted_printable_part(html, 'html', unsubscribe))
+
+        template = msg.as_bytes(policy=msg.policy.clone(linesep='\r\n'))
+        # Pedaços fixos intercalados com os marcadores, para montar cada envio com um join
+        self.pieces = PLACEHOLDER_PATTERN.split(template)
+
+    def personalize(self, email):
+        unsubscribe_url = f"{NEWSLETTER_UNSUBSCRIBE_URL}?email={quote(email)}"
+        values = {
+            RECIPIENT_PLACEHOLDER: email.encode('ascii'),
+            UNSUBSCRIBE_PLACEHOLDER: unsubscribe_url.encode('ascii'),
+            BODY_UNSUBSCRIBE_PLACEHOLDER: _quoted_printable(unsubscribe_url).encode('ascii')
+        }
+        return b''.join(values.get(piece, piece) for piece in self.pieces)
+
+
+def _quoted_printable(text):
+    """Texto em quoted-printable com linhas terminadas em CRLF (como o resto da mensagem)"""
+    return BODY_CHARSET.body_encode(text).replace('\n', '\r\n')
+
+
+def _quoted_printable_part(body, subtype, unsubscribe):
+    """Parte MIME em quoted-printable com o marcador do corpo intacto
+
+    Cada trecho entre os links de descadastro é codificado separadamente e ligado
+    ao marcador por quebras "soft": nenhuma linha passa de 76 caracteres, e URLs
+    longas (ou o próprio link) não ganham quebras de linha ao serem decodificadas.
+    """
+    marker = SOFT_LINE_BREAK + BODY_UNSUBSCRIBE_PLACEHOLDER.decode('ascii') + SOFT_LINE_BREAK
+    part = MIMENonMultipart('text', subtype, charset='utf-8')
+    part['Content-Transfer-Encoding'] = 'quoted-printable'
+    part.set_payload(marker.join(BODY_CHARSET.body_encode(segment) for segment in body.split(unsubscribe)))
+    return part
+
+
+class RateLimiter:
+    """Token bucket compartilhado pelas conexões de uma campanha"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def claim_subscribers(campaign_id, subscriber_ids):
+    """Reservar os inscritos para a campanha; retorna só os que ainda não tinham reserva
+
+    A reserva é gravada antes do envio: numa retomada, quem já foi reservado
+    (enviado ou não confirmado) é pulado, então ninguém recebe em dobro.
+    """
+    stmt = sqlite_insert(CampaignDelivery).values([
+        {'campaign_id': campaign_id, 'subscriber_id': subscriber_id, 'status': 'sending'}
+        for subscriber_id in subscriber_ids
+    ]).on_conflict_do_nothing(
+        index_elements=['campaign_id', 'subscriber_id']
+    ).returning(CampaignDelivery.subscriber_id)
+
+    claimed = {row[0] for row in db.session.execute(stmt)}
+    db.session.commit()
+    return claimed
+
+
+def claim_retries(campaign_id, after_id, limit):
+    """Reservar de novo as entregas com falha temporária de inscritos ainda ativos
+
+    Mesma reserva de claim_subscribers: a linha volta a "sending" antes do envio.
+    """
+    pending = select(CampaignDelivery.subscriber_id).where(
+        CampaignDelivery.campaign_id == campaign_id,
+        CampaignDelivery.status == 'retry',
+        CampaignDelivery.subscriber_id > after_id,
+        CampaignDelivery.subscriber_id.in_(active_subscriber_ids())
+    ).order_by(CampaignDelivery.subscriber_id).limit(limit)
+    stmt = update(CampaignDelivery).where(
+        CampaignDelivery.campaign_id == campaign_id,
+        CampaignDelivery.status == 'retry',
+        CampaignDelivery.subscriber_id.in_(pending)
+    ).values(status='sending').returning(CampaignDelivery.subscriber_id)
+
+    claimed = [row[0] for row in db.session.execute(stmt)]
+    db.session.commit()
+    if not claimed:
+        return []
+    return db.session.query(NewsletterSubscriber.id, NewsletterSubscriber.email).filter(
+        NewsletterSubscriber.id.in_(claimed)
+    ).order_by(NewsletterSubscriber.id).all()
+
+
+def has_pending_retries(campaign_id):
+    return db.session.query(CampaignDelivery.id).filter(
+        CampaignDelivery.campaign_id == campaign_id,
+        CampaignDelivery.status == 'retry',
+        CampaignDelivery.subscriber_id.in_(active_subscriber_ids())
+    ).first() is not None
+
+
+def active_subscriber_ids():
+    return select(NewsletterSubscriber.id).where(NewsletterSubscriber.status == 'active')
+
+
+def claim_campaign(campaign_id):
+    """Marcar a campanha como em envio; retorna False se já estiver (em qualquer worker) ou enviada
+
+    A troca de status é uma única instrução no banco: com vários workers, só um
+    dos pedidos de envio simultâneos consegue a campanha.
+    """
+    result = db.session.execute(update(Campaign).where(
+        Campaign.id == campaign_id,
+        Campaign.status.notin_(['sending', 'sent'])
+    ).values(status='sending', started_at=func.coalesce(Campaign.started_at, datetime.now().isoformat())))
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def release_campaign(campaign_id):
+    """Pausar uma campanha em envio; o worker que a envia para ao fim do lote atual"""
+    result = db.session.execute(update(Campaign).where(
+        Campaign.id == campaign_id,
+        Campaign.status == 'sending'
+    ).values(status='paused'))
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def send_campaign(campaign_id, stop_event=None, batch_size=CAMPAIGN_BATCH_SIZE,
+                  connections=CAMPAIGN_CONNECTIONS, rate_limit=CAMPAIGN_RATE_LIMIT,
+                  retry_rounds=CAMPAIGN_RETRY_ROUNDS, retry_delay=CAMPAIGN_RETRY_DELAY):
+    """Enviar (ou retomar) uma campanha para os inscritos ativos
+
+    Percorre os inscritos em lotes por id, envia cada lote por um pool de
+    conexões SMTP e grava o checkpoint ao fim de cada lote. Falhas temporárias
+    são reenviadas ao fim da lista; se alguma persistir, a campanha fica
+    pausada e um novo envio (retomada) tenta de novo.
+
+    A campanha já deve estar reservada com claim_campaign. Totais e checkpoint
+    são somados no banco (nunca na cópia do ORM), e o envio para se o status
+    deixar de ser 'sending' (pausa pedida em outro worker).
+    """
+    campaign = db.session.get(Campaign, campaign_id)
+    rendered = RenderedCampaign(campaign)
+    last_subscriber_id = campaign.last_subscriber_id
+    # Rajada de no máximo uma mensagem por conexão: a vazão fica no limite desde o início
+    limiter = RateLimiter(rate_limit, burst=connections)
+
+    local = threading.local()
+    opened = []
+
+    def deliver(subscriber):
+        smtp = getattr(local, 'smtp', None)
+        if smtp is None:
+            smtp = local.smtp = SMTPConnection()
+            opened.append(smtp)
+
+        limiter.acquire()
+        try:
+            smtp.send(SMTP_FROM, [subscriber.email], rendered.personalize(subscriber.email))
+        except Exception as e:
+            # Destinatário recusado não derruba a conexão para o resto do lote
+            if is_connection_error(e):
+                smtp.close()
+            return subscriber.id, e
+        return subscriber.id, None
+
+    def send_batch(pool, subscribers):
+        started = time.perf_counter()
+        results = list(pool.map(deliver, subscribers))
+        elapsed = time.perf_counter() - started
+
+        sent = [subscriber_id for subscriber_id, error in results if error is None]
+        failed = [(subscriber_id, error) for subscriber_id, error in results if error is not None]
+        record_results(campaign_id, sent, failed)
+
+        db.session.execute(update(Campaign).where(Campaign.id == campaign_id).values(
+            sent_count=Campaign.sent_count + len(sent),
+            failed_count=Campaign.failed_count + sum(1 for _, error in failed if is_permanent_failure(error)),
+            send_seconds=Campaign.send_seconds + elapsed
+        ))
+
+    released = []
+
+    def stopped():
+        if stop_event is not None and stop_event.is_set():
+            return True
+        if not released and db.session.execute(
+            select(Campaign.status).where(Campaign.id == campaign_id)
+        ).scalar() != 'sending':
+            released.append(True)
+        return bool(released)
+
+    finished = False
+    try:
+        with ThreadPoolExecutor(max_workers=connections, thread_name_prefix=f'campaign-{campaign_id}') as pool:
+            while not stopped():
+                batch = db.session.query(NewsletterSubscriber.id, NewsletterSubscriber.email).filter(
+                    NewsletterSubscriber.status == 'active',
+                    NewsletterSubscriber.id > last_subscriber_id
+                ).order_by(NewsletterSubscriber.id).limit(batch_size).all()
+                if not batch:
+                    finished = True
+                    break
+
+                claimed = claim_subscribers(campaign_id, [subscriber.id for subscriber in batch])
+                send_batch(pool, [s for s in batch if s.id in claimed])
+                last_subscriber_id = batch[-1].id
+                db.session.execute(update(Campaign).where(Campaign.id == campaign_id).values(
+                    last_subscriber_id=func.max(Campaign.last_subscriber_id, last_subscriber_id)
+                ))
+                db.session.commit()
+
+            # Rodadas de reenvio das falhas temporárias, com uma pausa antes de cada uma
+            rounds = 0
+            while finished and rounds < retry_rounds and has_pending_retries(campaign_id):
+                rounds += 1
+                if stop_event is not None:
+                    stop_event.wait(retry_delay)
+                else:
+                    time.sleep(retry_delay)
+
+                after_id = 0
+                while not stopped():
+                    batch = claim_retries(campaign_id, after_id, batch_size)
+                    if not batch:
+                        break
+                    send_batch(pool, batch)
+                    after_id = batch[-1].id
+                    db.session.commit()
+                if stopped():
+                    finished = False
+    finally:
+        for smtp in opened:
+            smtp.close()
+
+    if finished and has_pending_retries(campaign_id):
+        finished = False
+    # Pausada por outro worker: o status já foi gravado (e pode já ser de outro envio)
+    if not released:
+        db.session.execute(update(Campaign).where(
+            Campaign.id == campaign_id,
+            Campaign.status == 'sending'
+        ).values(
+            status='sent' if finished else 'paused',
+            finished_at=datetime.now().isoformat() if finished else Campaign.finished_at
+        ))
+    db.session.commit()
+    campaign = db.session.get(Campaign, campaign_id)
+
+    rate = campaign.sent_count / campaign.send_seconds if campaign.send_seconds else 0.0
+    print(f"Campanha {campaign_id} ({campaign.status}): {campaign.sent_count} enviados, "
+          f"{campaign.failed_count} falhas, {rate:.1f} msgs/s")
+    return campaign
+
+
+def record_results(campaign_id, sent, failed):
+    if sent:
+        db.session.execute(update(CampaignDelivery).where(
+            CampaignDelivery.campaign_id == campaign_id,
+            CampaignDelivery.subscriber_id.in_(sent)
+        ).values(status='sent', error=None))
+    for subscriber_id, error in failed:
+        # Só recusas definitivas (5xx) encerram a entrega; o resto volta para a fila
+        status = 'failed' if is_permanent_failure(error) else 'retry'
+        db.session.execute(update(CampaignDelivery).where(
+            CampaignDelivery.campaign_id == campaign_id,
+            CampaignDelivery.subscriber_id == subscriber_id
+        ).values(status=status, error=f'{type(error).__name__}: {error}'[:500]))
+
+
+class CampaignRunner:
+    """Executa campanhas em threads de fundo, uma por campanha"""
+
+    def __init__(self):
+        self._running = {}
+        self._lock = threading.Lock()
+
+    def start(self, app, campaign_id):
+        """Iniciar o envio; retorna False se a campanha já estiver em andamento (em qualquer worker)"""
+        with self._lock:
+            if campaign_id in self._running or not claim_campaign(campaign_id):
+                return False
+            stop_event = threading.Event()
+            self._running[campaign_id] = stop_event
+
+        thread = threading.Thread(target=self._run, args=(app, campaign_id, stop_event),
+                                  name=f'campaign-{campaign_id}', daemon=True)
+        thread.start()
+        return True
+
+    def pause(self, campaign_id):
+        """Pedir a pausa ao fim do lote atual; retorna False se não estiver em andamento
+
+        Vale também para campanhas enviadas por outro worker (ou deixadas em
+        'sending' por um processo que morreu), que podem então ser retomadas.
+        """
+        with self._lock:
+            stop_event = self._running.get(campaign_id)
+        if stop_event is not None:
+            stop_event.set()
+        return release_campaign(campaign_id) or stop_event is not None
+
+    def is_running(self, campaign_id):
+        return campaign_id in self._running
+
+    def _run(self, app, campaign_id, stop_event):
+        with app.app_context():
+            try:
+                send_campaign(campaign_id, stop_event)
+            except Exception as e:
+                print(f"Erro ao enviar campanha {campaign_id}: {e}")
+                db.session.rollback()
+                # Sem isso a campanha ficaria em 'sending' e nenhum worker a retomaria
+                release_campaign(campaign_id)
+            finally:
+                db.session.remove()
+                with self._lock:
+                    self._running.pop(campaign_id, None)
+
+
+# Instância compartilhada por todo o processo
+campaign_runner = CampaignRunner()
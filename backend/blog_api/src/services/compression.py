@@ -0,0 +1,198 @@
+import gzip
+import os
+import threading
+from flask import request, current_app
+from src.services.json_provider import dumps_bytes, loads_bytes
+
+# brotli é opcional: sem ele, só gzip é oferecido
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Configurações de compressão a partir das variáveis de ambiente
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', '6'))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '5'))
+
+COMPRESSIBLE_MIMETYPES = frozenset([
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml'
+])
+
+# Codificações que sabemos produzir, em ordem de preferência
+SUPPORTED_ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encoding, available=None):
+    """Escolher a codificação (br, gzip ou None) a partir do Accept-Encoding
+
+    `available` restringe às codificações existentes (ex.: variantes pré-comprimidas).
+    """
+    if not accept_encoding:
+        return None
+
+    accepted = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    wildcard = accepted.get('*', 0.0)
+    if available is None:
+        available = SUPPORTED_ENCODINGS
+    for encoding in ('br', 'gzip'):
+        if encoding in available and accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def is_compressible(mimetype):
+    return bool(mimetype) and (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_MIMETYPES)
+
+
+# Marca de valor ainda não desserializado (JSONPayload.from_body)
+_UNPARSED = object()
+
+
+class JSONPayload:
+    """Valor de resposta JSON com o corpo serializado e comprimido guardados
+
+    Fica no cache de leitura: acertos seguintes não serializam nem comprimem de novo.
+    """
+
+    __slots__ = ('_value', 'etag', '_body', '_variants', '_lock')
+
+    def __init__(self, value, etag=None):
+        self._value = value
+        self.etag = etag
+        self._body = None
+        self._variants = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_body(cls, body, etag=None):
+        """Payload a partir do corpo já serializado (ex.: lido do cache compartilhado)
+
+        O valor só é desserializado se alguém o ler.
+        """
+        payload = cls(_UNPARSED, etag=etag)
+        payload._body = body
+        return payload
+
+    @property
+    def value(self):
+        if self._value is _UNPARSED:
+            self._value = loads_bytes(self._body)
+        return self._value
+
+    @property
+    def body(self):
+        if self._body is None:
+            self._body = dumps_bytes(self.value)
+        return self._body
+
+    def encoded(self, encoding):
+        """Corpo na codificação pedida, comprimido uma única vez"""
+        if encoding is None or len(self.body) < COMPRESSION_MIN_SIZE:
+            return None, self.body
+
+        variant = self._variants.get(encoding)
+        if variant is None:
+            with self._lock:
+                variant = self._variants.get(encoding)
+                if variant is None:
+                    variant = compress(self.body, encoding)
+                    self._variants[encoding] = variant
+        return encoding, variant
+
+
+def payload_response(payload, status=200, cache_control=None):
+    """Montar a resposta Flask de um JSONPayload negociando a compressão
+
+    Com ETag, responde 304 sem corpo quando o If-None-Match do cliente confere.
+    """
+    status, body, headers = prepare_payload(payload, request.headers.get('Accept-Encoding'),
+                                            request.if_none_match, status, cache_control)
+    response = current_app.response_class(body, status=status,
+                                          mimetype='application/json' if status != 304 else None)
+    response.headers.update(headers)
+    return response
+
+
+def prepare_payload(payload, accept_encoding, if_none_match, status=200, cache_control=None):
+    """Status, corpo e cabeçalhos da resposta de um JSONPayload, independente do framework
+
+    `if_none_match` é um werkzeug ETags (ex.: parse_etags do cabeçalho If-None-Match).
+    """
+    encoding = negotiate_encoding(accept_encoding)
+    if encoding is not None and len(payload.body) < COMPRESSION_MIN_SIZE:
+        encoding = None
+
+    # ETag forte: cada codificação do corpo tem a sua
+    etag = payload.etag
+    if etag and encoding:
+        etag = f"{etag}-{encoding}"
+
+    headers = {'Vary': 'Accept-Encoding'}
+    if etag and status == 200 and _etag_matches(if_none_match, payload.etag):
+        status, body = 304, b''
+    else:
+        encoding, body = payload.encoded(encoding)
+        if encoding:
+            headers['Content-Encoding'] = encoding
+
+    if etag:
+        headers['ETag'] = f'"{etag}"'
+    if cache_control:
+        headers['Cache-Control'] = cache_control
+    return status, body, headers
+
+
+def _etag_matches(if_none_match, etag):
+    """If-None-Match confere com o ETag em qualquer uma das codificações"""
+    if not if_none_match:
+        return False
+    return any(if_none_match.contains_weak(candidate)
+               for candidate in (etag, f"{etag}-gzip", f"{etag}-br"))
+
+
+def compress_response(response):
+    """after_request: comprimir respostas grandes conforme o Accept-Encoding"""
+    if (response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or not is_compressible(response.mimetype)):
+        return response
+
+    body = response.get_data()
+    if len(body) < COMPRESSION_MIN_SIZE:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+    if encoding is None:
+        return response
+
+    response.set_data(compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_compression(app):
+    """Registrar a compressão de respostas em todos os blueprints do app"""
+    app.after_request(compress_response)
@@ -0,0 +1,210 @@
+import base64
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+# fcntl só existe em sistemas POSIX; sem ele o lock vale apenas dentro do processo
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Configurações do log de contatos a partir das variáveis de ambiente
+CONTACT_LOG_DIR = os.getenv('CONTACT_LOG_DIR', 'data/contacts')
+CONTACT_LOG_MAX_BYTES = int(os.getenv('CONTACT_LOG_MAX_BYTES', str(5 * 1024 * 1024)))
+CONTACT_LOG_MAX_AGE_DAYS = float(os.getenv('CONTACT_LOG_MAX_AGE_DAYS', '30'))
+
+SEGMENT_PATTERN = re.compile(r'^contacts-(\d{8}T\d{12})\.jsonl$')
+SEGMENT_TIME_FORMAT = '%Y%m%dT%H%M%S%f'
+READ_BLOCK_SIZE = 64 * 1024
+LEGACY_SEGMENT = 'contacts-20000101T000000000000.jsonl'
+
+
+class ContactLog:
+    """Log de contatos só de acréscimo (JSONL), dividido em segmentos com rotação
+
+    Cada segmento tem o horário de criação no nome e nunca é renomeado, então os
+    cursores de paginação continuam válidos depois de uma rotação. O segmento
+    ativo é indicado pelo arquivo `current`.
+    """
+
+    def __init__(self, directory=CONTACT_LOG_DIR, max_bytes=CONTACT_LOG_MAX_BYTES,
+                 max_age_days=CONTACT_LOG_MAX_AGE_DAYS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_days * 86400
+        self._lock = threading.Lock()
+
+    def append(self, record):
+        """Acrescentar um registro ao fim do segmento ativo"""
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+
+        with self._locked():
+            segment = self._current_segment()
+            if segment is None or self._needs_rotation(segment):
+                segment = self._start_segment()
+
+            # Uma única escrita em modo append por registro
+            with open(os.path.join(self.directory, segment), 'ab') as f:
+                f.write(line)
+
+    def read_newest(self, limit=50, cursor=None):
+        """Ler registros do mais novo para o mais antigo, a partir do cursor
+
+        Retorna (registros, próximo_cursor); o arquivo é lido de trás para frente
+        em blocos, então o custo depende de `limit`, não do tamanho do histórico.
+        """
+        segments = self.segments()
+        if cursor:
+            segment, end = decode_cursor(cursor)
+            if segment not in segments:
+                raise ValueError('Cursor inválido')
+            segments = segments[segments.index(segment):]
+        else:
+            end = None
+
+        records = []
+        last_position = None
+        for segment in segments:
+            path = os.path.join(self.directory, segment)
+            segment_end = os.path.getsize(path) if end is None else end
+            end = None
+
+            for start, line in _tail(path, segment_end):
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # Linha incompleta (escrita interrompida): ignorar
+                    continue
+                last_position = (segment, start)
+                if len(records) >= limit:
+                    return records, encode_cursor(*last_position)
+
+        return records, None
+
+    def segments(self):
+        """Segmentos existentes, do mais novo para o mais antigo"""
+        if not os.path.isdir(self.directory):
+            return []
+        names = [name for name in os.listdir(self.directory) if SEGMENT_PATTERN.match(name)]
+        return sorted(names, reverse=True)
+
+    def migrate_json(self, contacts_file):
+        """Importar (uma única vez) os contatos do antigo arquivo JSON"""
+        if not os.path.exists(contacts_file):
+            return 0
+
+        with open(contacts_file, 'r', encoding='utf-8') as f:
+            contacts = json.load(f)
+        contacts.sort(key=lambda contact: contact.get('timestamp', ''))
+
+        with self._locked():
+            # Os contatos antigos ficam em um segmento anterior a todos os novos
+            with open(os.path.join(self.directory, LEGACY_SEGMENT), 'ab') as f:
+                for contact in contacts:
+                    f.write((json.dumps(contact, ensure_ascii=False) + '\n').encode('utf-8'))
+
+        try:
+            os.replace(contacts_file, contacts_file + '.migrated')
+        except FileNotFoundError:
+            pass
+        return len(contacts)
+
+    def _current_segment(self):
+        try:
+            with open(os.path.join(self.directory, 'current'), 'r', encoding='utf-8') as f:
+                name = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return name if SEGMENT_PATTERN.match(name) else None
+
+    def _needs_rotation(self, segment):
+        try:
+            size = os.path.getsize(os.path.join(self.directory, segment))
+        except FileNotFoundError:
+            return True
+        if size >= self.max_bytes:
+            return True
+        started = datetime.strptime(SEGMENT_PATTERN.match(segment).group(1), SEGMENT_TIME_FORMAT)
+        return (datetime.now() - started).total_seconds() >= self.max_age_seconds
+
+    def _start_segment(self):
+        """Criar um novo segmento e torná-lo o ativo"""
+        name = _segment_name(datetime.now())
+        open(os.path.join(self.directory, name), 'ab').close()
+
+        pointer = os.path.join(self.directory, 'current')
+        with open(pointer + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(name)
+        os.replace(pointer + '.tmp', pointer)
+        return name
+
+    @contextmanager
+    def _locked(self):
+        """Lock entre threads e, quando possível, entre processos"""
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.directory, '.lock'), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _segment_name(moment):
+    return f"contacts-{moment.strftime(SEGMENT_TIME_FORMAT)}.jsonl"
+
+
+def _tail(path, end):
+    """Gerar (posição_inicial, linha) do fim para o começo do arquivo, em blocos"""
+    with open(path, 'rb') as f:
+        position = end
+        buffer = b''
+        while True:
+            size = min(READ_BLOCK_SIZE, position)
+            position -= size
+            f.seek(position)
+            buffer = f.read(size) + buffer
+            lines = buffer.split(b'\n')
+
+            # A primeira linha do bloco pode estar incompleta, exceto no início do arquivo
+            complete = lines if position == 0 else lines[1:]
+            line_end = position + len(buffer)
+            for line in reversed(complete):
+                start = line_end - len(line)
+                if line.strip():
+                    yield start, line
+                line_end = start - 1
+
+            if position == 0:
+                return
+            buffer = lines[0]
+
+
+def encode_cursor(segment, position):
+    raw = f"{segment}:{position}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Ler um cursor; lança ValueError se for inválido"""
+    try:
+        raw = base64.urlsafe_b64decode((cursor + '=' * (-len(cursor) % 4)).encode('ascii')).decode('utf-8')
+        segment, position = raw.rsplit(':', 1)
+        position = int(position)
+    except Exception:
+        raise ValueError('Cursor inválido')
+    if not SEGMENT_PATTERN.match(segment) or position < 0:
+        raise ValueError('Cursor inválido')
+    return segment, position
+
+
+# Instância compartilhada por todo o processo
+contact_log = ContactLog()
@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+
+# Tempo máximo (segundos) que uma contagem fica em memória sem ser recalculada
+FIRESTORE_COUNT_TTL = float(os.getenv('FIRESTORE_COUNT_TTL', '300'))
+FIRESTORE_COUNT_MAX_ENTRIES = int(os.getenv('FIRESTORE_COUNT_MAX_ENTRIES', '10000'))
+
+
+def value_key(value):
+    """Valor como o Firestore compara na igualdade: inteiros e reais juntos, booleanos à parte
+
+    Em Python True == 1, e a chave (coleção, campo, True) seria a mesma de 1.
+    """
+    if isinstance(value, bool):
+        return ('boolean', value)
+    if isinstance(value, (int, float)):
+        return ('number', value)
+    return (type(value).__name__, value)
+
+
+class CountCache:
+    """Contagens por (coleção, campo, valor) ajustadas pelas escritas feitas no proxy"""
+
+    def __init__(self, ttl=FIRESTORE_COUNT_TTL, max_entries=FIRESTORE_COUNT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # (coleção, campo, value_key(valor)) -> [contagem, expira_em]
+        self._counts = {}
+        # Coleção -> número de escritas vistas; uma contagem buscada antes de
+        # uma escrita não é guardada (o ajuste da escrita se perderia)
+        self._generations = {}
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'adjustments': 0,
+            'invalidations': 0
+        }
+
+    def generation(self, collection_name):
+        """Valor a passar para set() depois de contar no Firestore"""
+        with self._lock:
+            return self._generations.get(collection_name, 0)
+
+    def get(self, collection_name, field, value):
+        """Retorna a contagem em cache ou None"""
+        key = (collection_name, field, value_key(value))
+        with self._lock:
+            entry = self._counts.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                self._counts.pop(key, None)
+                self._stats['misses'] += 1
+                return None
+            self._stats['hits'] += 1
+            return entry[0]
+
+    def set(self, collection_name, field, value, count, generation=None):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if generation is not None and self._generations.get(collection_name, 0) != generation:
+                return
+            if len(self._counts) >= self.max_entries:
+                self._purge_expired()
+                if len(self._counts) >= self.max_entries:
+                    # Descartar a entrada mais antiga
+                    self._counts.pop(next(iter(self._counts)))
+            self._counts[(collection_name, field, value_key(value))] = [count, time.monotonic() + self.ttl]
+
+    def record_created(self, collection_name, data):
+        """Novo documento: somar 1 às contagens cujo (campo, valor) ele satisfaz"""
+        with self._lock:
+            self._bump(collection_name)
+            for (collection, field, key), entry in self._counts.items():
+                if collection == collection_name and field in data and value_key(data[field]) == key:
+                    entry[0] += 1
+                    self._stats['adjustments'] += 1
+
+    def record_modified(self, collection_name, data):
+        """Documento substituído/atualizado: descartar contagens dos campos alterados
+
+        Não sabemos o valor anterior do campo, então o ajuste exato é impossível.
+        """
+        with self._lock:
+            self._bump(collection_name)
+            keys = [
+                key for key in self._counts
+                if key[0] == collection_name and key[1] in data
+            ]
+            for key in keys:
+                del self._counts[key]
+            self._stats['invalidations'] += len(keys)
+
+    def record_deleted(self, collection_name, data=None):
+        """Documento removido: subtrair 1 das contagens que ele satisfazia
+
+        Sem os dados anteriores do documento, descarta as contagens da coleção.
+        """
+        with self._lock:
+            self._bump(collection_name)
+            if data is None:
+                keys = [key for key in self._counts if key[0] == collection_name]
+                for key in keys:
+                    del self._counts[key]
+                self._stats['invalidations'] += len(keys)
+                return
+            for (collection, field, key), entry in self._counts.items():
+                if collection == collection_name and field in data and value_key(data[field]) == key:
+                    entry[0] = max(entry[0] - 1, 0)
+                    self._stats['adjustments'] += 1
+
+    def stats(self):
+        with self._lock:
+            result = dict(self._stats)
+            result['entries'] = len(self._counts)
+            return result
+
+    def _bump(self, collection_name):
+        self._generations[collection_name] = self._generations.get(collection_name, 0) + 1
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        for key in [k for k, entry in self._counts.items() if entry[1] <= now]:
+            del self._counts[key]
+
+
+# Instância compartilhada por todo o processo
+count_cache = CountCache()
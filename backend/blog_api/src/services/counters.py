@@ -0,0 +1,346 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+# Configurações dos contadores a partir das variáveis de ambiente
+# Contadores aceitos, no formato "coleção.campo" separados por vírgula
+COUNTER_FIELDS = os.getenv('COUNTER_FIELDS', 'articles.views,articles.likes')
+# Contadores muito disputados divididos em N documentos ("articles.views=4")
+COUNTER_SHARDS = os.getenv('COUNTER_SHARDS', '')
+COUNTER_JOURNAL_PATH = os.getenv('COUNTER_JOURNAL_PATH', 'data/counters.db')
+COUNTER_FLUSH_INTERVAL = float(os.getenv('COUNTER_FLUSH_INTERVAL', '5'))
+# Por quanto tempo o último valor lido do Firestore é usado como base
+COUNTER_BASE_TTL = float(os.getenv('COUNTER_BASE_TTL', '60'))
+# Incrementos em 'flushing' há mais tempo que isso voltam a ficar pendentes (processo morreu)
+COUNTER_FLUSH_LEASE = float(os.getenv('COUNTER_FLUSH_LEASE', '120'))
+# Escritas por documents:commit (limite do Firestore)
+COUNTER_COMMIT_SIZE = 500
+
+# Subcoleção com as partes dos contadores divididos
+SHARDS_COLLECTION = 'counter_shards'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS counter_pending (
+    collection TEXT NOT NULL,
+    doc_id TEXT NOT NULL,
+    field TEXT NOT NULL,
+    delta INTEGER NOT NULL,
+    PRIMARY KEY (collection, doc_id, field)
+);
+CREATE TABLE IF NOT EXISTS counter_flushing (
+    flush_id TEXT NOT NULL,
+    collection TEXT NOT NULL,
+    doc_id TEXT NOT NULL,
+    field TEXT NOT NULL,
+    delta INTEGER NOT NULL,
+    claimed_at REAL NOT NULL,
+    PRIMARY KEY (flush_id, collection, doc_id, field)
+);
+CREATE INDEX IF NOT EXISTS ix_counter_flushing_key ON counter_flushing (collection, doc_id, field);
+CREATE TABLE IF NOT EXISTS counter_value (
+    collection TEXT NOT NULL,
+    doc_id TEXT NOT NULL,
+    field TEXT NOT NULL,
+    value INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (collection, doc_id, field)
+);
+"""
+
+# Soma de volta aos pendentes (usada ao devolver um flush que falhou)
+RESTORE_PENDING = (
+    'INSERT INTO counter_pending (collection, doc_id, field, delta) '
+    'SELECT collection, doc_id, field, SUM(delta) FROM counter_flushing WHERE {where} '
+    'GROUP BY collection, doc_id, field '
+    'ON CONFLICT (collection, doc_id, field) DO UPDATE SET delta = delta + excluded.delta'
+)
+
+
+def parse_counter_fields(spec):
+    """Converter "coleção.campo,..." em {coleção: [campos]}"""
+    fields = {}
+    for item in (spec or '').split(','):
+        collection_name, _, field = item.strip().partition('.')
+        if collection_name and field:
+            fields.setdefault(collection_name, []).append(field)
+    return fields
+
+
+def parse_counter_shards(spec):
+    """Converter "coleção.campo=N,..." em {(coleção, campo): N}"""
+    shards = {}
+    for item in (spec or '').split(','):
+        name, _, count = item.strip().partition('=')
+        collection_name, _, field = name.partition('.')
+        try:
+            if collection_name and field and int(count) > 1:
+                shards[(collection_name, field)] = int(count)
+        except ValueError:
+            print(f"Número de partes inválido para o contador {name}: {count}")
+    return shards
+
+
+class CounterService:
+    """Contadores com escrita adiada (write-behind)
+
+    Cada incremento é somado no diário local (SQLite, sobrevive a quedas do
+    processo) e periodicamente todos os pendentes vão ao Firestore em poucos
+    commits com transformações de incremento: mil visualizações de um artigo
+    viram uma escrita. A leitura soma o último valor conhecido do Firestore
+    com o que ainda não foi enviado.
+    """
+
+    def __init__(self, path=COUNTER_JOURNAL_PATH, fields=COUNTER_FIELDS, shards=COUNTER_SHARDS,
+                 flush_interval=COUNTER_FLUSH_INTERVAL, base_ttl=COUNTER_BASE_TTL):
+        self.path = path
+        self.fields = parse_counter_fields(fields)
+        self.shards = parse_counter_shards(shards)
+        self.flush_interval = flush_interval
+        self.base_ttl = base_ttl
+
+        self._read = None
+        self._commit = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._schema_ready = False
+        self._stats = {
+            'increments': 0,
+            'flushes': 0,
+            'flushed_counters': 0,
+            'upstream_writes': 0,
+            'flush_errors': 0
+        }
+
+    def init_app(self, read, commit):
+        """Configurar o acesso ao Firestore
+
+        `read(coleção, id, campos, partes)` retorna {campo: valor} somando as partes
+        dos contadores divididos; `commit([(caminho, [(campo, delta)])])` aplica os
+        incrementos e retorna, por documento, os valores resultantes.
+        """
+        self._read = read
+        self._commit = commit
+
+    def allows(self, collection_name, field):
+        return field in self.fields.get(collection_name, ())
+
+    def increment(self, collection_name, doc_id, field, amount=1):
+        """Registrar um incremento no diário; retorna o novo valor visto pelos usuários"""
+        with self._connection() as connection:
+            connection.execute(
+                'INSERT INTO counter_pending (collection, doc_id, field, delta) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (collection, doc_id, field) DO UPDATE SET delta = delta + excluded.delta',
+                (collection_name, doc_id, field, amount)
+            )
+        self._count('increments')
+        self.start()
+        return self.get(collection_name, doc_id, [field])[field]
+
+    def get(self, collection_name, doc_id, fields=None):
+        """Valores atuais: último valor do Firestore + incrementos ainda não enviados"""
+        fields = list(fields or self.fields.get(collection_name, ()))
+        if not fields:
+            return {}
+
+        marks = ','.join('?' * len(fields))
+        fetched = {}
+        while True:
+            with self._connection() as connection:
+                # Base e incrementos lidos no mesmo snapshot: um flush concluído entre
+                # as duas leituras tiraria o delta da soma antes de ele chegar à base
+                connection.execute('BEGIN')
+                values = dict(fetched)
+                values.update(connection.execute(
+                    f'SELECT field, value FROM counter_value '
+                    f'WHERE collection = ? AND doc_id = ? AND field IN ({marks}) AND fetched_at >= ?',
+                    (collection_name, doc_id, *fields, time.time() - self.base_ttl)
+                ).fetchall())
+
+                missing = [field for field in fields if field not in values]
+                if not missing or self._read is None:
+                    rows = connection.execute(
+                        f'SELECT field, SUM(delta) FROM ('
+                        f'SELECT field, delta FROM counter_pending '
+                        f'WHERE collection = ? AND doc_id = ? AND field IN ({marks}) '
+                        f'UNION ALL '
+                        f'SELECT field, delta FROM counter_flushing '
+                        f'WHERE collection = ? AND doc_id = ? AND field IN ({marks})'
+                        f') GROUP BY field',
+                        (collection_name, doc_id, *fields, collection_name, doc_id, *fields)
+                    ).fetchall()
+                    break
+
+            # A leitura no Firestore fica fora da transação; depois a soma é refeita
+            fetched.update(self._fetch_base(collection_name, doc_id, missing))
+
+        for field, delta in rows:
+            values[field] = values.get(field, 0) + delta
+        return values
+
+    def flush(self):
+        """Enviar os incrementos pendentes ao Firestore; retorna quantos contadores foram enviados"""
+        flush_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            # Flushes de processos que morreram no meio voltam a ficar pendentes
+            # (podem ser aplicados de novo se o commit chegou a acontecer)
+            connection.execute(RESTORE_PENDING.format(where='claimed_at < ?'), (now - COUNTER_FLUSH_LEASE,))
+            connection.execute('DELETE FROM counter_flushing WHERE claimed_at < ?', (now - COUNTER_FLUSH_LEASE,))
+            connection.execute(
+                'INSERT INTO counter_flushing (flush_id, collection, doc_id, field, delta, claimed_at) '
+                'SELECT ?, collection, doc_id, field, delta, ? FROM counter_pending WHERE delta != 0',
+                (flush_id, now)
+            )
+            connection.execute('DELETE FROM counter_pending')
+            rows = connection.execute(
+                'SELECT collection, doc_id, field, delta FROM counter_flushing WHERE flush_id = ?', (flush_id,)
+            ).fetchall()
+
+        if not rows:
+            return 0
+
+        # Um documento de destino por contador (ou por parte), com todos os seus campos
+        targets = {}
+        for collection_name, doc_id, field, delta in rows:
+            path = f"{collection_name}/{doc_id}"
+            shards = self.shards.get((collection_name, field))
+            if shards:
+                path = f"{path}/{SHARDS_COLLECTION}/{random.randrange(shards)}"
+            targets.setdefault(path, []).append((collection_name, doc_id, field, delta))
+
+        items = list(targets.items())
+        for start in range(0, len(items), COUNTER_COMMIT_SIZE):
+            chunk = items[start:start + COUNTER_COMMIT_SIZE]
+            try:
+                results = self._commit([(path, [(field, delta) for _, _, field, delta in counters])
+                                        for path, counters in chunk])
+            except Exception:
+                self._count('flush_errors')
+                with self._connection() as connection:
+                    connection.execute('BEGIN IMMEDIATE')
+                    connection.execute(RESTORE_PENDING.format(where='flush_id = ?'), (flush_id,))
+                    connection.execute('DELETE FROM counter_flushing WHERE flush_id = ?', (flush_id,))
+                raise
+
+            self._flushed(flush_id, chunk, results)
+            self._count('upstream_writes', len(chunk))
+
+        self._count('flushes')
+        self._count('flushed_counters', len(rows))
+        return len(rows)
+
+    def start(self):
+        """Iniciar o envio periódico (uma vez; de novo após um fork)"""
+        if self._commit is None or (self._pid == os.getpid() and self._thread is not None):
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._local = threading.local()
+            self._thread = threading.Thread(target=self._run, name='counter-flusher', daemon=True)
+            self._thread.start()
+
+    def stats(self):
+        with self._lock:
+            result = dict(self._stats)
+        with self._connection() as connection:
+            result['pending'] = connection.execute('SELECT COUNT(*) FROM counter_pending').fetchone()[0]
+            result['flushing'] = connection.execute('SELECT COUNT(*) FROM counter_flushing').fetchone()[0]
+        if result['increments']:
+            # Fração das escritas que deixaram de ir ao Firestore neste processo
+            result['writes_saved_ratio'] = round(1 - result['upstream_writes'] / result['increments'], 4)
+        result['flush_interval'] = self.flush_interval
+        return result
+
+    def _flushed(self, flush_id, chunk, results):
+        """Gravar os valores que o Firestore devolveu e remover os incrementos enviados"""
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            for (path, counters), values in zip(chunk, results):
+                for (collection_name, doc_id, field, delta), value in zip(counters, values):
+                    if (collection_name, field) in self.shards:
+                        # O valor devolvido é o da parte: somar o delta à base conhecida
+                        connection.execute(
+                            'UPDATE counter_value SET value = value + ? '
+                            'WHERE collection = ? AND doc_id = ? AND field = ?',
+                            (delta, collection_name, doc_id, field)
+                        )
+                    else:
+                        connection.execute(
+                            'INSERT OR REPLACE INTO counter_value (collection, doc_id, field, value, fetched_at) '
+                            'VALUES (?, ?, ?, ?, ?)',
+                            (collection_name, doc_id, field, value, now)
+                        )
+                    connection.execute(
+                        'DELETE FROM counter_flushing WHERE flush_id = ? AND collection = ? AND doc_id = ? AND field = ?',
+                        (flush_id, collection_name, doc_id, field)
+                    )
+
+    def _fetch_base(self, collection_name, doc_id, fields):
+        """Reler do Firestore o valor dos contadores (base vencida ou desconhecida)"""
+        shards = {field: self.shards.get((collection_name, field), 0) for field in fields}
+        fetched = self._read(collection_name, doc_id, fields, shards)
+        values = {field: fetched.get(field, 0) for field in fields}
+        now = time.time()
+        with self._connection() as connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO counter_value (collection, doc_id, field, value, fetched_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                [(collection_name, doc_id, field, value, now) for field, value in values.items()]
+            )
+        return values
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Erro ao enviar contadores ao Firestore: {e}")
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _connection(self):
+        """Conexão SQLite da thread atual (autocommit por instrução)"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            if not self._schema_ready:
+                connection.executescript(SCHEMA)
+                self._schema_ready = True
+            self._local.connection = connection
+        return _Transaction(connection)
+
+
+class _Transaction:
+    """Context manager: COMMIT ao sair sem erro, ROLLBACK se houver exceção"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self.connection
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.connection.in_transaction:
+            self.connection.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
+
+
+# Instância compartilhada por todo o processo
+counter_service = CounterService()
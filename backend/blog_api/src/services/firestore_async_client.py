@@ -0,0 +1,113 @@
+import asyncio
+import random
+import threading
+import time
+
+import httpx
+
+from src.services.firestore_client import (
+    FIRESTORE_POOL_SIZE, FIRESTORE_CONNECT_TIMEOUT, FIRESTORE_READ_TIMEOUT,
+    FIRESTORE_MAX_RETRIES, FIRESTORE_RETRY_BACKOFF, RETRY_STATUS_CODES, IDEMPOTENT_METHODS
+)
+from src.services.metrics import firestore_request_duration, firestore_operation
+
+
+class AsyncFirestoreClient:
+    """Versão asyncio do FirestoreClient (httpx), com o mesmo pool, timeouts e retries
+
+    O httpx.AsyncClient fica preso ao event loop em que foi criado, então é
+    criado na primeira requisição e recriado se o loop mudar.
+    """
+
+    def __init__(self, pool_size=FIRESTORE_POOL_SIZE, connect_timeout=FIRESTORE_CONNECT_TIMEOUT,
+                 read_timeout=FIRESTORE_READ_TIMEOUT, max_retries=FIRESTORE_MAX_RETRIES,
+                 retry_backoff=FIRESTORE_RETRY_BACKOFF):
+        self.pool_size = pool_size
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
+        self._client = None
+        self._loop = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'requests': 0,
+            'retries': 0,
+            'errors': 0
+        }
+
+    async def request(self, method, url, idempotent=None, timeout=None, **kwargs):
+        """Executar requisição reaproveitando conexões, com retry em leituras idempotentes"""
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        attempts = 1 + (self.max_retries if idempotent else 0)
+        client = self._get_client()
+
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            self._count('requests')
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, timeout=timeout or self.timeout, **kwargs)
+            except (httpx.TransportError, httpx.TimeoutException):
+                self._count('errors')
+                firestore_request_duration.observe((firestore_operation(method, url), 'error'),
+                                                   time.perf_counter() - started)
+                if last_attempt:
+                    raise
+            else:
+                firestore_request_duration.observe((firestore_operation(method, url), str(response.status_code)),
+                                                   time.perf_counter() - started)
+                if response.status_code not in RETRY_STATUS_CODES or last_attempt:
+                    return response
+
+            self._count('retries')
+            # Backoff exponencial com jitter para não sincronizar as tentativas
+            delay = self.retry_backoff * (2 ** attempt)
+            await asyncio.sleep(delay + random.uniform(0, delay))
+
+    async def get(self, url, **kwargs):
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request('POST', url, **kwargs)
+
+    async def patch(self, url, **kwargs):
+        return await self.request('PATCH', url, **kwargs)
+
+    async def delete(self, url, **kwargs):
+        return await self.request('DELETE', url, **kwargs)
+
+    def stats(self):
+        with self._lock:
+            result = dict(self._stats)
+        result.update({
+            'pool_size': self.pool_size,
+            'connect_timeout': self.timeout.connect,
+            'read_timeout': self.timeout.read,
+            'max_retries': self.max_retries
+        })
+        return result
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _get_client(self):
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            self._client = httpx.AsyncClient(limits=limits, timeout=self.timeout,
+                                             headers={'Connection': 'keep-alive'})
+            self._loop = loop
+        return self._client
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+
+# Instância compartilhada por todo o processo
+async_firestore_client = AsyncFirestoreClient()
@@ -0,0 +1,144 @@
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.services.metrics import firestore_request_duration, firestore_operation
+
+# Configurações do cliente HTTP a partir das variáveis de ambiente
+FIRESTORE_POOL_SIZE = int(os.getenv('FIRESTORE_POOL_SIZE', '20'))
+FIRESTORE_CONNECT_TIMEOUT = float(os.getenv('FIRESTORE_CONNECT_TIMEOUT', '3.05'))
+FIRESTORE_READ_TIMEOUT = float(os.getenv('FIRESTORE_READ_TIMEOUT', '10'))
+FIRESTORE_MAX_RETRIES = int(os.getenv('FIRESTORE_MAX_RETRIES', '3'))
+FIRESTORE_RETRY_BACKOFF = float(os.getenv('FIRESTORE_RETRY_BACKOFF', '0.2'))
+
+# Status que indicam falha transitória do Firestore
+RETRY_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+
+
+class FirestoreClient:
+    """Cliente HTTP compartilhado (pool + keep-alive) para a API REST do Firestore"""
+
+    def __init__(self, pool_size=FIRESTORE_POOL_SIZE, connect_timeout=FIRESTORE_CONNECT_TIMEOUT,
+                 read_timeout=FIRESTORE_READ_TIMEOUT, max_retries=FIRESTORE_MAX_RETRIES,
+                 retry_backoff=FIRESTORE_RETRY_BACKOFF):
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
+        self._open_session()
+
+        self._lock = threading.Lock()
+        self._stats = {
+            'requests': 0,
+            'retries': 0,
+            'errors': 0
+        }
+
+    def request(self, method, url, idempotent=None, timeout=None, **kwargs):
+        """Executar requisição reaproveitando conexões, com retry em leituras idempotentes"""
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        attempts = 1 + (self.max_retries if idempotent else 0)
+        timeout = timeout or self.timeout
+
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            self._count('requests')
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self._count('errors')
+                firestore_request_duration.observe((firestore_operation(method, url), 'error'),
+                                                   time.perf_counter() - started)
+                if last_attempt:
+                    raise
+            else:
+                firestore_request_duration.observe((firestore_operation(method, url), str(response.status_code)),
+                                                   time.perf_counter() - started)
+                if response.status_code not in RETRY_STATUS_CODES or last_attempt:
+                    return response
+                response.close()
+
+            self._count('retries')
+            self._sleep_backoff(attempt)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request('PATCH', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    def stats(self):
+        """Estatísticas do cliente e dos pools de conexão"""
+        with self._lock:
+            result = dict(self._stats)
+
+        pools = []
+        pool_manager = self._adapter.poolmanager
+        if pool_manager is not None:
+            for key in list(pool_manager.pools.keys()):
+                pool = pool_manager.pools.get(key)
+                if pool is None:
+                    continue
+                pools.append({
+                    'host': pool.host,
+                    'connections_opened': pool.num_connections,
+                    'requests': pool.num_requests,
+                    'idle_connections': pool.pool.qsize() if pool.pool is not None else 0
+                })
+
+        result.update({
+            'pool_size': self.pool_size,
+            'connect_timeout': self.timeout[0],
+            'read_timeout': self.timeout[1],
+            'max_retries': self.max_retries,
+            'pools': pools
+        })
+        return result
+
+    def close(self):
+        self.session.close()
+
+    def reset(self):
+        """Descartar as conexões herdadas do processo pai (ex.: workers do gunicorn após o fork)
+
+        Sockets abertos antes do fork seriam compartilhados por todos os workers.
+        """
+        self._open_session()
+
+    def _open_session(self):
+        # O pool do urllib3 é thread-safe; as tentativas são controladas aqui
+        # para que leituras via POST (runQuery, batchGet) também possam ser repetidas
+        self._adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size,
+                                    max_retries=0, pool_block=False)
+        self.session = requests.Session()
+        self.session.mount('https://', self._adapter)
+        self.session.mount('http://', self._adapter)
+        self.session.headers.update({'Connection': 'keep-alive'})
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _sleep_backoff(self, attempt):
+        # Backoff exponencial com jitter para não sincronizar as tentativas
+        delay = self.retry_backoff * (2 ** attempt)
+        time.sleep(delay + random.uniform(0, delay))
+
+
+# Instância compartilhada por todo o processo
+firestore_client = FirestoreClient()
@@ -0,0 +1,205 @@
+import base64
+import math
+from collections import namedtuple
+from datetime import date, datetime, timezone
+
+# Tipos para gravar valores que não têm equivalente direto em JSON
+GeoPoint = namedtuple('GeoPoint', ['latitude', 'longitude'])
+
+
+class Reference(str):
+    """Caminho completo de documento a ser gravado como referenceValue"""
+
+
+# ---------------------------------------------------------------------------
+# Firestore -> Python
+# ---------------------------------------------------------------------------
+
+def _decode_array(raw):
+    # Listas de texto (tags) são as mais comuns: sem chamada de função por item
+    return [item['stringValue'] if 'stringValue' in item else decode_value(item) for item in raw.get('values', ())]
+
+
+def _decode_map(raw):
+    return decode_fields(raw.get('fields', {}))
+
+
+def _decode_geo_point(raw):
+    return {
+        'latitude': raw.get('latitude', 0.0),
+        'longitude': raw.get('longitude', 0.0)
+    }
+
+
+def _none(raw):
+    return None
+
+
+# Tipos devolvidos como estão, sem chamada de função (os mais comuns nos artigos).
+# timestampValue, referenceValue e bytesValue (base64) continuam como texto
+PLAIN_KINDS = frozenset(('stringValue', 'booleanValue', 'timestampValue', 'referenceValue', 'bytesValue'))
+
+# Tabela de conversão dos demais: chave do valor Firestore -> função de conversão
+DECODERS = {
+    'integerValue': int,
+    'doubleValue': float,
+    'nullValue': _none,
+    'arrayValue': _decode_array,
+    'mapValue': _decode_map,
+    'geoPointValue': _decode_geo_point
+}
+
+
+def decode_value(value):
+    """Converter um valor do Firestore ({tipoValue: ...}) para Python"""
+    # Um valor do Firestore tem exatamente uma chave
+    for kind in value:
+        if kind in PLAIN_KINDS:
+            return value[kind]
+        decoder = DECODERS.get(kind)
+        if decoder is not None:
+            return decoder(value[kind])
+        break
+    return value
+
+
+def decode_fields(fields):
+    """Converter o mapa de campos de um documento para um dicionário Python"""
+    # Mesmo despacho de decode_value, sem uma chamada por campo
+    result = {}
+    for key, value in fields.items():
+        if 'stringValue' in value:
+            result[key] = value['stringValue']
+            continue
+        for kind in value:
+            if kind in PLAIN_KINDS:
+                result[key] = value[kind]
+            else:
+                decoder = DECODERS.get(kind)
+                result[key] = decoder(value[kind]) if decoder is not None else value
+            break
+        else:
+            result[key] = value
+    return result
+
+
+def decode_document(doc):
+    """Converter um documento do Firestore para o formato {id, data} do proxy"""
+    return {
+        'id': doc['name'].rsplit('/', 1)[-1],
+        'data': decode_fields(doc.get('fields', {}))
+    }
+
+
+# ---------------------------------------------------------------------------
+# Python -> Firestore
+# ---------------------------------------------------------------------------
+
+def _encode_string(value):
+    return {'stringValue': value}
+
+
+def _encode_bool(value):
+    return {'booleanValue': value}
+
+
+def _encode_int(value):
+    return {'integerValue': str(value)}
+
+
+def _encode_float(value):
+    # O JSON do Firestore representa NaN e infinitos como texto
+    if math.isnan(value):
+        return {'doubleValue': 'NaN'}
+    if math.isinf(value):
+        return {'doubleValue': 'Infinity' if value > 0 else '-Infinity'}
+    return {'doubleValue': value}
+
+
+def _encode_none(value):
+    return {'nullValue': None}
+
+
+def _encode_list(value):
+    return {'arrayValue': {'values': [encode_value(item) for item in value]}}
+
+
+def _encode_dict(value):
+    return {'mapValue': {'fields': encode_fields(value)}}
+
+
+def _encode_datetime(value):
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return {'timestampValue': value.isoformat() + 'Z'}
+
+
+def _encode_date(value):
+    return {'timestampValue': value.isoformat() + 'T00:00:00Z'}
+
+
+def _encode_bytes(value):
+    return {'bytesValue': base64.b64encode(bytes(value)).decode('ascii')}
+
+
+def _encode_geo_point(value):
+    return {'geoPointValue': {'latitude': value.latitude, 'longitude': value.longitude}}
+
+
+def _encode_reference(value):
+    return {'referenceValue': str(value)}
+
+
+def _encode_fallback(value):
+    return {'stringValue': str(value)}
+
+
+# Tabela de conversão por tipo exato: bool é verificado antes de int por construção.
+# Subclasses são resolvidas pela MRO na primeira vez e guardadas na tabela
+ENCODERS = {
+    str: _encode_string,
+    bool: _encode_bool,
+    int: _encode_int,
+    float: _encode_float,
+    type(None): _encode_none,
+    list: _encode_list,
+    tuple: _encode_list,
+    dict: _encode_dict,
+    datetime: _encode_datetime,
+    date: _encode_date,
+    bytes: _encode_bytes,
+    bytearray: _encode_bytes,
+    GeoPoint: _encode_geo_point,
+    Reference: _encode_reference
+}
+
+
+def _resolve_encoder(value_type):
+    for base in value_type.__mro__[1:]:
+        encoder = ENCODERS.get(base)
+        if encoder is not None:
+            break
+    else:
+        encoder = _encode_fallback
+    ENCODERS[value_type] = encoder
+    return encoder
+
+
+def encode_value(value):
+    """Converter um valor Python para o formato do Firestore"""
+    encoder = ENCODERS.get(type(value))
+    if encoder is None:
+        encoder = _resolve_encoder(type(value))
+    return encoder(value)
+
+
+def encode_fields(data):
+    """Converter um dicionário Python no mapa de campos do Firestore"""
+    # Mesmo despacho de encode_value, sem uma chamada a mais por campo
+    result = {}
+    for key, value in data.items():
+        encoder = ENCODERS.get(type(value))
+        if encoder is None:
+            encoder = _resolve_encoder(type(value))
+        result[key] = encoder(value)
+    return result
@@ -0,0 +1,368 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import and_, case, delete, exists, func, literal, literal_column, select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from src.models.mirror import MirroredDocument, MirrorState
+from src.services.firestore_query import pagination_order
+
+# Configurações do espelho local a partir das variáveis de ambiente
+# Coleções espelhadas no SQLite ("articles,categories"; vazio desativa)
+FIRESTORE_MIRROR_COLLECTIONS = os.getenv('FIRESTORE_MIRROR_COLLECTIONS', 'articles')
+FIRESTORE_MIRROR_INTERVAL = float(os.getenv('FIRESTORE_MIRROR_INTERVAL', '60'))
+# Campos com índice de expressão por coleção ("articles=timestamp,category")
+FIRESTORE_MIRROR_INDEXES = os.getenv('FIRESTORE_MIRROR_INDEXES', 'articles=timestamp,category')
+
+documents_table = MirroredDocument.__table__
+state_table = MirrorState.__table__
+
+# Operadores que o espelho resolve em SQL (o resto é filtrado em Python)
+SCALAR_OPERATORS = {
+    '==': lambda column, value: column == value,
+    '!=': lambda column, value: column != value,
+    '<': lambda column, value: column < value,
+    '<=': lambda column, value: column <= value,
+    '>': lambda column, value: column > value,
+    '>=': lambda column, value: column >= value
+}
+LIST_OPERATORS = frozenset(['in', 'not-in', 'array-contains-any'])
+
+
+# Texto no formato dos timestamps do Firestore (RFC 3339 em UTC)
+TIMESTAMP_GLOB = '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]T[0-9][0-9]:[0-9][0-9]:[0-9][0-9]*Z'
+
+
+def timestamp_order(column):
+    """Expressão que ordena timestamps RFC 3339 pelo tempo (outros valores ficam como estão)
+
+    O Firestore usa só os dígitos de fração necessários ("...:05Z", "...:04.5Z",
+    "...:04.123456Z"), que não ordenam como texto: a fração é completada até 9 dígitos.
+    """
+    fraction = case(
+        (func.substr(column, 20, 1) == '.', func.substr(column, 21, func.length(column) - 21)),
+        else_=''
+    )
+    normalized = func.substr(column, 1, 19).op('||')(func.substr(fraction.op('||')('000000000'), 1, 9))
+    return case((column.op('GLOB')(TIMESTAMP_GLOB), normalized), else_=column)
+
+
+def parse_indexes(spec):
+    """Converter "colecao=campo1,campo2;outra=campo" em {coleção: [campos]}"""
+    indexes = {}
+    for item in (spec or '').split(';'):
+        if '=' not in item:
+            continue
+        name, fields = item.split('=', 1)
+        indexes[name.strip()] = [field.strip() for field in fields.split(',') if field.strip()]
+    return indexes
+
+
+def json_path(field):
+    """Caminho JSON do SQLite para um campo ("a.b" é aninhado, como no Firestore)"""
+    return '$.' + '.'.join('"' + part.replace('"', '\\"') + '"' for part in field.split('.'))
+
+
+def json_extract(field):
+    """json_extract do campo com o caminho literal no SQL: só assim o SQLite usa
+    os índices de expressão (um parâmetro não casa com a expressão do índice)"""
+    return func.json_extract(documents_table.c.data, _path_literal(field))
+
+
+def json_type(field):
+    return func.json_type(documents_table.c.data, _path_literal(field))
+
+
+def _path_literal(field):
+    return literal_column("'" + json_path(field).replace("'", "''") + "'")
+
+
+def _path_index_expression(field):
+    return "json_extract(data, '" + json_path(field).replace("'", "''") + "')"
+
+
+def _is_scalar(value):
+    return value is None or isinstance(value, (str, int, float, bool))
+
+
+class FirestoreMirror:
+    """Cópia local (SQLite) de coleções do Firestore, sincronizada por updateTime
+
+    Cada sincronização lista só nomes e updateTime dos documentos (máscara vazia),
+    busca com batchGet apenas os que mudaram e remove os que sumiram. As escritas
+    feitas pelo proxy entram no espelho na hora, com o documento retornado pelo
+    Firestore. As consultas where/orderBy/limit são respondidas com json_extract.
+    """
+
+    def __init__(self, collections=FIRESTORE_MIRROR_COLLECTIONS, interval=FIRESTORE_MIRROR_INTERVAL,
+                 indexes=FIRESTORE_MIRROR_INDEXES):
+        self.collections = frozenset(name.strip() for name in collections.split(',') if name.strip())
+        self.interval = interval
+        self.indexes = parse_indexes(indexes)
+
+        self._engine = None
+        self._list_versions = None
+        self._get_documents = None
+        self._ready = set()
+        # Documentos escritos durante uma sincronização não são removidos por ela
+        self._written = {}
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stats = {
+            'reads': 0,
+            'syncs': 0,
+            'sync_errors': 0,
+            'fetched': 0,
+            'deleted': 0,
+            'writes': 0
+        }
+
+    def init_app(self, engine, list_versions, get_documents):
+        """Configurar o banco e as funções de leitura do Firestore
+
+        `list_versions(coleção)` gera (id, updateTime) de todos os documentos;
+        `get_documents(coleção, ids)` retorna {id: (dados, updateTime) ou None}.
+        """
+        self._engine = engine
+        self._list_versions = list_versions
+        self._get_documents = get_documents
+
+        with engine.begin() as conn:
+            for collection_name, fields in self.indexes.items():
+                if collection_name not in self.collections:
+                    continue
+                for field in fields:
+                    # Mesma expressão usada nas consultas, precedida da coleção
+                    name = f"ix_mirror_{collection_name}_{field}".replace('.', '_').replace('-', '_')
+                    conn.execute(text(
+                        f"CREATE INDEX IF NOT EXISTS \"{name}\" ON {documents_table.name} "
+                        f"(collection, {_path_index_expression(field)})"
+                    ))
+
+    def serves(self, collection_name):
+        """A coleção é espelhada e já foi sincronizada por este processo
+
+        O estado gravado no banco não basta: depois de um restart o espelho pode
+        estar com qualquer idade até a primeira sincronização terminar.
+        """
+        return collection_name in self._ready
+
+    def supports(self, clause):
+        """O filtro pode ser resolvido em SQL"""
+        operator, value = clause['operator'], clause['value']
+        if operator in LIST_OPERATORS:
+            return isinstance(value, list) and all(_is_scalar(item) for item in value)
+        return (operator in SCALAR_OPERATORS or operator == 'array-contains') and _is_scalar(value)
+
+    def query(self, collection_name, clauses, order_by, limit=None):
+        """Consultar o espelho; retorna ([(id, dados, updateTime)], bytes lidos)
+
+        Todos os filtros devem ser suportados (ver `supports`). A ordenação segue
+        a do Firestore: documentos sem o campo ficam de fora e o desempate é pelo id.
+        """
+        conditions = [documents_table.c.collection == collection_name]
+        conditions.extend(self._compile_clause(clause) for clause in clauses)
+
+        ordering = []
+        for field, direction in pagination_order(clauses, order_by):
+            if field == '__name__':
+                column = documents_table.c.doc_id
+            else:
+                column = timestamp_order(json_extract(field))
+                conditions.append(json_type(field).isnot(None))
+            ordering.append(column.desc() if direction == 'desc' else column.asc())
+
+        stmt = select(documents_table.c.doc_id, documents_table.c.data, documents_table.c.update_time).where(
+            and_(*conditions)
+        ).order_by(*ordering)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+
+        with self._engine.connect() as conn:
+            rows = conn.execute(stmt).all()
+        self._count('reads')
+        return [(doc_id, json.loads(raw), update_time) for doc_id, raw, update_time in rows], \
+            sum(len(raw) for _, raw, _ in rows)
+
+    def get(self, collection_name, doc_id):
+        """(dados, updateTime, bytes) de um documento, ou None se não estiver no espelho"""
+        stmt = select(documents_table.c.data, documents_table.c.update_time).where(
+            documents_table.c.collection == collection_name,
+            documents_table.c.doc_id == doc_id
+        )
+        with self._engine.connect() as conn:
+            row = conn.execute(stmt).first()
+        self._count('reads')
+        if row is None:
+            return None
+        return json.loads(row.data), row.update_time, len(row.data)
+
+    def apply_write(self, collection_name, doc_id, data, update_time, operation):
+        """Refletir no espelho uma escrita feita pelo proxy (data=dados completos)"""
+        if collection_name not in self.collections or self._engine is None:
+            return
+
+        with self._lock:
+            written = self._written.get(collection_name)
+            if written is not None:
+                written.add(doc_id)
+
+        with self._engine.begin() as conn:
+            if operation == 'delete':
+                conn.execute(delete(documents_table).where(
+                    documents_table.c.collection == collection_name,
+                    documents_table.c.doc_id == doc_id
+                ))
+            else:
+                self._upsert(conn, collection_name, [(doc_id, data, update_time)])
+        self._count('writes')
+
+    def sync(self, collection_name):
+        """Sincronizar uma coleção; retorna {listed, fetched, deleted}"""
+        with self._sync_lock:
+            with self._lock:
+                self._written[collection_name] = set()
+            try:
+                result = self._sync(collection_name)
+            except Exception as e:
+                self._count('sync_errors')
+                self._save_state(collection_name, last_error=f'{type(e).__name__}: {e}'[:500])
+                raise
+            finally:
+                with self._lock:
+                    written = self._written.pop(collection_name, set())
+
+            self._save_state(collection_name, ready=True, last_error=None, document_count=result['listed'])
+            self._ready.add(collection_name)
+            self._count('syncs')
+            result['written_during_sync'] = len(written)
+            return result
+
+    def sync_all(self):
+        for collection_name in sorted(self.collections):
+            try:
+                self.sync(collection_name)
+            except Exception as e:
+                print(f"Erro ao sincronizar o espelho de {collection_name}: {e}")
+
+    def start(self):
+        """Sincronizar periodicamente em segundo plano (uma vez; de novo após um fork)"""
+        if self._engine is None or (self._pid == os.getpid() and self._thread is not None):
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='firestore-mirror', daemon=True)
+            self._thread.start()
+
+    def stats(self):
+        with self._lock:
+            result = dict(self._stats)
+        result['collections'] = sorted(self.collections)
+        result['ready'] = sorted(self._ready)
+        if self._engine is not None:
+            with self._engine.connect() as conn:
+                result['state'] = [dict(row._mapping) for row in conn.execute(select(state_table))]
+        return result
+
+    def _sync(self, collection_name):
+        remote = dict(self._list_versions(collection_name))
+
+        column = documents_table.c
+        with self._engine.connect() as conn:
+            local = dict(conn.execute(
+                select(column.doc_id, column.update_time).where(column.collection == collection_name)
+            ).all())
+
+        changed = [doc_id for doc_id, update_time in remote.items() if local.get(doc_id) != update_time]
+        fetched = 0
+        missing = []
+        for start in range(0, len(changed), 100):
+            found = self._get_documents(collection_name, changed[start:start + 100])
+            rows = [(doc_id, item[0], item[1]) for doc_id, item in found.items() if item is not None]
+            missing.extend(doc_id for doc_id, item in found.items() if item is None)
+            with self._engine.begin() as conn:
+                self._upsert(conn, collection_name, rows)
+            fetched += len(rows)
+
+        with self._lock:
+            written = set(self._written.get(collection_name, ()))
+        gone = [doc_id for doc_id in local if doc_id not in remote] + missing
+        deleted = [doc_id for doc_id in dict.fromkeys(gone) if doc_id not in written]
+        for start in range(0, len(deleted), 500):
+            with self._engine.begin() as conn:
+                conn.execute(delete(documents_table).where(
+                    column.collection == collection_name,
+                    column.doc_id.in_(deleted[start:start + 500])
+                ))
+
+        self._count('fetched', fetched)
+        self._count('deleted', len(deleted))
+        return {'listed': len(remote), 'fetched': fetched, 'deleted': len(deleted)}
+
+    def _upsert(self, conn, collection_name, rows):
+        """Gravar documentos; uma versão mais antiga nunca substitui uma mais nova"""
+        if not rows:
+            return
+        stmt = sqlite_insert(documents_table).values([
+            {
+                'collection': collection_name,
+                'doc_id': doc_id,
+                'data': json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str),
+                'update_time': update_time
+            }
+            for doc_id, data, update_time in rows
+        ])
+        conn.execute(stmt.on_conflict_do_update(
+            index_elements=['collection', 'doc_id'],
+            set_={'data': stmt.excluded.data, 'update_time': stmt.excluded.update_time},
+            where=timestamp_order(stmt.excluded.update_time) >= timestamp_order(documents_table.c.update_time)
+        ))
+
+    def _compile_clause(self, clause):
+        field, operator, value = clause['field'], clause['operator'], clause['value']
+        column = json_extract(field)
+
+        # Campo ausente (ou null) vira NULL no SQL e não satisfaz nenhuma comparação,
+        # como no Firestore; só "== null" precisa distinguir o null de verdade
+        if operator == '==' and value is None:
+            return json_type(field) == 'null'
+        if operator in SCALAR_OPERATORS:
+            return SCALAR_OPERATORS[operator](column, value)
+        if operator == 'in':
+            return column.in_(value)
+        if operator == 'not-in':
+            return column.not_in(value)
+
+        # array-contains / array-contains-any: procurar nos elementos do array
+        elements = func.json_each(documents_table.c.data, _path_literal(field)).table_valued('value')
+        values = [value] if operator == 'array-contains' else value
+        return and_(
+            json_type(field) == 'array',
+            exists(select(literal(1)).select_from(elements).where(elements.c.value.in_(values)))
+        )
+
+    def _save_state(self, collection_name, **values):
+        values['last_sync_at'] = datetime.now().isoformat()
+        stmt = sqlite_insert(state_table).values(collection=collection_name, **values)
+        with self._engine.begin() as conn:
+            conn.execute(stmt.on_conflict_do_update(index_elements=['collection'], set_=values))
+
+    def _run(self):
+        while True:
+            self.sync_all()
+            time.sleep(self.interval)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+
+# Instância compartilhada por todo o processo
+firestore_mirror = FirestoreMirror()
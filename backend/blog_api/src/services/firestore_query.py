@@ -0,0 +1,190 @@
+import base64
+import json
+from src.services.firestore_codec import encode_value
+
+# Operadores do frontend -> operadores de fieldFilter do Firestore
+FIELD_OPERATORS = {
+    '==': 'EQUAL',
+    '!=': 'NOT_EQUAL',
+    '<': 'LESS_THAN',
+    '<=': 'LESS_THAN_OR_EQUAL',
+    '>': 'GREATER_THAN',
+    '>=': 'GREATER_THAN_OR_EQUAL',
+    'in': 'IN',
+    'not-in': 'NOT_IN',
+    'array-contains': 'ARRAY_CONTAINS',
+    'array-contains-any': 'ARRAY_CONTAINS_ANY'
+}
+
+# Operadores cujo valor precisa ser uma lista
+LIST_OPERATORS = frozenset(['in', 'not-in', 'array-contains-any'])
+
+# Operadores de desigualdade: o Firestore exige ordenar primeiro pelo campo filtrado
+INEQUALITY_OPERATORS = frozenset(['<', '<=', '>', '>=', '!=', 'not-in'])
+
+
+def parse_query(order_by=None, direction='asc', limit=None, where_param=None):
+    """Normalizar os parâmetros da URL em uma consulta
+
+    `where` aceita um objeto {field, operator, value} ou uma lista deles; o objeto
+    pode trazer também `orderBy` ({field, direction}) e `limit`, como o frontend envia.
+    Lança ValueError se os parâmetros forem inválidos.
+    """
+    query = {
+        'where': [],
+        'orderBy': [],
+        'limit': None
+    }
+
+    if order_by:
+        query['orderBy'].append((order_by, 'desc' if (direction or '').lower() == 'desc' else 'asc'))
+
+    if limit:
+        query['limit'] = int(limit)
+
+    if where_param:
+        try:
+            where = json.loads(where_param)
+        except ValueError:
+            raise ValueError('Parâmetro where não é um JSON válido')
+
+        clauses = where if isinstance(where, list) else [where]
+        for clause in clauses:
+            if not isinstance(clause, dict):
+                raise ValueError('Cada filtro where deve ser um objeto')
+
+            embedded_order = clause.get('orderBy')
+            if isinstance(embedded_order, dict) and embedded_order.get('field') and not query['orderBy']:
+                embedded_direction = (embedded_order.get('direction') or 'asc').lower()
+                query['orderBy'].append((embedded_order['field'], 'desc' if embedded_direction == 'desc' else 'asc'))
+            if clause.get('limit') and query['limit'] is None:
+                query['limit'] = int(clause['limit'])
+
+            if clause.get('field') and clause.get('operator'):
+                query['where'].append({
+                    'field': clause['field'],
+                    'operator': clause['operator'],
+                    'value': clause.get('value')
+                })
+
+    return query
+
+
+def split_where_clauses(clauses):
+    """Separar filtros que o Firestore executa dos que precisam ser aplicados em Python"""
+    server, local = [], []
+    for clause in clauses:
+        operator = clause['operator']
+        if operator not in FIELD_OPERATORS:
+            local.append(clause)
+        elif operator in LIST_OPERATORS and not isinstance(clause['value'], list):
+            local.append(clause)
+        else:
+            server.append(clause)
+    return server, local
+
+
+def compile_filter(clause):
+    """Converter um filtro {field, operator, value} em filtro do Firestore"""
+    field = {'fieldPath': clause['field']}
+    operator = clause['operator']
+    value = clause['value']
+
+    # Comparações com null usam unaryFilter no Firestore
+    if value is None and operator in ('==', '!='):
+        return {
+            'unaryFilter': {
+                'field': field,
+                'op': 'IS_NULL' if operator == '==' else 'IS_NOT_NULL'
+            }
+        }
+
+    return {
+        'fieldFilter': {
+            'field': field,
+            'op': FIELD_OPERATORS[operator],
+            'value': encode_value(value)
+        }
+    }
+
+
+def compile_structured_query(collection_name, clauses, order_by=(), limit=None):
+    """Montar o structuredQuery do runQuery a partir de filtros, ordenação e limite"""
+    structured_query = {
+        'from': [{'collectionId': collection_name}]
+    }
+
+    filters = [compile_filter(clause) for clause in clauses]
+    if len(filters) == 1:
+        structured_query['where'] = filters[0]
+    elif filters:
+        structured_query['where'] = {
+            'compositeFilter': {
+                'op': 'AND',
+                'filters': filters
+            }
+        }
+
+    if order_by:
+        structured_query['orderBy'] = [
+            {
+                'field': {'fieldPath': field},
+                'direction': 'DESCENDING' if direction == 'desc' else 'ASCENDING'
+            }
+            for field, direction in order_by
+        ]
+
+    if limit is not None:
+        structured_query['limit'] = limit
+
+    return structured_query
+
+
+def pagination_order(clauses, order_by):
+    """Ordenação estável para paginar com cursores (termina sempre em __name__)"""
+    order_by = list(order_by)
+    if not order_by:
+        inequality = next((c for c in clauses if c['operator'] in INEQUALITY_OPERATORS), None)
+        if inequality is not None:
+            order_by.append((inequality['field'], 'asc'))
+    order_by.append(('__name__', order_by[-1][1] if order_by else 'asc'))
+    return order_by
+
+
+def encode_cursor(cursor):
+    """Gerar um pageToken opaco a partir do estado do cursor"""
+    raw = json.dumps(cursor, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Ler um pageToken gerado por encode_cursor; lança ValueError se for inválido"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        cursor = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError('pageToken inválido')
+    if not isinstance(cursor, dict):
+        raise ValueError('pageToken inválido')
+    return cursor
+
+
+def sort_documents(documents, order_by):
+    """Ordenar em Python documentos já convertidos ({id, data})"""
+    # Como no Firestore, documentos sem o campo de ordenação ficam de fora
+    documents = [doc for doc in documents if all(field in doc['data'] for field, _ in order_by)]
+    for field, direction in reversed(order_by):
+        documents.sort(key=lambda doc: _sort_value(doc['data'][field]), reverse=direction == 'desc')
+    return documents
+
+
+def _sort_value(value):
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, str):
+        return (3, value)
+    return (4, json.dumps(value, sort_keys=True, default=str))
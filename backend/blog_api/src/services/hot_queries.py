@@ -0,0 +1,211 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Configurações das consultas quentes a partir das variáveis de ambiente
+# Intervalo de atualização em segundo plano de cada consulta
+FIRESTORE_HOT_REFRESH_INTERVAL = float(os.getenv('FIRESTORE_HOT_REFRESH_INTERVAL', '30'))
+# Idade máxima de um resultado servido quando o Firestore está lento ou fora do ar
+FIRESTORE_HOT_MAX_STALENESS = float(os.getenv('FIRESTORE_HOT_MAX_STALENESS', '600'))
+FIRESTORE_HOT_WARMUP_TIMEOUT = float(os.getenv('FIRESTORE_HOT_WARMUP_TIMEOUT', '15'))
+FIRESTORE_HOT_WORKERS = int(os.getenv('FIRESTORE_HOT_WORKERS', '4'))
+
+
+class _HotEntry:
+    __slots__ = ('loader', 'derive', 'parent', 'payload', 'fetched_at', 'generation', 'stale',
+                 'failures', 'retry_at')
+
+    def __init__(self, loader, derive, parent):
+        self.loader = loader
+        self.derive = derive
+        self.parent = parent
+        self.payload = None
+        self.fetched_at = 0.0
+        # Incrementada a cada escrita na coleção; uma atualização iniciada antes
+        # da escrita não limpa a marca de desatualizado
+        self.generation = 0
+        self.stale = False
+        # Com o Firestore fora do ar as tentativas são espaçadas (backoff exponencial)
+        self.failures = 0
+        self.retry_at = 0.0
+
+
+class HotQueries:
+    """Stale-while-revalidate para consultas quentes
+
+    Cada consulta registrada fica sempre em memória e é atualizada em segundo
+    plano. As requisições nunca esperam o Firestore: recebem o último resultado,
+    desde que ele tenha no máximo `max_staleness` segundos.
+    """
+
+    def __init__(self, refresh_interval=FIRESTORE_HOT_REFRESH_INTERVAL, max_staleness=FIRESTORE_HOT_MAX_STALENESS,
+                 workers=FIRESTORE_HOT_WORKERS):
+        self.refresh_interval = refresh_interval
+        self.max_staleness = max_staleness
+        self.workers = workers
+
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'expired': 0,
+            'refreshes': 0,
+            'refresh_errors': 0
+        }
+
+    def register(self, key, loader, derive=None, parent=None):
+        """Registrar uma consulta: `loader()` busca o payload no Firestore
+
+        `derive(key, payload)` é chamado após cada atualização (ex.: registrar as
+        consultas derivadas de uma listagem); `parent` agrupa essas derivadas.
+        """
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = _HotEntry(loader, derive, parent)
+
+    def replace_children(self, parent, children):
+        """Trocar as consultas derivadas de `parent` por `children` ({chave: loader})"""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry.parent == parent]:
+                if key not in children:
+                    del self._entries[key]
+            for key, loader in children.items():
+                if key not in self._entries:
+                    self._entries[key] = _HotEntry(loader, None, parent)
+
+    def get(self, key):
+        """Payload em memória da consulta quente, ou None se não for quente (ou velho demais)"""
+        entry = self._entries.get(key)
+        if entry is None or entry.payload is None:
+            return None
+
+        age = time.monotonic() - entry.fetched_at
+        if age > self.max_staleness:
+            self._count('expired')
+            return None
+
+        if entry.stale or age > self.refresh_interval:
+            # O atualizador está atrasado (ou houve escrita): servir e pedir atualização
+            self._count('stale_hits')
+            self._wakeup.set()
+        else:
+            self._count('hits')
+        return entry.payload
+
+    def is_hot(self, key):
+        return key in self._entries
+
+    def mark_stale(self, collection_name):
+        """Após uma escrita: atualizar em segundo plano as consultas da coleção"""
+        with self._lock:
+            for key, entry in self._entries.items():
+                if key[1] == collection_name:
+                    entry.generation += 1
+                    entry.stale = True
+        self._wakeup.set()
+
+    def refresh(self, key):
+        """Buscar de novo uma consulta; em caso de erro o resultado anterior é mantido"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False
+
+        generation = entry.generation
+        try:
+            payload = entry.loader()
+        except Exception as e:
+            with self._lock:
+                entry.failures += 1
+                entry.retry_at = time.monotonic() + min(2 ** (entry.failures - 1), self.refresh_interval)
+            self._count('refresh_errors')
+            print(f"Erro ao atualizar consulta quente {key}: {e}")
+            return False
+
+        with self._lock:
+            entry.payload = payload
+            entry.fetched_at = time.monotonic()
+            entry.failures = 0
+            if entry.generation == generation:
+                entry.stale = False
+        self._count('refreshes')
+
+        if entry.derive is not None:
+            try:
+                entry.derive(key, payload)
+            except Exception as e:
+                print(f"Erro ao derivar consultas de {key}: {e}")
+        return True
+
+    def warm_up(self, timeout=FIRESTORE_HOT_WARMUP_TIMEOUT):
+        """Carregar todas as consultas (e as derivadas delas) antes de aceitar tráfego"""
+        deadline = time.monotonic() + timeout
+        attempted = set()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='hot-warmup') as pool:
+            while True:
+                with self._lock:
+                    pending = [key for key, entry in self._entries.items()
+                               if entry.payload is None and key not in attempted]
+                remaining = deadline - time.monotonic()
+                if not pending or remaining <= 0:
+                    break
+                attempted.update(pending)
+                # Uma rodada por nível: as derivadas só existem depois da consulta-mãe
+                wait([pool.submit(self.refresh, key) for key in pending], timeout=remaining)
+
+        loaded = sum(1 for entry in list(self._entries.values()) if entry.payload is not None)
+        return loaded, len(self._entries)
+
+    def start(self):
+        """Iniciar o atualizador em segundo plano (uma vez; de novo após um fork)"""
+        if not self._entries or (self._pid == os.getpid() and self._thread is not None):
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='hot-queries', daemon=True)
+            self._thread.start()
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            result = dict(self._stats)
+            ages = [now - entry.fetched_at for entry in self._entries.values() if entry.payload is not None]
+            result.update({
+                'queries': len(self._entries),
+                'loaded': len(ages),
+                'max_age': round(max(ages), 3) if ages else None,
+                'refresh_interval': self.refresh_interval,
+                'max_staleness': self.max_staleness
+            })
+        return result
+
+    def _due(self):
+        now = time.monotonic()
+        with self._lock:
+            return [key for key, entry in self._entries.items()
+                    if entry.retry_at <= now and (entry.stale or entry.payload is None
+                                                  or now - entry.fetched_at >= self.refresh_interval)]
+
+    def _run(self):
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='hot-refresh') as pool:
+            while True:
+                # Acorda no máximo a cada 1/4 do intervalo, ou antes se houver escrita
+                self._wakeup.wait(max(self.refresh_interval / 4, 0.05))
+                self._wakeup.clear()
+                due = self._due()
+                if due:
+                    wait([pool.submit(self.refresh, key) for key in due])
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+
+# Instância compartilhada por todo o processo
+hot_queries = HotQueries()
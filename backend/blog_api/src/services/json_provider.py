@@ -0,0 +1,72 @@
+import json
+from flask.json.provider import DefaultJSONProvider
+
+# orjson é opcional: sem ele, usamos o json da biblioteca padrão
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+    # Com `default`, datas e dataclasses vão para ele, como no json padrão
+    # (o do Flask grava datas no formato HTTP, não em ISO 8601 como o orjson)
+    ORJSON_DEFAULT_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+
+def dumps_bytes(obj, default=None, sort_keys=False):
+    """Serializar para JSON compacto em bytes (UTF-8)"""
+    if orjson is not None:
+        option = ORJSON_OPTIONS
+        if default is not None:
+            option |= ORJSON_DEFAULT_OPTIONS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=default, option=option)
+        except (TypeError, orjson.JSONEncodeError):
+            # Ex.: inteiros maiores que 64 bits; o json padrão resolve
+            pass
+    return json.dumps(obj, default=default, ensure_ascii=False, separators=(',', ':'),
+                      sort_keys=sort_keys).encode('utf-8')
+
+
+def loads_bytes(data):
+    """Desserializar JSON (bytes ou str)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Provedor JSON do Flask que usa orjson quando disponível
+
+    Mesma saída do DefaultJSONProvider (sort_keys, datas no formato HTTP), exceto
+    que texto não ASCII sai em UTF-8 em vez de escapes \\uXXXX.
+    """
+
+    def dumps(self, obj, **kwargs):
+        # Formatação (indent, separators...) fica com o json padrão
+        if orjson is None or set(kwargs) - {'sort_keys'}:
+            kwargs.setdefault('default', self.default)
+            kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+            kwargs.setdefault('sort_keys', self.sort_keys)
+            return json.dumps(obj, **kwargs)
+        return dumps_bytes(obj, default=self.default,
+                           sort_keys=kwargs.get('sort_keys', self.sort_keys)).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return json.loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            body = json.dumps(obj, default=self.default, ensure_ascii=False, indent=2, sort_keys=self.sort_keys)
+        else:
+            # Caminho rápido: bytes direto do orjson, sem passar por str
+            body = dumps_bytes(obj, default=self.default, sort_keys=self.sort_keys)
+
+        return self._app.response_class(body, mimetype=self.mimetype)
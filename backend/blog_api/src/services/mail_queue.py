@@ -0,0 +1,393 @@
+import os
+import random
+import smtplib
+import sqlite3
+import threading
+import time
+from email.utils import getaddresses, parseaddr
+
+from src.services.metrics import smtp_operation_duration
+
+# Configurações de SMTP a partir das variáveis de ambiente
+SMTP_SERVER = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
+SMTP_PORT = int(os.getenv('SMTP_PORT', '587'))
+SMTP_USERNAME = os.getenv('SMTP_USERNAME', '')
+SMTP_PASSWORD = os.getenv('SMTP_PASSWORD', '')
+SMTP_FROM = os.getenv('SMTP_FROM', SMTP_USERNAME)
+SMTP_STARTTLS = os.getenv('SMTP_STARTTLS', 'true').lower() == 'true'
+SMTP_AUTH = os.getenv('SMTP_AUTH', 'true').lower() == 'true'
+SMTP_TIMEOUT = float(os.getenv('SMTP_TIMEOUT', '30'))
+# Conexões ociosas por mais tempo que isso são fechadas (ou testadas com NOOP)
+SMTP_IDLE_TIMEOUT = float(os.getenv('SMTP_IDLE_TIMEOUT', '60'))
+
+# Configurações da fila
+MAIL_QUEUE_PATH = os.getenv('MAIL_QUEUE_PATH', 'data/mail_queue.db')
+MAIL_WORKERS = int(os.getenv('MAIL_WORKERS', '2'))
+MAIL_MAX_ATTEMPTS = int(os.getenv('MAIL_MAX_ATTEMPTS', '6'))
+MAIL_RETRY_BACKOFF = float(os.getenv('MAIL_RETRY_BACKOFF', '30'))
+MAIL_RETRY_MAX_DELAY = float(os.getenv('MAIL_RETRY_MAX_DELAY', '3600'))
+MAIL_POLL_INTERVAL = float(os.getenv('MAIL_POLL_INTERVAL', '5'))
+# Mensagens em 'sending' há mais tempo que isso voltam para a fila (worker morreu)
+MAIL_LEASE_SECONDS = float(os.getenv('MAIL_LEASE_SECONDS', '600'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mail_queue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sender TEXT NOT NULL,
+    recipients TEXT NOT NULL,
+    subject TEXT,
+    message BLOB NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    claimed_at REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_mail_queue_ready ON mail_queue (status, next_attempt_at);
+"""
+
+
+def mail_configured():
+    """Há configuração suficiente para enviar emails?"""
+    return bool(SMTP_FROM) and (not SMTP_AUTH or bool(SMTP_USERNAME and SMTP_PASSWORD))
+
+
+def is_permanent_failure(error):
+    """Erros 5xx do servidor (exceto autenticação) não melhoram com novas tentativas"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return False
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code >= 500
+    return False
+
+
+def is_connection_error(error):
+    """A conexão SMTP deve ser descartada após este erro?
+
+    Remetente, destinatários ou conteúdo recusados pelo servidor não afetam a
+    conexão (o smtplib envia RSET e ele mesmo fecha a conexão após um 421).
+    """
+    return not isinstance(error, (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused,
+                                  smtplib.SMTPDataError))
+
+
+class SMTPConnection:
+    """Conexão SMTP autenticada reaproveitada entre envios de um mesmo worker"""
+
+    def __init__(self):
+        self.server = None
+        self.last_used = 0.0
+
+    def send(self, sender, recipients, message):
+        # Conexões paradas há muito tempo podem ter sido derrubadas pelo servidor
+        if self.server is not None and time.monotonic() - self.last_used > SMTP_IDLE_TIMEOUT:
+            if not self._alive():
+                self.close()
+
+        try:
+            self._sendmail(sender, recipients, message)
+        except smtplib.SMTPServerDisconnected:
+            # Uma nova tentativa com conexão nova antes de considerar falha
+            self.close()
+            self._sendmail(sender, recipients, message)
+        self.last_used = time.monotonic()
+
+    def close_if_idle(self):
+        if self.server is not None and time.monotonic() - self.last_used > SMTP_IDLE_TIMEOUT:
+            self.close()
+
+    def close(self):
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except Exception:
+            self.server.close()
+        self.server = None
+
+    def _sendmail(self, sender, recipients, message):
+        server = self._connected()
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            server.sendmail(sender, recipients, message)
+            outcome = 'ok'
+        finally:
+            smtp_operation_duration.observe(('send', outcome), time.perf_counter() - started)
+
+    def _connected(self):
+        if self.server is None:
+            # Conexão, STARTTLS e login medidos juntos como "connect"
+            started = time.perf_counter()
+            server = None
+            try:
+                server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=SMTP_TIMEOUT)
+                if SMTP_STARTTLS:
+                    server.starttls()
+                if SMTP_AUTH:
+                    server.login(SMTP_USERNAME, SMTP_PASSWORD)
+            except Exception:
+                smtp_operation_duration.observe(('connect', 'error'), time.perf_counter() - started)
+                if server is not None:
+                    server.close()
+                raise
+            smtp_operation_duration.observe(('connect', 'ok'), time.perf_counter() - started)
+            self.server = server
+            self.last_used = time.monotonic()
+        return self.server
+
+    def _alive(self):
+        try:
+            return self.server.noop()[0] == 250
+        except Exception:
+            return False
+
+
+class MailQueue:
+    """Fila de emails persistida em SQLite, esvaziada por um pool de workers
+
+    Os endpoints só enfileiram; os workers enviam reaproveitando conexões SMTP,
+    com novas tentativas em backoff exponencial. Mensagens que esgotam as
+    tentativas (ou recebem erro permanente) ficam com status 'dead'.
+    """
+
+    def __init__(self, path=MAIL_QUEUE_PATH, workers=MAIL_WORKERS, max_attempts=MAIL_MAX_ATTEMPTS,
+                 retry_backoff=MAIL_RETRY_BACKOFF, retry_max_delay=MAIL_RETRY_MAX_DELAY,
+                 poll_interval=MAIL_POLL_INTERVAL):
+        self.path = path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.retry_max_delay = retry_max_delay
+        self.poll_interval = poll_interval
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._threads = []
+        self._stopping = False
+        self._pid = None
+        self._schema_ready = False
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+
+    def enqueue(self, message, recipients=None, sender=None):
+        """Gravar a mensagem na fila e acordar um worker; retorna o id"""
+        if sender is None:
+            sender = parseaddr(message.get('From', SMTP_FROM))[1] or SMTP_FROM
+        if recipients is None:
+            recipients = [address for _, address in
+                          getaddresses(message.get_all('To', []) + message.get_all('Cc', []))]
+        now = time.time()
+        # Serializada como o smtplib.send_message faria: linhas terminadas em CRLF
+        body = message.as_bytes(policy=message.policy.clone(linesep='\r\n'))
+
+        with self._connection() as connection:
+            cursor = connection.execute(
+                'INSERT INTO mail_queue (sender, recipients, subject, message, next_attempt_at, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (sender, ','.join(recipients), message.get('Subject'), body, now, now)
+            )
+            job_id = cursor.lastrowid
+
+        self.start()
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def start(self):
+        """Iniciar os workers deste processo (uma vez; de novo após um fork)"""
+        if self._pid == os.getpid() and self._threads:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._threads:
+                return
+            self._pid = os.getpid()
+            self._stopping = False
+            self._local = threading.local()
+            self._threads = []
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'mail-worker-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout=5):
+        self._stopping = True
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def claim(self):
+        """Reservar a próxima mensagem pronta para envio (atômico entre processos)"""
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            # Mensagens presas em 'sending' (worker interrompido) voltam para a fila
+            connection.execute(
+                "UPDATE mail_queue SET status = 'pending' WHERE status = 'sending' AND claimed_at < ?",
+                (now - MAIL_LEASE_SECONDS,)
+            )
+            row = connection.execute(
+                "SELECT id, sender, recipients, message, attempts FROM mail_queue "
+                "WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY next_attempt_at LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is not None:
+                connection.execute(
+                    "UPDATE mail_queue SET status = 'sending', claimed_at = ? WHERE id = ?", (now, row[0])
+                )
+        return row
+
+    def mark_sent(self, job_id):
+        with self._connection() as connection:
+            connection.execute('DELETE FROM mail_queue WHERE id = ?', (job_id,))
+        self.sent += 1
+
+    def mark_failed(self, job_id, attempts, error):
+        """Agendar nova tentativa com backoff exponencial, ou mover para 'dead'"""
+        attempts += 1
+        if attempts >= self.max_attempts or is_permanent_failure(error):
+            status, next_attempt_at = 'dead', time.time()
+        else:
+            delay = min(self.retry_max_delay, self.retry_backoff * 2 ** (attempts - 1))
+            status, next_attempt_at = 'pending', time.time() + delay * random.uniform(0.8, 1.2)
+
+        with self._connection() as connection:
+            connection.execute(
+                'UPDATE mail_queue SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?',
+                (status, attempts, next_attempt_at, f'{type(error).__name__}: {error}'[:1000], job_id)
+            )
+        if status == 'dead':
+            self.dead += 1
+        else:
+            self.retried += 1
+
+    def dead_letters(self, limit=100):
+        """Mensagens que não puderam ser entregues, das mais recentes às mais antigas"""
+        with self._connection() as connection:
+            rows = connection.execute(
+                "SELECT id, recipients, subject, attempts, last_error, created_at FROM mail_queue "
+                "WHERE status = 'dead' ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [{
+            'id': row[0],
+            'recipients': row[1].split(','),
+            'subject': row[2],
+            'attempts': row[3],
+            'last_error': row[4],
+            'created_at': row[5]
+        } for row in rows]
+
+    def retry_dead(self, job_id):
+        """Devolver uma mensagem 'dead' para a fila; retorna False se ela não existir"""
+        with self._connection() as connection:
+            cursor = connection.execute(
+                "UPDATE mail_queue SET status = 'pending', attempts = 0, next_attempt_at = ? "
+                "WHERE id = ? AND status = 'dead'", (time.time(), job_id)
+            )
+        if cursor.rowcount:
+            self.start()
+            with self._wakeup:
+                self._wakeup.notify()
+        return cursor.rowcount == 1
+
+    def stats(self):
+        with self._connection() as connection:
+            counts = dict(connection.execute(
+                'SELECT status, COUNT(*) FROM mail_queue GROUP BY status'
+            ).fetchall())
+        return {
+            'pending': counts.get('pending', 0),
+            'sending': counts.get('sending', 0),
+            'dead': counts.get('dead', 0),
+            'sent': self.sent,
+            'retried': self.retried,
+            'dead_lettered': self.dead,
+            'workers': sum(1 for thread in self._threads if thread.is_alive())
+        }
+
+    def _work(self):
+        smtp = SMTPConnection()
+        try:
+            while not self._stopping:
+                try:
+                    job = self.claim()
+                except sqlite3.Error as e:
+                    print(f"Erro ao ler a fila de emails: {e}")
+                    job = None
+
+                if job is None:
+                    smtp.close_if_idle()
+                    with self._wakeup:
+                        self._wakeup.wait(self.poll_interval)
+                    continue
+
+                job_id, sender, recipients, message, attempts = job
+                try:
+                    smtp.send(sender, recipients.split(','), message)
+                except Exception as e:
+                    print(f"Erro ao enviar email {job_id} (tentativa {attempts + 1}): {e}")
+                    if is_connection_error(e):
+                        smtp.close()
+                    self._settle(self.mark_failed, job_id, attempts, e)
+                else:
+                    self._settle(self.mark_sent, job_id)
+        finally:
+            smtp.close()
+
+    def _settle(self, update, job_id, *args):
+        """Gravar o resultado de um envio, tentando de novo enquanto o banco estiver ocupado
+
+        Sem o status gravado a mensagem fica em 'sending' e é enviada de novo quando
+        a reserva vence: o worker insiste (e não morre) em vez de desistir.
+        """
+        while True:
+            try:
+                update(job_id, *args)
+                return
+            except sqlite3.Error as e:
+                print(f"Erro ao gravar o resultado do email {job_id}: {e}")
+                if self._stopping:
+                    return
+                time.sleep(self.poll_interval)
+
+    def _connection(self):
+        """Conexão SQLite da thread atual (autocommit por instrução)"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            if not self._schema_ready:
+                connection.executescript(SCHEMA)
+                self._schema_ready = True
+            self._local.connection = connection
+        return _Transaction(connection)
+
+
+class _Transaction:
+    """Context manager: COMMIT ao sair sem erro, ROLLBACK se houver exceção"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self.connection
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.connection.in_transaction:
+            self.connection.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
+
+
+# Instância compartilhada por todo o processo
+mail_queue = MailQueue()
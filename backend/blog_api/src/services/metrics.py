@@ -0,0 +1,473 @@
+import bisect
+import json
+import os
+import threading
+import time
+
+# Configurações das métricas a partir das variáveis de ambiente
+# Pasta onde cada processo grava suas métricas (vazio: só o processo atual).
+# Com vários workers (gunicorn), o /metrics de qualquer um soma todos.
+METRICS_MULTIPROC_DIR = os.getenv('METRICS_MULTIPROC_DIR', '')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+
+# Limites dos histogramas (segundos e bytes)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Padrão da rota do Flask guardado no environ durante a requisição (o Flask
+# desfaz a ligação environ -> request ao terminar)
+ROUTE_ENVIRON_KEY = 'metrics.route'
+# Arquivo com os contadores já somados dos workers que saíram
+DEAD_SNAPSHOT = 'dead.json'
+
+
+class _Metric:
+    """Métrica com rótulos; valores guardados por tupla de rótulos"""
+
+    type = None
+
+    def __init__(self, registry, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = registry._lock
+        self._values = {}
+
+    def family(self):
+        with self._lock:
+            samples = [[list(labels), self._export(value)] for labels, value in self._values.items()]
+        return {'type': self.type, 'help': self.help, 'labelnames': list(self.labelnames), 'samples': samples}
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    @staticmethod
+    def _export(value):
+        return value
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    """Somado entre os processos vivos (ex.: requisições em andamento)"""
+
+    type = 'gauge'
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, registry, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(registry, name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, labels, value):
+        # Contagem por faixa (não acumulada) + soma; acumulado só na exposição
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def family(self):
+        family = super().family()
+        family['buckets'] = list(self.buckets)
+        return family
+
+    @staticmethod
+    def _export(value):
+        return [list(value[0]), value[1]]
+
+
+class MetricsRegistry:
+    """Métricas do processo no formato de texto do Prometheus
+
+    Registrar é barato (um lock e um dicionário por observação); o trabalho de
+    montar o texto fica para quem consulta o /metrics. Coletores (`collector()`)
+    leem na hora da consulta contadores que os serviços já mantêm (caches).
+    """
+
+    def __init__(self, multiproc_dir=METRICS_MULTIPROC_DIR, flush_interval=METRICS_FLUSH_INTERVAL):
+        self.multiproc_dir = multiproc_dir
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._metrics = []
+        self._collectors = []
+        # Valores dos coletores no reset(): descontados dos contadores exportados
+        self._baselines = {}
+        self._thread = None
+        self._pid = None
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(Counter(self, name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self._add(Gauge(self, name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(self, name, help, labelnames, buckets))
+
+    def collector(self, collect):
+        """Registrar `collect()` -> {nome: família} chamado a cada consulta"""
+        self._collectors.append(collect)
+        return collect
+
+    def snapshot(self):
+        """Métricas deste processo como dados JSON"""
+        families = {metric.name: metric.family() for metric in self._metrics}
+        for collect in self._collectors:
+            try:
+                collected = collect()
+            except Exception as e:
+                print(f"Erro ao coletar métricas: {e}")
+                continue
+            baseline = self._baselines.get(collect)
+            families.update(subtract_counters(collected, baseline) if baseline else collected)
+        return {'pid': os.getpid(), 'time': time.time(), 'metrics': families}
+
+    def gather(self):
+        """Métricas de todos os processos (somadas) ou só deste, sem pasta compartilhada"""
+        snapshots = [self.snapshot()]
+        if self.multiproc_dir and os.path.isdir(self.multiproc_dir):
+            own = f"{os.getpid()}.json"
+            for filename in os.listdir(self.multiproc_dir):
+                if filename == own or not filename.endswith('.json'):
+                    continue
+                try:
+                    with open(os.path.join(self.multiproc_dir, filename), encoding='utf-8') as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    # Arquivo sendo trocado ou removido agora: fica para a próxima consulta
+                    continue
+        return merge_snapshots(snapshots)
+
+    def render(self, families=None):
+        """Texto de exposição do Prometheus (formato 0.0.4)"""
+        families = self.gather() if families is None else families
+        lines = []
+        for name in sorted(families):
+            family = families[name]
+            lines.append(f"# HELP {name} {escape_help(family['help'])}")
+            lines.append(f"# TYPE {name} {family['type']}")
+            labelnames = family['labelnames']
+            for labels, value in sorted(family['samples'], key=lambda sample: sample[0]):
+                pairs = list(zip(labelnames, labels))
+                if family['type'] != 'histogram':
+                    lines.append(f"{name}{format_labels(pairs)} {format_value(value)}")
+                    continue
+                counts, total = value
+                cumulative = 0
+                for bound, count in zip(family['buckets'] + ['+Inf'], counts):
+                    cumulative += count
+                    le = bound if bound == '+Inf' else format_value(bound)
+                    lines.append(f"{name}_bucket{format_labels(pairs + [('le', le)])} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(pairs)} {format_value(total)}")
+                lines.append(f"{name}_count{format_labels(pairs)} {cumulative}")
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        """Zerar os valores (worker recém-criado não deve repetir os do master)
+
+        Os coletores leem contadores que os serviços mantêm e que o fork copia do
+        master: a partir daqui eles exportam só o que mudou desde o reset.
+        """
+        for metric in self._metrics:
+            metric.reset()
+        baselines = {}
+        for collect in self._collectors:
+            try:
+                baselines[collect] = collect()
+            except Exception as e:
+                print(f"Erro ao coletar métricas: {e}")
+        self._baselines = baselines
+
+    def mark_process_dead(self, pid):
+        """Somar os contadores de um processo que saiu ao arquivo dos mortos e remover o dele
+
+        Chamado só pelo master (child_exit do gunicorn), um processo de cada vez.
+        """
+        if not self.multiproc_dir:
+            return
+        path = os.path.join(self.multiproc_dir, f"{pid}.json")
+        dead_path = os.path.join(self.multiproc_dir, DEAD_SNAPSHOT)
+        snapshots = []
+        for filename in (dead_path, path):
+            try:
+                with open(filename, encoding='utf-8') as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        if not snapshots:
+            return
+
+        # Gauges de quem saiu não contam mais; contadores e histogramas continuam somados
+        families = {name: family for name, family in merge_snapshots(snapshots).items()
+                    if family['type'] != 'gauge'}
+        temporary = f"{dead_path}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump({'pid': None, 'time': time.time(), 'metrics': families}, f)
+        os.replace(temporary, dead_path)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def start(self):
+        """Iniciar a gravação periódica deste processo na pasta compartilhada (uma vez; de novo após um fork)"""
+        if not self.multiproc_dir or (self._pid == os.getpid() and self._thread is not None):
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='metrics-flush', daemon=True)
+            self._thread.start()
+
+    def write_snapshot(self):
+        """Gravar as métricas deste processo (troca atômica do arquivo)"""
+        if not self.multiproc_dir:
+            return
+        os.makedirs(self.multiproc_dir, exist_ok=True)
+        path = os.path.join(self.multiproc_dir, f"{os.getpid()}.json")
+        temporary = f"{path}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(temporary, path)
+
+    def _run(self):
+        while True:
+            try:
+                self.write_snapshot()
+            except Exception as e:
+                print(f"Erro ao gravar métricas: {e}")
+            time.sleep(self.flush_interval)
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+
+def merge_snapshots(snapshots):
+    """Somar as métricas de vários processos; gauges só dos processos vivos"""
+    families = {}
+    for snapshot in snapshots:
+        pid = snapshot['pid']
+        alive = pid is not None and (pid == os.getpid() or pid_alive(pid))
+        for name, family in snapshot['metrics'].items():
+            if family['type'] == 'gauge' and not alive:
+                continue
+            merged = families.get(name)
+            if merged is None:
+                merged = families[name] = dict(family, samples={})
+            samples = merged['samples']
+            for labels, value in family['samples']:
+                key = tuple(labels)
+                previous = samples.get(key)
+                if previous is None:
+                    samples[key] = [list(value[0]), value[1]] if family['type'] == 'histogram' else value
+                elif family['type'] == 'histogram':
+                    previous[0] = [a + b for a, b in zip(previous[0], value[0])]
+                    previous[1] += value[1]
+                else:
+                    samples[key] = previous + value
+    for family in families.values():
+        family['samples'] = [[list(labels), value] for labels, value in family['samples'].items()]
+    return families
+
+
+def subtract_counters(families, baseline):
+    """Contadores de `families` menos os de `baseline` (demais tipos ficam como estão)"""
+    result = {}
+    for name, family in families.items():
+        previous = baseline.get(name)
+        if family['type'] != 'counter' or previous is None:
+            result[name] = family
+            continue
+        before = {tuple(labels): value for labels, value in previous['samples']}
+        samples = [[labels, value - before.get(tuple(labels), 0)] for labels, value in family['samples']]
+        result[name] = dict(family, samples=samples)
+    return result
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def escape_help(text):
+    return text.replace('\\', '\\\\').replace('\n', '\\n')
+
+
+def escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label_value(value)}"' for name, value in pairs) + '}'
+
+
+def format_value(value):
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def firestore_operation(method, url):
+    """Operação da API REST do Firestore pela URL ("runQuery", "get", "list", "patch"...)"""
+    rest = url.partition('/documents')[2].partition('?')[0]
+    if rest.startswith(':'):
+        return rest[1:]
+    segments = rest.count('/')
+    if segments % 2 == 1:
+        return 'list' if method == 'GET' else 'create'
+    return {'GET': 'get', 'PATCH': 'patch', 'DELETE': 'delete'}.get(method, method.lower())
+
+
+class WSGIMetricsMiddleware:
+    """Latência e tamanho das respostas por rota e status, e requisições em andamento
+
+    A rota é o padrão do Flask (ex.: /api/firebase/firestore/<collection_name>), não
+    a URL, para o número de séries não crescer com os ids. Respostas em streaming
+    são medidas até o último pedaço enviado.
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        started = time.perf_counter()
+        http_in_flight.inc()
+        captured = []
+
+        def capture(status, headers, exc_info=None):
+            captured[:] = [status, headers]
+            return start_response(status, headers, exc_info)
+
+        try:
+            iterable = self.wsgi_app(environ, capture)
+        except BaseException:
+            http_in_flight.dec()
+            raise
+
+        length = None
+        for name, value in (captured[1] if captured else ()):
+            if name.lower() == 'content-length':
+                length = int(value)
+                break
+        if length is not None:
+            # Corpo já pronto: registrar agora, sem envolver o iterável
+            record_request(environ, captured, started, length)
+            return iterable
+        return _MeasuredBody(iterable, environ, captured, started)
+
+
+class _MeasuredBody:
+    """Iterável de uma resposta sem Content-Length: conta os bytes e registra no close()"""
+
+    def __init__(self, iterable, environ, captured, started):
+        self.iterable = iterable
+        self.environ = environ
+        self.captured = captured
+        self.started = started
+        self.size = 0
+        self.recorded = False
+
+    def __iter__(self):
+        for chunk in self.iterable:
+            self.size += len(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            if hasattr(self.iterable, 'close'):
+                self.iterable.close()
+        finally:
+            if not self.recorded:
+                self.recorded = True
+                record_request(self.environ, self.captured, self.started, self.size)
+
+
+def record_request(environ, captured, started, size):
+    route = environ.get(ROUTE_ENVIRON_KEY) or 'unmatched'
+    status = captured[0].split(' ', 1)[0] if captured else '500'
+    method = environ.get('REQUEST_METHOD', 'GET')
+    http_request_duration.observe((method, route, status), time.perf_counter() - started)
+    http_response_size.observe((method, route), size)
+    http_in_flight.dec()
+
+
+class ASGIMetricsMiddleware:
+    """Mesmas métricas para as rotas async do Starlette (src/asgi.py)
+
+    Requisições entregues ao app Flask (Mount) já são medidas pelo
+    WSGIMetricsMiddleware e não são contadas de novo.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        http_in_flight.inc()
+        state = {'status': '500', 'size': 0}
+
+        async def measured_send(message):
+            if message['type'] == 'http.response.start':
+                state['status'] = str(message['status'])
+            elif message['type'] == 'http.response.body':
+                state['size'] += len(message.get('body', b''))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, measured_send)
+        finally:
+            http_in_flight.dec()
+            route = getattr(scope.get('route'), 'path', None)
+            # Mount (app Flask) tem path vazio
+            if route:
+                http_request_duration.observe((scope['method'], route, state['status']), time.perf_counter() - started)
+                http_response_size.observe((scope['method'], route), state['size'])
+
+
+# Instância compartilhada por todo o processo
+metrics = MetricsRegistry()
+
+http_request_duration = metrics.histogram(
+    'http_request_duration_seconds', 'Duração das requisições HTTP', ('method', 'route', 'status')
+)
+http_response_size = metrics.histogram(
+    'http_response_size_bytes', 'Tamanho do corpo das respostas HTTP', ('method', 'route'), SIZE_BUCKETS
+)
+http_in_flight = metrics.gauge('http_requests_in_flight', 'Requisições HTTP em andamento')
+firestore_request_duration = metrics.histogram(
+    'firestore_request_duration_seconds', 'Duração das chamadas à API REST do Firestore (por tentativa)',
+    ('operation', 'status')
+)
+smtp_operation_duration = metrics.histogram(
+    'smtp_operation_duration_seconds', 'Duração das operações SMTP', ('operation', 'outcome')
+)
@@ -0,0 +1,293 @@
+import hashlib
+import html
+import os
+import re
+import threading
+import time
+from html.parser import HTMLParser
+
+# fcntl só existe em sistemas Unix: sem ele, todo processo faz a geração inicial
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Configurações das páginas pré-renderizadas a partir das variáveis de ambiente
+PRERENDER_DIR = os.getenv('PRERENDER_DIR', 'data/prerender')
+# Intervalo (segundos) da regeneração completa, que recupera escritas feitas fora do proxy (0 desativa)
+PRERENDER_REBUILD_INTERVAL = float(os.getenv('PRERENDER_REBUILD_INTERVAL', '3600'))
+
+# Chaves aceitas em nomes de arquivo (ids de documento, slugs de categoria)
+PAGE_KEY = re.compile(r'^[A-Za-z0-9_-]{1,128}$')
+VOID_ELEMENTS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'
+])
+TITLE_ELEMENT = re.compile(r'(<title\b[^>]*>).*?(</title>)', re.IGNORECASE | re.DOTALL)
+CLASS_ATTRIBUTE = re.compile(r'''\sclass\s*=\s*(["'])[^"']*\1''', re.IGNORECASE)
+
+
+class _ElementFinder(HTMLParser):
+    """Posições do conteúdo (entre as tags de abertura e fechamento) dos elementos com os ids procurados"""
+
+    def __init__(self, source, ids):
+        super().__init__(convert_charrefs=False)
+        self.ids = ids
+        # id -> [(início da tag, início do conteúdo, fim do conteúdo)]
+        self.found = {}
+        self._open = []
+        self._line_offsets = [0]
+        for line in source.splitlines(keepends=True):
+            self._line_offsets.append(self._line_offsets[-1] + len(line))
+
+    def handle_starttag(self, tag, attrs):
+        start = self._offset()
+        for entry in self._open:
+            if entry[0] == tag:
+                entry[4] += 1
+        element_id = dict(attrs).get('id')
+        if element_id in self.ids and tag not in VOID_ELEMENTS:
+            self._open.append([tag, element_id, start, start + len(self.get_starttag_text()), 0])
+
+    def handle_endtag(self, tag):
+        end = self._offset()
+        for entry in list(self._open):
+            if entry[0] != tag:
+                continue
+            if entry[4] == 0:
+                self._open.remove(entry)
+                self.found.setdefault(entry[1], []).append((entry[2], entry[3], end))
+            else:
+                entry[4] -= 1
+
+    def _offset(self):
+        line, column = self.getpos()
+        return self._line_offsets[line - 1] + column
+
+
+def fill_template(source, text=None, markup=None, classes=None, title=None):
+    """Preencher elementos de um HTML pelo id, como o JS da página faria no navegador
+
+    `text`: {id: texto} (escapado), `markup`: {id: HTML}, `classes`: {id: atributo class}.
+    Ids repetidos na página são todos preenchidos; `title` troca o <title> por último.
+    """
+    text = text or {}
+    markup = markup or {}
+    classes = classes or {}
+    contents = {element_id: html.escape(str(value), quote=False) for element_id, value in text.items()}
+    contents.update(markup)
+
+    finder = _ElementFinder(source, set(contents) | set(classes))
+    finder.feed(source)
+    finder.close()
+
+    edits = []
+    for element_id, positions in finder.found.items():
+        for tag_start, content_start, content_end in positions:
+            if element_id in contents:
+                edits.append((content_start, content_end, contents[element_id]))
+            if element_id in classes:
+                start_tag = source[tag_start:content_start]
+                attribute = f' class="{html.escape(classes[element_id])}"'
+                if CLASS_ATTRIBUTE.search(start_tag):
+                    start_tag = CLASS_ATTRIBUTE.sub(lambda match: attribute, start_tag, count=1)
+                else:
+                    start_tag = start_tag[:-1].rstrip('/') + attribute + '>'
+                edits.append((tag_start, content_start, start_tag))
+
+    # Do fim para o começo: as posições anteriores continuam válidas
+    for start, end, replacement in sorted(edits, reverse=True):
+        source = source[:start] + replacement + source[end:]
+
+    if title is not None:
+        source = TITLE_ELEMENT.sub(lambda match: match.group(1) + html.escape(title, quote=False) + match.group(2),
+                                   source, count=1)
+    return source
+
+
+class PrerenderService:
+    """Páginas HTML completas geradas a partir dos dados e guardadas em disco
+
+    Cada tipo de página ("article", "category") tem um renderer(chave) que devolve o
+    HTML ou None (página não existe mais). Regenerações pedidas pelas escritas entram
+    numa fila atendida por uma thread; os arquivos são trocados de forma atômica e
+    lidos por qualquer worker.
+    """
+
+    def __init__(self, directory=PRERENDER_DIR, rebuild_interval=PRERENDER_REBUILD_INTERVAL):
+        self.directory = directory
+        self.rebuild_interval = rebuild_interval
+        self._renderers = {}
+        self._list_pages = None
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._pending = []
+        # (tipo, chave) -> (mtime_ns, corpo, etag)
+        self._pages = {}
+        self._thread = None
+        self._pid = None
+        self.built_at = 0.0
+        self._stats = {
+            'renders': 0,
+            'removals': 0,
+            'render_errors': 0,
+            'rebuilds': 0,
+            'served': 0
+        }
+
+    def init_app(self, renderers, list_pages):
+        """`renderers`: {tipo: renderer(chave)}; `list_pages()`: todos os (tipo, chave) do site"""
+        self._renderers = dict(renderers)
+        self._list_pages = list_pages
+
+    @property
+    def configured(self):
+        return bool(self._renderers)
+
+    def page(self, kind, key):
+        """(corpo, etag) da página pré-renderizada, ou None se ela não existir"""
+        if kind not in self._renderers or not PAGE_KEY.match(key or ''):
+            return None
+        path = self._path(kind, key)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+        cached = self._pages.get((kind, key))
+        if cached is None or cached[0] != mtime:
+            try:
+                with open(path, 'rb') as f:
+                    body = f.read()
+            except OSError:
+                return None
+            cached = (mtime, body, hashlib.sha256(body).hexdigest()[:16])
+            self._pages[(kind, key)] = cached
+        self._count('served')
+        return cached[1], cached[2]
+
+    def render(self, kind, key):
+        """Gerar (ou remover) uma página agora"""
+        if not PAGE_KEY.match(key or ''):
+            return
+        content = self._renderers[kind](key)
+        path = self._path(kind, key)
+        if content is None:
+            try:
+                os.remove(path)
+                self._count('removals')
+            except FileNotFoundError:
+                pass
+            return
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Arquivo temporário + rename: quem lê nunca vê uma página pela metade
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(temporary, path)
+        self._count('renders')
+
+    def schedule(self, kind, key):
+        """Pedir a regeneração de uma página (feita em segundo plano)"""
+        if kind not in self._renderers:
+            return
+        with self._wakeup:
+            if (kind, key) not in self._pending:
+                self._pending.append((kind, key))
+            self._wakeup.notify()
+        self.start()
+
+    def rebuild(self):
+        """Gerar todas as páginas e remover as que não existem mais"""
+        pages = set()
+        for kind, key in self._list_pages():
+            pages.add((kind, key))
+            self._render_safely(kind, key)
+
+        for kind in self._renderers:
+            directory = os.path.join(self.directory, kind)
+            if not os.path.isdir(directory):
+                continue
+            for filename in os.listdir(directory):
+                key, ext = os.path.splitext(filename)
+                if ext == '.html' and (kind, key) not in pages:
+                    os.remove(os.path.join(directory, filename))
+                    self._count('removals')
+
+        self.built_at = time.time()
+        self._count('rebuilds')
+
+    def start(self):
+        """Iniciar a thread de geração (uma vez; de novo após um fork)"""
+        if not self._renderers or (self._pid == os.getpid() and self._thread is not None):
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='prerender', daemon=True)
+            self._thread.start()
+
+    def stats(self):
+        with self._lock:
+            result = dict(self._stats)
+            result['pending'] = len(self._pending)
+        pages = {}
+        for kind in self._renderers:
+            directory = os.path.join(self.directory, kind)
+            pages[kind] = len(os.listdir(directory)) if os.path.isdir(directory) else 0
+        result.update({
+            'pages': pages,
+            'built_at': self.built_at or None,
+            'rebuild_interval': self.rebuild_interval
+        })
+        return result
+
+    def _run(self):
+        self._rebuild_once()
+        while True:
+            with self._wakeup:
+                if not self._pending:
+                    self._wakeup.wait(self.rebuild_interval if self.rebuild_interval > 0 else None)
+                pending, self._pending = self._pending, []
+
+            for kind, key in pending:
+                self._render_safely(kind, key)
+            if self.rebuild_interval > 0 and time.time() - self.built_at >= self.rebuild_interval:
+                self._rebuild_once()
+
+    def _rebuild_once(self):
+        """Regeneração completa, feita por um só processo quando há vários workers"""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, '.rebuild.lock'), 'w') as lock_file:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    # Outro worker está gerando; o próximo ciclo fica para depois do intervalo
+                    self.built_at = time.time()
+                    return
+            try:
+                self.rebuild()
+            except Exception as e:
+                self.built_at = time.time()
+                print(f"Erro ao gerar as páginas pré-renderizadas: {e}")
+
+    def _render_safely(self, kind, key):
+        try:
+            self.render(kind, key)
+        except Exception as e:
+            self._count('render_errors')
+            print(f"Erro ao pré-renderizar {kind}/{key}: {e}")
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _path(self, kind, key):
+        return os.path.join(self.directory, kind, f"{key}.html")
+
+
+# Instância compartilhada por todo o processo
+prerender_service = PrerenderService()
@@ -0,0 +1,317 @@
+import html
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+# Peso de cada campo na pontuação (um termo no título vale mais que no conteúdo)
+FIELD_WEIGHTS = {
+    'title': 3,
+    'category': 2,
+    'content': 1
+}
+
+# Parâmetros do BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+SNIPPET_MAX_CHARS = 240
+
+STOPWORDS = frozenset("""
+a o e as os um uma uns umas de do da dos das em no na nos nas por pelo pela pelos pelas
+para pra com sem sob sobre entre ate que se ao aos ou mas como mais menos muito muita
+muitos muitas ja nao sim seu sua seus suas meu minha ele ela eles elas isso isto esse
+essa esses essas este esta estes estas aquele aquela ser ter foi sao era estao esta
+tem ha quando onde qual quais quem porque pois tambem so ainda apenas todo toda todos todas
+""".split())
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+SENTENCE_PATTERN = re.compile(r'[^.!?\n]+[.!?]*')
+
+# Sufixos removidos pelo stemmer leve (ordem importa: do mais longo para o mais curto)
+PLURAL_SUFFIXES = (('oes', 'ao'), ('aes', 'ao'), ('ais', 'al'), ('eis', 'el'), ('ois', 'ol'),
+                   ('ns', 'm'), ('res', 'r'), ('s', ''))
+DIMINUTIVE_SUFFIXES = ('zinho', 'zinha', 'inho', 'inha')
+
+
+def fold(text):
+    """Minúsculas e sem acentos ("Inteligência" -> "inteligencia")"""
+    normalized = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(ch for ch in normalized if not unicodedata.combining(ch))
+
+
+def stem(token):
+    """Stemmer leve para português: plural, advérbios, diminutivos e gênero"""
+    if len(token) <= 3 or token.isdigit():
+        return token
+
+    for suffix, replacement in PLURAL_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            token = token[:-len(suffix)] + replacement
+            break
+
+    if token.endswith('mente') and len(token) > 7:
+        token = token[:-5]
+
+    for suffix in DIMINUTIVE_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            token = token[:-len(suffix)]
+            break
+
+    if token[-1] in 'aoe' and len(token) > 4:
+        token = token[:-1]
+
+    return token
+
+
+def analyze(text):
+    """Texto -> lista de termos (sem acento, sem stopwords, com stemming)"""
+    return [stem(token) for token in TOKEN_PATTERN.findall(fold(text)) if token not in STOPWORDS]
+
+
+def _token_spans(text):
+    """Posições (início, fim, termo) das palavras do texto original
+
+    A remoção de acentos pode mudar o tamanho do texto, então as palavras são
+    localizadas no original e só depois normalizadas.
+    """
+    spans = []
+    for match in re.finditer(r'\w+', text):
+        folded = fold(match.group())
+        if folded in STOPWORDS or not TOKEN_PATTERN.fullmatch(folded):
+            continue
+        spans.append((match.start(), match.end(), stem(folded)))
+    return spans
+
+
+def _highlight(text, spans, terms):
+    """Escapar o texto e marcar com <mark> as palavras cujo termo foi buscado"""
+    parts = []
+    position = 0
+    for start, end, term in spans:
+        if term not in terms:
+            continue
+        parts.append(html.escape(text[position:start]))
+        parts.append('<mark>' + html.escape(text[start:end]) + '</mark>')
+        position = end
+    parts.append(html.escape(text[position:]))
+    return ''.join(parts)
+
+
+class SearchIndex:
+    """Índice invertido em memória com ranking BM25 e trechos destacados"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._documents = {}
+        # termo -> {doc_id: frequência ponderada}
+        self._postings = {}
+        self._total_length = 0
+        self.built_at = None
+        # Escritas recebidas durante uma reconstrução: (método, argumentos)
+        self._journal = None
+
+    @property
+    def built(self):
+        return self.built_at is not None
+
+    @property
+    def rebuilding(self):
+        return self._journal is not None
+
+    def rebuild(self, documents):
+        """Reconstruir o índice a partir de pares (doc_id, dados)
+
+        As escritas feitas enquanto os documentos são lidos são registradas e
+        reaplicadas no índice novo antes da troca; sem isso a troca as desfaria.
+        """
+        with self._lock:
+            self._journal = []
+        try:
+            fresh = SearchIndex()
+            for doc_id, data in documents:
+                fresh._add(doc_id, data)
+
+            with self._lock:
+                for method, args in self._journal:
+                    getattr(fresh, method)(*args)
+                self._documents = fresh._documents
+                self._postings = fresh._postings
+                self._total_length = fresh._total_length
+                self.built_at = time.time()
+        finally:
+            with self._lock:
+                self._journal = None
+
+    def upsert(self, doc_id, data):
+        """Indexar (ou reindexar) um documento completo"""
+        with self._lock:
+            self._record('upsert', doc_id, data)
+            self._remove(doc_id)
+            self._add(doc_id, data)
+
+    def update(self, doc_id, partial):
+        """Aplicar atualização parcial, mesclando com os dados já indexados"""
+        with self._lock:
+            self._record('update', doc_id, partial)
+            current = self._documents.get(doc_id)
+            data = dict(current['data']) if current else {}
+            data.update(partial)
+            self._remove(doc_id)
+            self._add(doc_id, data)
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._record('remove', doc_id)
+            self._remove(doc_id)
+
+    def _record(self, method, *args):
+        if self._journal is not None:
+            self._journal.append((method, args))
+
+    def search(self, query, category=None, limit=20, offset=0):
+        """Buscar documentos; retorna (total, resultados ordenados por relevância)"""
+        terms = list(dict.fromkeys(analyze(query)))
+        if not terms:
+            return 0, []
+
+        category = fold(category) if category else None
+
+        with self._lock:
+            total_docs = len(self._documents)
+            if not total_docs:
+                return 0, []
+            average_length = self._total_length / total_docs
+
+            scores = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    length = self._documents[doc_id]['length']
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+
+            if category:
+                scores = {
+                    doc_id: score for doc_id, score in scores.items()
+                    if self._documents[doc_id]['category'] == category
+                }
+
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            page = ranked[offset:offset + limit]
+            term_set = set(terms)
+            results = [self._result(doc_id, score, term_set) for doc_id, score in page]
+
+        return len(ranked), results
+
+    def stats(self):
+        with self._lock:
+            return {
+                'documents': len(self._documents),
+                'terms': len(self._postings),
+                'built_at': self.built_at
+            }
+
+    def _add(self, doc_id, data):
+        frequencies = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            value = data.get(field)
+            if isinstance(value, str):
+                for term in analyze(value):
+                    frequencies[term] += weight
+
+        title = data.get('title') if isinstance(data.get('title'), str) else ''
+        content = data.get('content') if isinstance(data.get('content'), str) else ''
+        category = data.get('category') if isinstance(data.get('category'), str) else ''
+
+        # Frases do conteúdo já tokenizadas, para montar trechos sem reprocessar o texto
+        sentences = []
+        for match in SENTENCE_PATTERN.finditer(content):
+            sentence = match.group().strip()
+            if sentence:
+                sentences.append((sentence, _token_spans(sentence)))
+
+        self._documents[doc_id] = {
+            'data': data,
+            'category': fold(category),
+            'length': sum(frequencies.values()),
+            'title_spans': _token_spans(title),
+            'sentences': sentences,
+            'terms': frequencies
+        }
+        for term, frequency in frequencies.items():
+            self._postings.setdefault(term, {})[doc_id] = frequency
+        self._total_length += sum(frequencies.values())
+
+    def _remove(self, doc_id):
+        document = self._documents.pop(doc_id, None)
+        if document is None:
+            return
+        for term in document['terms']:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= document['length']
+
+    def _result(self, doc_id, score, terms):
+        document = self._documents[doc_id]
+        data = document['data']
+        title = data.get('title') if isinstance(data.get('title'), str) else ''
+
+        return {
+            'id': doc_id,
+            'score': round(score, 4),
+            'title': title,
+            'highlightedTitle': _highlight(title, document['title_spans'], terms),
+            'snippet': self._snippet(document, terms),
+            'data': {key: value for key, value in data.items() if key != 'content'}
+        }
+
+    def _snippet(self, document, terms):
+        """Trecho com a frase (e vizinhas) que mais contém os termos buscados"""
+        sentences = document['sentences']
+        if not sentences:
+            return ''
+
+        best = max(
+            range(len(sentences)),
+            key=lambda i: (len({term for _, _, term in sentences[i][1] if term in terms}), -i)
+        )
+
+        sentence, spans = sentences[best]
+        if len(sentence) > SNIPPET_MAX_CHARS:
+            # Frase longa: recortar uma janela em volta do primeiro termo encontrado
+            first = next((start for start, _, term in spans if term in terms), 0)
+            start = max(0, first - SNIPPET_MAX_CHARS // 3)
+            end = start + SNIPPET_MAX_CHARS
+            window = [(s - start, e - start, term) for s, e, term in spans if s >= start and e <= end]
+            snippet = _highlight(sentence[start:end], window, terms)
+            prefix = '...' if best > 0 or start > 0 else ''
+            suffix = '...' if end < len(sentence) or best + 1 < len(sentences) else ''
+            return prefix + snippet + suffix
+
+        parts = []
+        length = 0
+        for sentence, spans in sentences[best:]:
+            if parts and length + len(sentence) > SNIPPET_MAX_CHARS:
+                break
+            parts.append(_highlight(sentence, spans, terms))
+            length += len(sentence)
+
+        snippet = ' '.join(parts)
+        if best > 0:
+            snippet = '...' + snippet
+        if best + len(parts) < len(sentences):
+            snippet += '...'
+        return snippet
+
+
+# Índice de artigos compartilhado pelo processo
+search_index = SearchIndex()
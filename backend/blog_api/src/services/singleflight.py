@@ -0,0 +1,136 @@
+import asyncio
+import threading
+
+
+class _FlightStats:
+    """Contadores comuns às duas variantes"""
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self.calls = 0
+        self.executions = 0
+        self.collapsed = 0
+        self.forgotten = 0
+
+    def _record(self, leader):
+        with self._stats_lock:
+            self.calls += 1
+            if leader:
+                self.executions += 1
+            else:
+                self.collapsed += 1
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'calls': self.calls,
+                'executions': self.executions,
+                'collapsed': self.collapsed,
+                'forgotten': self.forgotten,
+                'in_flight': len(self._calls),
+                'collapse_ratio': round(self.collapsed / self.calls, 4) if self.calls else 0.0
+            }
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(_FlightStats):
+    """Chamadas simultâneas com a mesma chave compartilham uma única execução (threads)
+
+    A primeira thread executa a função; as que chegam enquanto ela está em
+    andamento esperam e recebem o mesmo resultado (ou a mesma exceção).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        self._record(leader)
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            self._finish(key, call)
+            call.event.set()
+
+    def forget(self, match):
+        """Chamadas em andamento cujas chaves satisfazem `match` deixam de ser
+        compartilhadas: quem chegar depois (ex.: após uma escrita) faz uma nova"""
+        with self._lock:
+            keys = [key for key in self._calls if match(key)]
+            for key in keys:
+                del self._calls[key]
+        with self._stats_lock:
+            self.forgotten += len(keys)
+
+    def _finish(self, key, call):
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+
+
+class AsyncSingleFlight(_FlightStats):
+    """Mesma ideia para asyncio: a chamada roda numa task compartilhada
+
+    Cancelar uma das requisições que esperam (cliente desconectou) não cancela
+    a chamada para as demais.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._calls = {}
+
+    async def do(self, key, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        task = self._calls.get(key)
+        leader = task is None or task.get_loop() is not loop
+        if leader:
+            task = loop.create_task(func(*args, **kwargs))
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        self._record(leader)
+
+        return await asyncio.shield(task)
+
+    def forget(self, match):
+        keys = [key for key in list(self._calls) if match(key)]
+        for key in keys:
+            self._calls.pop(key, None)
+        with self._stats_lock:
+            self.forgotten += len(keys)
+
+    def _finish(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Marca a exceção como lida mesmo se todos os interessados foram cancelados
+        if not task.cancelled():
+            task.exception()
+
+
+# Instâncias compartilhadas pelas leituras do proxy (Flask e ASGI)
+read_flights = SingleFlight()
+async_read_flights = AsyncSingleFlight()
@@ -0,0 +1,304 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+
+from flask import request, current_app
+from src.services.compression import brotli, is_compressible, negotiate_encoding, COMPRESSION_MIN_SIZE
+
+# Saída do build_static.py, servida da memória pelo serve() do main.py
+STATIC_DIST_DIR = os.getenv('STATIC_DIST_DIR', 'dist/static')
+
+MANIFEST_NAME = 'manifest.json'
+ENCODING_SUFFIXES = {'gzip': '.gz', 'br': '.br'}
+# Arquivos com hash no nome nunca mudam: o navegador pode guardá-los para sempre
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# HTML e nomes originais: revalidar sempre (304 pelo ETag)
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+# Extensões copiadas das pastas de origem
+ASSET_EXTENSIONS = frozenset([
+    '.html', '.js', '.mjs', '.css', '.json', '.map', '.txt', '.xml',
+    '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico', '.webp', '.avif',
+    '.woff', '.woff2', '.ttf'
+])
+# Pastas de origem que não fazem parte do site
+SKIPPED_DIRECTORIES = frozenset(['backend', 'node_modules', 'dist', '__pycache__'])
+
+# Referências reescritas para o nome com hash: atributos src/href no HTML,
+# import/export ... from no JS e url(...) no CSS
+HTML_REFERENCE = re.compile(r'''(\b(?:src|href)\s*=\s*)(["'])([^"']+)\2''', re.IGNORECASE)
+JS_REFERENCE = re.compile(r'''(\b(?:from|import)\s*\(?\s*)(["'])(\.{1,2}/[^"']+)\2''')
+CSS_REFERENCE = re.compile(r'''(url\(\s*)(["']?)([^"')]+)\2(\s*\))''')
+
+
+def content_hash(body):
+    return hashlib.sha256(body).hexdigest()[:10]
+
+
+def hashed_name(path, digest):
+    """"js/app.js" -> "js/app.3f2a9c1b0d.js\""""
+    root, ext = posixpath.splitext(path)
+    return f"{root}.{digest}{ext}"
+
+
+def collect_sources(directories):
+    """{caminho relativo: arquivo} das pastas de origem; a última pasta vence em conflitos"""
+    files = {}
+    for directory in directories:
+        for root, dirnames, filenames in os.walk(directory):
+            dirnames[:] = sorted(
+                name for name in dirnames
+                if not name.startswith('.') and name not in SKIPPED_DIRECTORIES
+            )
+            for filename in sorted(filenames):
+                if os.path.splitext(filename)[1].lower() not in ASSET_EXTENSIONS:
+                    continue
+                full_path = os.path.join(root, filename)
+                relative = os.path.relpath(full_path, directory).replace(os.sep, '/')
+                files[relative] = full_path
+    return files
+
+
+def build_assets(directories, brotli_quality=11, gzip_level=9):
+    """Gerar os arquivos do site: nomes com hash, referências reescritas e variantes comprimidas
+
+    Retorna {caminho: {'body', 'hash', 'hashed', 'variants'}}. HTML mantém o nome
+    (é a entrada do site); os demais ganham uma cópia com o hash do conteúdo no nome.
+    """
+    sources = collect_sources(directories)
+    contents = {}
+    for path, full_path in sources.items():
+        with open(full_path, 'rb') as f:
+            contents[path] = f.read()
+
+    assets = {}
+
+    def process(path, visiting):
+        if path in assets:
+            return assets[path]
+        visiting.add(path)
+        body = rewrite_references(path, contents[path], contents, lambda target: (
+            None if target in visiting else process(target, visiting)['hashed']
+        ))
+        visiting.discard(path)
+
+        digest = content_hash(body)
+        asset = {
+            'body': body,
+            'hash': digest,
+            'hashed': path if path.endswith('.html') else hashed_name(path, digest),
+            'variants': compress_variants(path, body, brotli_quality, gzip_level)
+        }
+        assets[path] = asset
+        return asset
+
+    for path in sorted(contents):
+        process(path, set())
+    return assets
+
+
+def rewrite_references(path, body, contents, resolve):
+    """Trocar referências a outros arquivos do site pelo nome com hash
+
+    `resolve(caminho)` devolve o nome com hash (ou None em dependência circular).
+    """
+    ext = posixpath.splitext(path)[1].lower()
+    if ext == '.html':
+        pattern = HTML_REFERENCE
+    elif ext in ('.js', '.mjs'):
+        pattern = JS_REFERENCE
+    elif ext == '.css':
+        pattern = CSS_REFERENCE
+    else:
+        return body
+
+    base = posixpath.dirname(path)
+
+    def replace(match):
+        reference = match.group(3)
+        target, suffix = split_reference(reference)
+        if target is None:
+            return match.group(0)
+        absolute = target.startswith('/')
+        resolved = posixpath.normpath(target.lstrip('/') if absolute else posixpath.join(base, target))
+        if resolved not in contents or resolved.endswith('.html'):
+            return match.group(0)
+        hashed = resolve(resolved)
+        if hashed is None:
+            return match.group(0)
+        new_target = posixpath.join(posixpath.dirname(target), posixpath.basename(hashed))
+        return match.group(0).replace(reference, new_target + suffix, 1)
+
+    text = body.decode('utf-8')
+    return pattern.sub(replace, text).encode('utf-8')
+
+
+def split_reference(reference):
+    """("img/a.png?v=1" -> ("img/a.png", "?v=1")); (None, None) para URLs externas"""
+    if re.match(r'^(?:[a-z][a-z0-9+.-]*:|//|#)', reference, re.IGNORECASE) or '${' in reference:
+        return None, None
+    index = min([i for i in (reference.find('?'), reference.find('#')) if i >= 0], default=len(reference))
+    return reference[:index], reference[index:]
+
+
+def compress_variants(path, body, brotli_quality=11, gzip_level=9):
+    """Variantes .br/.gz de um arquivo compressível, só quando ficam menores"""
+    mimetype = guess_mimetype(path)
+    if not is_compressible(mimetype) or len(body) < COMPRESSION_MIN_SIZE:
+        return {}
+
+    variants = {}
+    compressed = gzip.compress(body, compresslevel=gzip_level, mtime=0)
+    if len(compressed) < len(body):
+        variants['gzip'] = compressed
+    if brotli is not None:
+        compressed = brotli.compress(body, quality=brotli_quality)
+        if len(compressed) < len(body):
+            variants['br'] = compressed
+    return variants
+
+
+def guess_mimetype(path):
+    mimetype, _ = mimetypes.guess_type(path)
+    if mimetype is None and path.endswith('.mjs'):
+        mimetype = 'text/javascript'
+    return mimetype or 'application/octet-stream'
+
+
+def write_assets(assets, output):
+    """Gravar o build: nome original, nome com hash, irmãos .gz/.br e o manifest.json"""
+    manifest = {'files': {}, 'fallback': 'index.html' if 'index.html' in assets else None}
+    for path, asset in sorted(assets.items()):
+        names = {path, asset['hashed']}
+        for name in names:
+            target = os.path.join(output, *name.split('/'))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(asset['body'])
+            for encoding, variant in asset['variants'].items():
+                with open(target + ENCODING_SUFFIXES[encoding], 'wb') as f:
+                    f.write(variant)
+        manifest['files'][path] = {
+            'hash': asset['hash'],
+            'hashed': asset['hashed'],
+            'encodings': sorted(asset['variants'])
+        }
+
+    with open(os.path.join(output, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return manifest
+
+
+class StaticAsset:
+    """Arquivo do site em memória, com as variantes comprimidas prontas"""
+
+    __slots__ = ('body', 'etag', 'mimetype', 'variants', 'cache_control')
+
+    def __init__(self, body, etag, mimetype, variants, cache_control):
+        self.body = body
+        self.etag = etag
+        self.mimetype = mimetype
+        self.variants = variants
+        self.cache_control = cache_control
+
+
+class StaticAssets:
+    """Índice em memória dos arquivos do site (caminho -> StaticAsset)
+
+    Carregado uma vez na inicialização: servir não consulta o disco, e o
+    arquivo de fallback da SPA (index.html) já fica resolvido.
+    """
+
+    def __init__(self):
+        self._assets = {}
+        self.fallback = None
+        self.source = None
+
+    def load(self, directory):
+        """Carregar o build (manifest.json) de `directory`; retorna False se não houver build"""
+        manifest_path = os.path.join(directory, MANIFEST_NAME)
+        if not os.path.isfile(manifest_path):
+            return False
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+
+        assets = {}
+        for path, entry in manifest.get('files', {}).items():
+            target = os.path.join(directory, *path.split('/'))
+            with open(target, 'rb') as f:
+                body = f.read()
+            variants = {}
+            for encoding in entry.get('encodings', []):
+                with open(target + ENCODING_SUFFIXES[encoding], 'rb') as f:
+                    variants[encoding] = f.read()
+            self._register(assets, path, entry['hashed'], body, entry['hash'], variants)
+
+        self._assets = assets
+        self.fallback = assets.get(manifest.get('fallback') or '')
+        self.source = directory
+        return True
+
+    def load_sources(self, directories):
+        """Sem build: gerar em memória a partir das pastas de origem (compressão mais leve)"""
+        assets = {}
+        for path, asset in build_assets(directories, brotli_quality=5, gzip_level=6).items():
+            self._register(assets, path, asset['hashed'], asset['body'], asset['hash'], asset['variants'])
+        self._assets = assets
+        self.fallback = assets.get('index.html')
+        self.source = ','.join(directories)
+
+    def get(self, path):
+        """Arquivo de `path` exatamente (sem o fallback da SPA), ou None"""
+        return self._assets.get(path)
+
+    def lookup(self, path):
+        """Arquivo de `path` ("" = index.html); caminhos desconhecidos caem no fallback da SPA"""
+        asset = self._assets.get(path or 'index.html')
+        return asset if asset is not None else self.fallback
+
+    def stats(self):
+        # O nome original e o nome com hash compartilham o mesmo conteúdo
+        unique = {id(asset.body): asset for asset in self._assets.values()}.values()
+        return {
+            'source': self.source,
+            'paths': len(self._assets),
+            'files': len(unique),
+            'bytes': sum(len(asset.body) + sum(map(len, asset.variants.values())) for asset in unique),
+            'fallback': self.fallback is not None
+        }
+
+    @staticmethod
+    def _register(assets, path, hashed, body, digest, variants):
+        mimetype = guess_mimetype(path)
+        assets[path] = StaticAsset(body, digest, mimetype, variants, REVALIDATE_CACHE_CONTROL)
+        if hashed != path:
+            assets[hashed] = StaticAsset(body, digest, mimetype, variants, IMMUTABLE_CACHE_CONTROL)
+
+
+def asset_response(asset):
+    """Resposta Flask de um StaticAsset: variante pré-comprimida negociada, ETag e 304"""
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'), available=asset.variants)
+    etag = f"{asset.etag}-{encoding}" if encoding else asset.etag
+
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': asset.cache_control}
+    if asset.variants:
+        headers['Vary'] = 'Accept-Encoding'
+
+    if request.if_none_match and any(request.if_none_match.contains_weak(candidate)
+                                      for candidate in [asset.etag] + [f"{asset.etag}-{e}" for e in asset.variants]):
+        response = current_app.response_class(status=304)
+    else:
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        response = current_app.response_class(asset.variants[encoding] if encoding else asset.body,
+                                              mimetype=asset.mimetype)
+    response.headers.update(headers)
+    return response
+
+
+# Instância compartilhada por todo o processo
+static_assets = StaticAssets()
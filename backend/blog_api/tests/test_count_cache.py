@@ -0,0 +1,75 @@
+"""Cache de contagens: ajustes pelas escritas do proxy e a guarda de geração
+
+Uso (a partir de backend/blog_api):
+    python -m pytest tests
+"""
+import pytest
+
+from src.services.count_cache import CountCache, value_key
+
+
+@pytest.fixture
+def counts():
+    return CountCache(ttl=60, max_entries=100)
+
+
+def test_create_and_delete_adjust_matching_counts(counts):
+    counts.set('likes', 'articleId', 'a1', 3)
+    counts.set('likes', 'articleId', 'a2', 5)
+
+    counts.record_created('likes', {'articleId': 'a1', 'userId': 'u1'})
+    assert counts.get('likes', 'articleId', 'a1') == 4
+    assert counts.get('likes', 'articleId', 'a2') == 5
+
+    counts.record_deleted('likes', {'articleId': 'a2'})
+    assert counts.get('likes', 'articleId', 'a2') == 4
+    assert counts.stats()['adjustments'] == 2
+
+
+def test_delete_never_goes_below_zero(counts):
+    counts.set('likes', 'articleId', 'a1', 0)
+    counts.record_deleted('likes', {'articleId': 'a1'})
+    assert counts.get('likes', 'articleId', 'a1') == 0
+
+
+def test_delete_without_data_drops_collection_counts(counts):
+    counts.set('likes', 'articleId', 'a1', 3)
+    counts.set('comments', 'articleId', 'a1', 2)
+
+    counts.record_deleted('likes')
+    assert counts.get('likes', 'articleId', 'a1') is None
+    assert counts.get('comments', 'articleId', 'a1') == 2
+
+
+def test_modified_drops_counts_of_changed_fields(counts):
+    counts.set('articles', 'category', 'ia', 4)
+    counts.set('articles', 'published', True, 7)
+
+    counts.record_modified('articles', {'category': 'dados'})
+    assert counts.get('articles', 'category', 'ia') is None
+    assert counts.get('articles', 'published', True) == 7
+
+
+def test_count_fetched_before_a_write_is_not_cached(counts):
+    generation = counts.generation('likes')
+    # O documento criado durante a contagem pode ou não estar no total do Firestore
+    counts.record_created('likes', {'articleId': 'a1'})
+    counts.set('likes', 'articleId', 'a1', 3, generation=generation)
+    assert counts.get('likes', 'articleId', 'a1') is None
+
+    counts.set('likes', 'articleId', 'a1', 4, generation=counts.generation('likes'))
+    assert counts.get('likes', 'articleId', 'a1') == 4
+
+
+def test_values_are_compared_by_firestore_type(counts):
+    assert value_key(True) != value_key(1)
+    assert value_key(1) == value_key(1.0)
+    assert value_key('1') != value_key(1)
+
+    counts.set('articles', 'featured', True, 2)
+    counts.set('articles', 'featured', 1, 10)
+    counts.record_created('articles', {'featured': True})
+
+    assert counts.get('articles', 'featured', True) == 3
+    assert counts.get('articles', 'featured', 1) == 10
+    assert counts.get('articles', 'featured', 1.0) == 10
@@ -0,0 +1,128 @@
+"""Contadores com escrita adiada: base do Firestore + incrementos pendentes
+
+Uso (a partir de backend/blog_api):
+    python -m pytest tests
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.services.counters import CounterService
+
+
+class FakeFirestore:
+    """Valores dos contadores por documento; commit aplica incrementos como o Firestore"""
+
+    def __init__(self):
+        self.values = {}
+        self.reads = 0
+        self.commits = []
+        # Se definido, o commit espera por ele antes de responder
+        self.hold = None
+        self.fail = False
+
+    def read(self, collection_name, doc_id, fields, shards):
+        self.reads += 1
+        stored = self.values.get(f"{collection_name}/{doc_id}", {})
+        return {field: stored.get(field, 0) for field in fields}
+
+    def commit(self, writes):
+        if self.hold is not None:
+            self.hold.wait(5)
+        if self.fail:
+            raise RuntimeError('Firestore indisponível')
+        self.commits.append(writes)
+        results = []
+        for path, increments in writes:
+            stored = self.values.setdefault(path, {})
+            for field, delta in increments:
+                stored[field] = stored.get(field, 0) + delta
+            results.append([stored[field] for field, _ in increments])
+        return results
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+@pytest.fixture
+def firestore():
+    return FakeFirestore()
+
+
+@pytest.fixture
+def counters(tmp_path, firestore):
+    service = CounterService(path=str(tmp_path / 'counters.db'), fields='articles.views,articles.likes',
+                             shards='', flush_interval=3600, base_ttl=60)
+    # Sem init_app: o flusher em segundo plano não é iniciado; flush() é chamado no teste
+    service._read = firestore.read
+    service._commit = firestore.commit
+    return service
+
+
+def test_reads_base_plus_pending(counters, firestore):
+    firestore.values['articles/a1'] = {'views': 10}
+
+    assert counters.increment('articles', 'a1', 'views') == 11
+    assert counters.increment('articles', 'a1', 'views', 2) == 13
+    # A base é lida do Firestore uma vez e reaproveitada até vencer
+    assert firestore.reads == 1
+    assert counters.get('articles', 'a1') == {'views': 13, 'likes': 0}
+
+
+def test_flush_moves_pending_into_base(counters, firestore):
+    firestore.values['articles/a1'] = {'views': 10}
+    for _ in range(5):
+        counters.increment('articles', 'a1', 'views')
+
+    assert counters.flush() == 1
+    # Cinco incrementos viraram uma escrita com delta 5
+    assert firestore.commits == [[('articles/a1', [('views', 5)])]]
+    assert firestore.values['articles/a1']['views'] == 15
+    assert counters.get('articles', 'a1', ['views']) == {'views': 15}
+    stats = counters.stats()
+    assert stats['pending'] == 0 and stats['flushing'] == 0
+    assert counters.flush() == 0
+
+
+def test_value_is_not_counted_twice_while_flushing(counters, firestore):
+    firestore.values['articles/a1'] = {'views': 10}
+    counters.increment('articles', 'a1', 'views', 3)
+    firestore.hold = threading.Event()
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        flushing = pool.submit(counters.flush)
+        assert wait_for(lambda: counters.stats()['flushing'] == 1)
+        # Durante o commit o delta está em counter_flushing, não em counter_pending
+        assert counters.get('articles', 'a1', ['views']) == {'views': 13}
+        assert counters.increment('articles', 'a1', 'views') == 14
+        firestore.hold.set()
+        assert flushing.result(5) == 1
+
+    # Depois do commit a base já inclui o delta enviado; o pendente continua somado
+    assert counters.get('articles', 'a1', ['views']) == {'views': 14}
+    assert counters.flush() == 1
+    assert firestore.values['articles/a1']['views'] == 14
+
+
+def test_failed_flush_returns_increments_to_pending(counters, firestore):
+    firestore.values['articles/a1'] = {'likes': 1}
+    counters.increment('articles', 'a1', 'likes', 2)
+    firestore.fail = True
+
+    with pytest.raises(RuntimeError):
+        counters.flush()
+    assert counters.stats()['pending'] == 1
+    assert counters.get('articles', 'a1', ['likes']) == {'likes': 3}
+
+    firestore.fail = False
+    assert counters.flush() == 1
+    assert firestore.values['articles/a1']['likes'] == 3
+    assert counters.get('articles', 'a1', ['likes']) == {'likes': 3}
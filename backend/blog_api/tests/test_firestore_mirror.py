@@ -0,0 +1,125 @@
+"""Espelho local: filtros e ordenação traduzidos para SQL (json_extract) e sincronização
+
+Uso (a partir de backend/blog_api):
+    python -m pytest tests
+"""
+import pytest
+from sqlalchemy import create_engine
+
+from src.models.mirror import MirroredDocument, MirrorState
+from src.services.firestore_mirror import FirestoreMirror
+
+ARTICLES = {
+    'a1': ({'category': 'ia', 'views': 50, 'tags': ['dados', 'ia'], 'published': True,
+            'timestamp': '2024-01-01T00:00:01Z'}, '2024-01-01T00:00:01Z'),
+    'a2': ({'category': 'humor', 'views': 10, 'tags': ['piada'], 'published': False,
+            'timestamp': '2024-01-01T00:00:00.5Z'}, '2024-01-01T00:00:00.5Z'),
+    'a3': ({'category': 'ia', 'views': 70, 'tags': [], 'published': True, 'subtitle': None,
+            'timestamp': '2024-01-01T00:00:00.123456Z'}, '2024-01-01T00:00:00.123456Z'),
+    'a4': ({'category': 'dados', 'views': 30, 'published': True,
+            'timestamp': '2024-01-01T00:00:00Z'}, '2024-01-01T00:00:00Z'),
+}
+
+
+class FakeFirestore:
+    def __init__(self, documents):
+        self.documents = dict(documents)
+
+    def list_versions(self, collection_name):
+        return [(doc_id, update_time) for doc_id, (_, update_time) in self.documents.items()]
+
+    def get_documents(self, collection_name, doc_ids):
+        return {doc_id: self.documents.get(doc_id) for doc_id in doc_ids}
+
+
+@pytest.fixture
+def firestore():
+    return FakeFirestore(ARTICLES)
+
+
+@pytest.fixture
+def mirror(tmp_path, firestore):
+    engine = create_engine(f"sqlite:///{tmp_path / 'mirror.db'}")
+    MirroredDocument.metadata.create_all(engine, tables=[MirroredDocument.__table__, MirrorState.__table__])
+    mirror = FirestoreMirror(collections='articles', indexes='articles=timestamp,category')
+    mirror.init_app(engine, firestore.list_versions, firestore.get_documents)
+    mirror.sync('articles')
+    yield mirror
+    engine.dispose()
+
+
+def query_ids(mirror, clauses=(), order_by=(), limit=None):
+    rows, _ = mirror.query('articles', list(clauses), list(order_by), limit)
+    return [doc_id for doc_id, _, _ in rows]
+
+
+def where(field, operator, value):
+    return {'field': field, 'operator': operator, 'value': value}
+
+
+def test_serves_only_after_sync_in_this_process(firestore, mirror):
+    assert mirror.serves('articles')
+    assert not mirror.serves('comments')
+
+    # Outro processo com o mesmo banco (estado ready já gravado) ainda não serve
+    restarted = FirestoreMirror(collections='articles', indexes='')
+    restarted.init_app(mirror._engine, firestore.list_versions, firestore.get_documents)
+    assert not restarted.serves('articles')
+    restarted.sync('articles')
+    assert restarted.serves('articles')
+
+
+@pytest.mark.parametrize('clause, expected', [
+    (where('category', '==', 'ia'), ['a1', 'a3']),
+    (where('category', '!=', 'ia'), ['a2', 'a4']),
+    (where('views', '>=', 50), ['a1', 'a3']),
+    (where('views', '<', 30), ['a2']),
+    (where('category', 'in', ['humor', 'dados']), ['a2', 'a4']),
+    (where('category', 'not-in', ['humor', 'dados']), ['a1', 'a3']),
+    (where('tags', 'array-contains', 'ia'), ['a1']),
+    (where('tags', 'array-contains-any', ['piada', 'dados']), ['a1', 'a2']),
+    (where('published', '==', True), ['a1', 'a3', 'a4']),
+    (where('subtitle', '==', None), ['a3']),
+])
+def test_filters_match_firestore(mirror, clause, expected):
+    assert mirror.supports(clause)
+    assert sorted(query_ids(mirror, [clause])) == expected
+
+
+def test_unsupported_clauses_are_left_to_python(mirror):
+    assert not mirror.supports(where('tags', 'array-contains', {'nome': 'ia'}))
+    assert not mirror.supports(where('category', 'in', 'ia'))
+    assert not mirror.supports(where('title', 'contains', 'dados'))
+
+
+def test_order_by_timestamp_follows_time_not_text(mirror):
+    # Como texto, "...:00.5Z" viria antes de "...:00Z" e "...:01Z" antes de "...:00.5Z"
+    assert query_ids(mirror, order_by=[('timestamp', 'asc')]) == ['a4', 'a3', 'a2', 'a1']
+    assert query_ids(mirror, order_by=[('timestamp', 'desc')], limit=2) == ['a1', 'a2']
+
+
+def test_order_skips_documents_without_the_field_and_breaks_ties_by_id(mirror):
+    assert query_ids(mirror, order_by=[('subtitle', 'asc')]) == ['a3']
+    assert sorted(query_ids(mirror, order_by=[('tags', 'asc')])) == ['a1', 'a2', 'a3']
+    # Desempate pelo id na direção da última ordenação, como o Firestore
+    assert query_ids(mirror, [where('category', '==', 'ia')], [('published', 'asc')]) == ['a1', 'a3']
+    assert query_ids(mirror, [where('category', '==', 'ia')], [('published', 'desc')]) == ['a3', 'a1']
+
+
+def test_older_version_never_replaces_newer(mirror):
+    mirror.apply_write('articles', 'a1', {'category': 'novo'}, '2024-01-01T00:00:02Z', 'set')
+    mirror.apply_write('articles', 'a1', {'category': 'antigo'}, '2024-01-01T00:00:01.9Z', 'set')
+
+    data, update_time, _ = mirror.get('articles', 'a1')
+    assert data == {'category': 'novo'}
+    assert update_time == '2024-01-01T00:00:02Z'
+
+
+def test_sync_fetches_changes_and_removes_deleted(mirror, firestore):
+    firestore.documents['a2'] = ({'category': 'humor', 'views': 11}, '2024-01-02T00:00:00Z')
+    del firestore.documents['a4']
+
+    result = mirror.sync('articles')
+    assert (result['listed'], result['fetched'], result['deleted']) == (3, 1, 1)
+    assert mirror.get('articles', 'a2')[0]['views'] == 11
+    assert mirror.get('articles', 'a4') is None
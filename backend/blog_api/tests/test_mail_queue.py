@@ -0,0 +1,152 @@
+"""Fila de emails contra um servidor SMTP local (aiosmtpd)
+
+Uso (a partir de backend/blog_api):
+    python -m pytest tests
+"""
+import socket
+import sqlite3
+import time
+from email.message import EmailMessage
+
+import pytest
+
+pytest.importorskip('aiosmtpd')
+from aiosmtpd.controller import Controller
+
+from src.services import mail_queue as mail_queue_module
+from src.services.mail_queue import MailQueue
+
+
+class RecordingHandler:
+    """Guarda as mensagens recebidas; recusa destinatários com os códigos configurados"""
+
+    def __init__(self):
+        self.messages = []
+        self.peers = []
+        # endereço -> respostas a dar no RCPT, na ordem (depois aceita)
+        self.rejections = {}
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        self.peers.append(session.peer)
+        responses = self.rejections.get(address)
+        if responses:
+            return responses.pop(0)
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((envelope.mail_from, list(envelope.rcpt_tos), envelope.content))
+        return '250 Message accepted for delivery'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname='127.0.0.1', port=free_port())
+    controller.start()
+    monkeypatch.setattr(mail_queue_module, 'SMTP_SERVER', '127.0.0.1')
+    monkeypatch.setattr(mail_queue_module, 'SMTP_PORT', controller.port)
+    monkeypatch.setattr(mail_queue_module, 'SMTP_STARTTLS', False)
+    monkeypatch.setattr(mail_queue_module, 'SMTP_AUTH', False)
+    yield handler
+    controller.stop()
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = MailQueue(path=str(tmp_path / 'mail_queue.db'), workers=1, max_attempts=3,
+                      retry_backoff=0.05, retry_max_delay=0.1, poll_interval=0.05)
+    yield queue
+    queue.stop()
+
+
+def make_message(to, subject='Teste'):
+    message = EmailMessage()
+    message['From'] = 'blog@example.com'
+    message['To'] = to
+    message['Subject'] = subject
+    message.set_content('Olá!')
+    return message
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_delivers_queued_message(smtp_server, queue):
+    queue.enqueue(make_message('leitor@example.com'))
+
+    assert wait_for(lambda: queue.stats()['sent'] == 1)
+    sender, recipients, content = smtp_server.messages[0]
+    assert sender == 'blog@example.com'
+    assert recipients == ['leitor@example.com']
+    assert b'Subject: Teste' in content
+    assert queue.stats()['pending'] == 0
+
+
+def test_permanent_rejection_is_dead_lettered(smtp_server, queue):
+    smtp_server.rejections['inexistente@example.com'] = ['550 No such user']
+    job_id = queue.enqueue(make_message('inexistente@example.com'))
+
+    assert wait_for(lambda: queue.stats()['dead'] == 1)
+    dead = queue.dead_letters()
+    assert [item['id'] for item in dead] == [job_id]
+    assert dead[0]['attempts'] == 1
+    assert 'No such user' in dead[0]['last_error']
+    assert smtp_server.messages == []
+
+
+def test_transient_rejection_is_retried(smtp_server, queue):
+    smtp_server.rejections['ocupado@example.com'] = ['451 Try again later']
+    queue.enqueue(make_message('ocupado@example.com'))
+
+    assert wait_for(lambda: queue.stats()['sent'] == 1)
+    assert queue.stats()['retried'] == 1
+    assert smtp_server.messages[0][1] == ['ocupado@example.com']
+
+
+def test_connection_reused_after_recipient_rejection(smtp_server, queue):
+    smtp_server.rejections['inexistente@example.com'] = ['550 No such user']
+    queue.enqueue(make_message('inexistente@example.com'))
+    assert wait_for(lambda: queue.stats()['dead'] == 1)
+
+    queue.enqueue(make_message('leitor@example.com'))
+    assert wait_for(lambda: queue.stats()['sent'] == 1)
+
+    # A recusa de um destinatário não derruba a conexão do worker
+    assert len(set(smtp_server.peers)) == 1
+
+
+def test_status_update_retried_when_database_is_locked(smtp_server, queue, monkeypatch):
+    mark_sent = queue.mark_sent
+    calls = []
+
+    def locked_twice(job_id):
+        calls.append(job_id)
+        if len(calls) <= 2:
+            raise sqlite3.OperationalError('database is locked')
+        mark_sent(job_id)
+
+    monkeypatch.setattr(queue, 'mark_sent', locked_twice)
+    job_id = queue.enqueue(make_message('leitor@example.com'))
+
+    assert wait_for(lambda: queue.stats()['sent'] == 1)
+    assert calls == [job_id] * 3
+    stats = queue.stats()
+    assert stats['sending'] == 0 and stats['pending'] == 0
+    # O worker continua vivo e atende as próximas mensagens
+    assert stats['workers'] == 1
+    queue.enqueue(make_message('outro@example.com'))
+    assert wait_for(lambda: queue.stats()['sent'] == 2)
+    assert [recipients for _, recipients, _ in smtp_server.messages] == [['leitor@example.com'], ['outro@example.com']]
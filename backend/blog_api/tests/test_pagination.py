@@ -0,0 +1,134 @@
+"""Paginação do proxy: cursores opacos e o limit da consulta repartido entre as páginas
+
+Uso (a partir de backend/blog_api):
+    python -m pytest tests
+"""
+import json
+
+import pytest
+
+from src.routes import firebase_proxy
+from src.routes.firebase_proxy import iter_collection, page_cursor, parse_collection_args, query_collection_page
+from src.services.firestore_codec import decode_value
+from src.services.firestore_query import decode_cursor, encode_cursor, parse_query
+
+DOCUMENTS_PATH = 'projects/demo/databases/(default)/documents'
+
+
+def make_document(number):
+    return {
+        'name': f"{DOCUMENTS_PATH}/articles/a{number:02d}",
+        'fields': {'views': {'integerValue': str(number * 7 % 10)}},
+        'updateTime': '2024-01-01T00:00:00Z'
+    }
+
+
+class FakeFirestore:
+    """documents.list (pageToken = posição) e runQuery com um fieldFilter, orderBy, startAt e limit"""
+
+    def __init__(self, count=10):
+        self.documents = [make_document(number) for number in range(count)]
+        self.list_calls = []
+        self.queries = []
+
+    def list_documents(self, collection_name, order_by=(), page_size=None, page_token=None):
+        self.list_calls.append(page_size)
+        start = int(page_token or 0)
+        data = {'documents': self.documents[start:start + page_size]}
+        if start + page_size < len(self.documents):
+            data['nextPageToken'] = str(start + page_size)
+        return data, 100
+
+    def run_structured_query(self, structured_query):
+        self.queries.append(structured_query)
+        documents = [doc for doc in self.documents if self._matches(doc, structured_query.get('where'))]
+
+        order = structured_query.get('orderBy', [])
+        descending = bool(order) and order[-1]['direction'] == 'DESCENDING'
+        paths = [item['field']['fieldPath'] for item in order]
+        documents.sort(key=lambda doc: self._sort_key(doc, paths), reverse=descending)
+
+        start_at = structured_query.get('startAt')
+        if start_at:
+            cursor = tuple(self._value(raw) for raw in start_at['values'])
+            documents = [doc for doc in documents
+                         if (self._sort_key(doc, paths) < cursor if descending else self._sort_key(doc, paths) > cursor)]
+        return documents[:structured_query.get('limit')], 100
+
+    def _matches(self, doc, where):
+        if where is None:
+            return True
+        field_filter = where['fieldFilter']
+        value = decode_value(doc['fields'][field_filter['field']['fieldPath']])
+        expected = decode_value(field_filter['value'])
+        return value >= expected if field_filter['op'] == 'GREATER_THAN_OR_EQUAL' else value == expected
+
+    def _sort_key(self, doc, paths):
+        return tuple(doc['name'] if path == '__name__' else decode_value(doc['fields'][path]) for path in paths)
+
+    @staticmethod
+    def _value(raw):
+        return raw['referenceValue'] if 'referenceValue' in raw else decode_value(raw)
+
+
+@pytest.fixture
+def firestore(monkeypatch):
+    fake = FakeFirestore()
+    monkeypatch.setattr(firebase_proxy, 'list_documents', fake.list_documents)
+    monkeypatch.setattr(firebase_proxy, 'run_structured_query', fake.run_structured_query)
+    return fake
+
+
+def ids(documents):
+    return [doc['id'] for doc in documents]
+
+
+def test_limit_spans_pages_of_a_listing(firestore):
+    query = parse_query(limit='7')
+
+    documents = list(iter_collection('articles', query, 3))
+
+    assert ids(documents) == [f"a{number:02d}" for number in range(7)]
+    # A última página só pede o que falta do limit
+    assert firestore.list_calls == [3, 3, 1]
+
+
+def test_filtered_pages_continue_after_the_cursor(firestore):
+    query = parse_query(order_by='views', direction='desc', limit='5',
+                        where_param=json.dumps({'field': 'views', 'operator': '>=', 'value': 3}))
+
+    first, token, _, _ = query_collection_page('articles', query, 3)
+    assert [doc['data']['views'] for doc in first] == [9, 8, 7]
+    assert decode_cursor(token)['remaining'] == 2
+
+    second, token, _, _ = query_collection_page('articles', query, 3, token)
+    assert [doc['data']['views'] for doc in second] == [6, 5]
+    assert token is None
+    assert [structured_query['limit'] for structured_query in firestore.queries] == [3, 2]
+
+
+def test_last_full_page_ends_with_an_empty_page(firestore):
+    query = parse_query(order_by='views', where_param=json.dumps({'field': 'views', 'operator': '>=', 'value': 4}))
+
+    pages = []
+    token = None
+    while True:
+        documents, token, _, _ = query_collection_page('articles', query, 3, token)
+        pages.append([doc['data']['views'] for doc in documents])
+        if not token:
+            break
+
+    # Sem limit não há como saber que a segunda página cheia era a última
+    assert pages == [[4, 5, 6], [7, 8, 9], []]
+
+
+def test_page_cursor_carries_what_is_left_of_the_limit():
+    assert decode_cursor(page_cursor({'token': 'x'}, 5, 3)) == {'token': 'x', 'remaining': 2}
+    assert page_cursor({'token': 'x'}, 3, 3) is None
+    assert decode_cursor(page_cursor({'token': 'x'}, None, 3)) == {'token': 'x'}
+
+
+@pytest.mark.parametrize('remaining', [0, -1, '2'])
+def test_page_token_with_invalid_remaining_is_rejected(remaining):
+    with pytest.raises(ValueError):
+        parse_collection_args({'pageToken': encode_cursor({'token': 'x', 'remaining': remaining})})
@@ -0,0 +1,68 @@
+"""Cache de leitura: invalidação por coleção e a guarda de geração contra leituras antigas
+
+Uso (a partir de backend/blog_api):
+    python -m pytest tests
+"""
+import pytest
+
+from src.services.cache import ReadCache, SharedReadCache
+from src.services.compression import JSONPayload
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def cache(request, tmp_path):
+    if request.param == 'sqlite':
+        return SharedReadCache(path=str(tmp_path / 'read_cache.db'), default_ttl=60, ttls={})
+    return ReadCache(default_ttl=60, ttls={})
+
+
+def cached_ids(cache, key):
+    payload = cache.get(key)
+    return None if payload is None else [doc['id'] for doc in payload.value]
+
+
+def test_stores_and_invalidates_collection_queries(cache):
+    key = cache.collection_key('articles', {'limit': 5})
+    cache.set(key, JSONPayload([{'id': 'a1'}]), size=10)
+    assert cached_ids(cache, key) == ['a1']
+
+    cache.invalidate_collection('articles')
+    assert cache.get(key) is None
+
+
+def test_read_started_before_a_write_is_not_cached(cache):
+    key = cache.collection_key('articles', {'limit': 5})
+
+    # A leitura começa (geração lida antes de ir ao Firestore)...
+    generation = cache.generation('articles')
+    # ...uma escrita invalida a coleção enquanto o Firestore responde...
+    cache.invalidate_document('articles', 'a1')
+    # ...e o resultado antigo não pode ficar no cache
+    cache.set(key, JSONPayload([{'id': 'a1'}]), size=10, generation=generation)
+    assert cache.get(key) is None
+
+    # Uma leitura iniciada depois da escrita é guardada normalmente
+    cache.set(key, JSONPayload([{'id': 'a2'}]), size=10, generation=cache.generation('articles'))
+    assert cached_ids(cache, key) == ['a2']
+
+
+def test_write_in_another_collection_does_not_block_caching(cache):
+    key = cache.collection_key('articles', {})
+    generation = cache.generation('articles')
+    cache.invalidate_collection('comments')
+
+    cache.set(key, JSONPayload([{'id': 'a1'}]), size=10, generation=generation)
+    assert cached_ids(cache, key) == ['a1']
+
+
+def test_shared_generation_is_seen_by_other_workers(tmp_path):
+    path = str(tmp_path / 'read_cache.db')
+    worker, other_worker = SharedReadCache(path=path, ttls={}), SharedReadCache(path=path, ttls={})
+    key = worker.collection_key('articles', {})
+
+    generation = worker.generation('articles')
+    other_worker.invalidate_collection('articles')
+    worker.set(key, JSONPayload([{'id': 'a1'}]), size=10, generation=generation)
+
+    assert worker.get(key) is None
+    assert other_worker.get(key) is None
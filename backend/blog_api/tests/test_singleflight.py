@@ -0,0 +1,126 @@
+"""Singleflight: leituras idênticas simultâneas compartilham uma execução
+
+Uso (a partir de backend/blog_api):
+    python -m pytest tests
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.services.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    executions = []
+
+    def load(key):
+        executions.append(key)
+        started.set()
+        release.wait(5)
+        return {'id': key}
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        leader = pool.submit(flights.do, 'k', load, 'a1')
+        assert started.wait(5)
+        followers = [pool.submit(flights.do, 'k', load, 'a1') for _ in range(4)]
+        # Os seguidores chegam enquanto a primeira chamada está em andamento
+        assert wait_for(lambda: flights.stats()['calls'] == 5)
+        release.set()
+        results = [leader.result(5)] + [future.result(5) for future in followers]
+
+    assert executions == ['a1']
+    assert all(result is results[0] for result in results)
+    stats = flights.stats()
+    assert stats['executions'] == 1 and stats['collapsed'] == 4 and stats['in_flight'] == 0
+
+
+def test_error_is_shared_and_next_call_runs_again():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise RuntimeError('Firestore indisponível')
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flights.do, 'k', fail)
+        assert wait_for(lambda: flights.stats()['in_flight'] == 1)
+        follower = pool.submit(flights.do, 'k', fail)
+        assert wait_for(lambda: flights.stats()['calls'] == 2)
+        release.set()
+        for future in (leader, follower):
+            with pytest.raises(RuntimeError):
+                future.result(5)
+
+    assert flights.do('k', lambda: 'ok') == 'ok'
+    assert flights.stats()['executions'] == 2
+
+
+def test_forgotten_call_is_not_shared():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def stale():
+        release.wait(5)
+        return 'antigo'
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        leader = pool.submit(flights.do, ('collection', 'articles'), stale)
+        assert wait_for(lambda: flights.stats()['in_flight'] == 1)
+        # Uma escrita na coleção: quem chegar depois não recebe o resultado antigo
+        flights.forget(lambda key: key[1] == 'articles')
+        assert flights.do(('collection', 'articles'), lambda: 'novo') == 'novo'
+        release.set()
+        assert leader.result(5) == 'antigo'
+
+    assert flights.stats()['forgotten'] == 1
+
+
+def test_async_calls_share_one_task():
+    flights = AsyncSingleFlight()
+    executions = []
+
+    async def load(key):
+        executions.append(key)
+        await asyncio.sleep(0.05)
+        return {'id': key}
+
+    async def main():
+        return await asyncio.gather(*(flights.do('k', load, 'a1') for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert executions == ['a1']
+    assert results == [{'id': 'a1'}] * 5
+    assert flights.stats()['collapsed'] == 4
+
+
+def test_async_cancelled_waiter_does_not_cancel_the_call():
+    flights = AsyncSingleFlight()
+
+    async def load():
+        await asyncio.sleep(0.05)
+        return 'ok'
+
+    async def main():
+        first = asyncio.ensure_future(flights.do('k', load))
+        second = asyncio.ensure_future(flights.do('k', load))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == 'ok'
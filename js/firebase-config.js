@@ -263,6 +263,39 @@ class FirebaseProxy {
                 }
               },
               
+              // Contagem no servidor (mesma forma do AggregateQuery do Firebase)
+              count: () => {
+                // O endpoint de contagem só compara igualdade (campo == valor)
+                if (operator !== '==') {
+                  throw new Error(`Contagem não suportada para o operador ${operator}`);
+                }
+                return {
+                  get: async () => {
+                    try {
+                      // Filtro em JSON como nas consultas: números e booleanos mantêm o tipo
+                      const params = new URLSearchParams({
+                        collection: collectionName,
+                        where: JSON.stringify(query)
+                      });
+
+                      const response = await fetch(`${this.apiBaseUrl}/firestore:count?${params}`);
+                      if (!response.ok) {
+                        throw new Error(`Erro na contagem: ${response.statusText}`);
+                      }
+
+                      const data = await response.json();
+
+                      return {
+                        data: () => ({ count: data.count })
+                      };
+                    } catch (error) {
+                      console.error('Erro na contagem:', error);
+                      throw error;
+                    }
+                  }
+                };
+              },
+              
               orderBy: (field, direction = 'asc') => {
                 query.orderBy = { field, direction };
                 return this;
@@ -360,6 +393,34 @@ class FirebaseProxy {
             };
           }
         };
+      },
+
+      // Buscar vários documentos em uma única requisição ('colecao/id')
+      getAll: async (paths) => {
+        try {
+          const response = await fetch(`${this.apiBaseUrl}/firestore:batchGet`, {
+            method: 'POST',
+            headers: {
+              'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ documents: paths })
+          });
+
+          if (!response.ok) {
+            throw new Error(`Erro ao buscar documentos: ${response.statusText}`);
+          }
+
+          const data = await response.json();
+
+          return data.documents.map(doc => ({
+            id: doc.id,
+            exists: doc.exists,
+            data: () => doc.data || null
+          }));
+        } catch (error) {
+          console.error('Erro ao buscar documentos:', error);
+          throw error;
+        }
       }
     };
   }
@@ -27,6 +27,7 @@ export function setupLikeButton(articleId) {
       if (doc.exists) {
         // Remove a curtida
         await likeRef.delete();
+        incrementLikeCounter(articleId, -1);
         likeIcon.classList.replace('fas', 'far');
         likeCount.textContent = parseInt(likeCount.textContent) - 1;
       } else {
@@ -36,6 +37,7 @@ export function setupLikeButton(articleId) {
           userId: user.uid,
           timestamp: firebase.firestore.FieldValue.serverTimestamp()
         });
+        incrementLikeCounter(articleId, 1);
         likeIcon.classList.replace('far', 'fas');
         likeCount.textContent = parseInt(likeCount.textContent) + 1;
       }
@@ -58,12 +60,15 @@ export async function loadLikes(articleId) {
   if (!likeCount) return;
 
   try {
+    // Conta no servidor em vez de baixar todas as curtidas
     const snapshot = await db.collection('likes')
       .where('articleId', '==', articleId)
+      .count()
       .get();
+    const total = snapshot.data().count;
       
-    likeCount.textContent = snapshot.size;
-    updateLikeCountText(snapshot.size);
+    likeCount.textContent = total;
+    updateLikeCountText(total);
     
     // Verifica se o usuário atual já curtiu
     const user = auth.currentUser;
@@ -82,6 +87,25 @@ export async function loadLikes(articleId) {
   }
 }
 
+// Mantém o campo likes do artigo (exibido nas listagens) pelo contador do backend
+async function incrementLikeCounter(articleId, amount) {
+  try {
+    const apiBaseUrl = window.firebaseProxy.apiBaseUrl.replace(/\/firebase$/, '');
+    const response = await fetch(`${apiBaseUrl}/counters/articles/${articleId}/likes`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ amount })
+    });
+    if (!response.ok) {
+      throw new Error(`Erro ao atualizar contador: ${response.statusText}`);
+    }
+  } catch (error) {
+    console.error("Erro ao atualizar contador de curtidas:", error);
+  }
+}
+
 // Atualiza texto de curtidas
 function updateLikeCountText(count) {
   const likeText = document.getElementById('like-count-text');